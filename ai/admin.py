@@ -1,5 +1,5 @@
 from django.contrib import admin
-from ai.models import UserFace
+from ai.models import UserFace, FaceSyncReport
 
 @admin.register(UserFace)
 class UserFaceAdmin(admin.ModelAdmin):
@@ -8,6 +8,12 @@ class UserFaceAdmin(admin.ModelAdmin):
     list_filter = ("status",)
 
 
+@admin.register(FaceSyncReport)
+class FaceSyncReportAdmin(admin.ModelAdmin):
+    list_display = ("id", "collection_id", "finished_at", "collection_faces", "db_rows", "missing", "orphaned", "superseded")
+    list_filter = ("collection_id",)
+
+
 from django.contrib import admin
 from ai.models.alert import Alert
 
@@ -18,6 +24,24 @@ class AlertAdmin(admin.ModelAdmin):
     list_filter = ("type",)
 
 
+from ai.models.video_job import VideoJob
+
+@admin.register(VideoJob)
+class VideoJobAdmin(admin.ModelAdmin):
+    list_display = ("id","status","camera_id","attempts","worker","created_at","finished_at")
+    search_fields = ("s3_video_key","rekognition_job_id")
+    list_filter = ("status",)
+
+
+from ai.models.video_alert_rule import VideoAlertRule
+
+@admin.register(VideoAlertRule)
+class VideoAlertRuleAdmin(admin.ModelAdmin):
+    list_display = ("id","type","camera_id","enabled","updated_at")
+    search_fields = ("type","camera_id")
+    list_filter = ("enabled","type")
+
+
 
 from django.contrib import admin
 from ai.models.visitor_session import VisitorSession
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class AiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ai"
+
+    def ready(self):
+        # Instancia el motor de FACE_MATCH_BACKEND: si falta una dependencia falla al arrancar, no en el primer login
+        from ai.services.face_service import get_backend
+        get_backend()
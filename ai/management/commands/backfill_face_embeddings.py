@@ -0,0 +1,40 @@
+# ai/management/commands/backfill_face_embeddings.py
+from django.core.management.base import BaseCommand
+
+from ai.models import UserFace
+from ai.services.aws_clients import get_client
+from ai.services.face_service import BUCKET, COLLECTION
+
+
+class Command(BaseCommand):
+    help = "Calcula embeddings locales para filas de ai_userface que aún no los tienen (lee la imagen de S3)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=COLLECTION)
+        parser.add_argument("--limit", type=int, default=0, help="0 = sin límite")
+
+    def handle(self, *args, **opts):
+        from ai.services import face_index  # requiere numpy + embedder
+
+        qs = (UserFace.objects
+              .filter(collection_id=opts["collection"], embedding__isnull=True, status="registered")
+              .exclude(s3_key__isnull=True).exclude(s3_key="")
+              .order_by("id"))
+        if opts["limit"]:
+            qs = qs[:opts["limit"]]
+
+        s3 = get_client("s3")
+        done = skipped = 0
+        for uf in qs.iterator():
+            data = s3.get_object(Bucket=BUCKET, Key=uf.s3_key)["Body"].read()
+            vec = face_index.embed(data)
+            if vec is None:
+                skipped += 1
+                self.stdout.write(self.style.WARNING(f"sin rostro: user={uf.user_id} key={uf.s3_key}"))
+                continue
+            uf.embedding = face_index.to_bytes(vec)
+            uf.save(update_fields=["embedding", "updated_at"])
+            done += 1
+
+        face_index.reset_indexes()
+        self.stdout.write(self.style.SUCCESS(f"embeddings: {done} nuevos, {skipped} sin rostro"))
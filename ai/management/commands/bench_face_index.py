@@ -0,0 +1,44 @@
+# ai/management/commands/bench_face_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Benchmark del índice facial local (NumPy) con embeddings sintéticos. No toca BD ni AWS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--faces", type=int, default=10000)
+        parser.add_argument("--dim", type=int, default=128)
+        parser.add_argument("--queries", type=int, default=2000)
+        parser.add_argument("--k", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        import numpy as np
+        from ai.services.face_index import FaceIndex
+
+        rng = np.random.default_rng(opts["seed"])
+        n, d, q = opts["faces"], opts["dim"], opts["queries"]
+        base = rng.standard_normal((n, d)).astype(np.float32)
+
+        idx = FaceIndex()
+        t0 = time.perf_counter()
+        idx.load([(str(i), f"f{i}", base[i]) for i in range(n)])
+        build_s = time.perf_counter() - t0
+
+        # consultas = rostros enrolados con ruido (deberían recuperar su propio id)
+        picks = rng.integers(0, n, size=q)
+        queries = base[picks] + 0.1 * rng.standard_normal((q, d)).astype(np.float32)
+
+        hits = 0
+        t0 = time.perf_counter()
+        for i in range(q):
+            res = idx.search(queries[i], k=opts["k"])
+            hits += bool(res) and res[0][0] == str(picks[i])
+        search_s = time.perf_counter() - t0
+
+        self.stdout.write(f"faces={n} dim={d} queries={q} k={opts['k']}")
+        self.stdout.write(f"build: {build_s * 1000:.1f} ms")
+        self.stdout.write(f"search: {q / search_s:,.0f} q/s  ({search_s / q * 1e6:.1f} µs/q)")
+        self.stdout.write(f"top-1 recall: {hits / q:.3f}")
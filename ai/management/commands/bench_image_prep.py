@@ -0,0 +1,54 @@
+# ai/management/commands/bench_image_prep.py
+import math, os, statistics, time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.services.image_prep import normalize_image, parse_roi, IMAGE_MAX_EDGE, IMAGE_JPEG_QUALITY
+
+
+class Command(BaseCommand):
+    help = "Mide bytes ahorrados y tiempo del pre-procesamiento de imágenes (image_prep) sobre archivos locales."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="imágenes o carpetas")
+        parser.add_argument("--max-edge", type=int, default=IMAGE_MAX_EDGE)
+        parser.add_argument("--quality", type=int, default=IMAGE_JPEG_QUALITY)
+        parser.add_argument("--roi", default="", help='"l,t,r,b" en fracciones')
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def _files(self, paths):
+        for p in paths:
+            if os.path.isdir(p):
+                for name in sorted(os.listdir(p)):
+                    if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".heic")):
+                        yield os.path.join(p, name)
+            else:
+                yield p
+
+    def handle(self, *args, **opts):
+        files = list(self._files(opts["paths"]))
+        if not files:
+            raise CommandError("No se encontraron imágenes")
+        roi = parse_roi(opts["roi"])
+
+        total_in = total_out = 0
+        times = []
+        for path in files:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            best = None
+            for _ in range(max(1, opts["repeat"])):
+                t0 = time.perf_counter()
+                out = normalize_image(data, max_edge=opts["max_edge"], quality=opts["quality"], roi=roi)
+                dt = time.perf_counter() - t0
+                best = dt if best is None else min(best, dt)
+            times.append(best)
+            total_in += len(data)
+            total_out += len(out)
+            self.stdout.write(f"{os.path.basename(path)}: {len(data)/1024:.0f} KB -> {len(out)/1024:.0f} KB  {best*1000:.1f} ms")
+
+        saved = 100.0 * (1 - total_out / total_in) if total_in else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(files)} imágenes: {total_in/1024:.0f} KB -> {total_out/1024:.0f} KB ({saved:.1f}% menos); "
+            f"mediana {statistics.median(times)*1000:.1f} ms, p95 {sorted(times)[max(0, math.ceil(0.95 * len(times)) - 1)]*1000:.1f} ms"
+        ))
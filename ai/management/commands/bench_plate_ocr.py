@@ -0,0 +1,125 @@
+# ai/management/commands/bench_plate_ocr.py
+import json, os, time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.services.image_prep import normalize_image
+from ai.services.plate_service import _plate_words, _rek, plate_camera
+
+
+def _overlap(box, region) -> float:
+    """Fracción del área de `box` (BoundingBox de Rekognition) dentro de `region` (l, t, r, b)."""
+    l, t = max(box["Left"], region[0]), max(box["Top"], region[1])
+    r = min(box["Left"] + box["Width"], region[2])
+    b = min(box["Top"] + box["Height"], region[3])
+    area = box["Width"] * box["Height"]
+    return max(0.0, r - l) * max(0.0, b - t) / area if area > 0 else 0.0
+
+
+def simulate_filters(resp, camera):
+    """
+    Aplica localmente lo que haría Filters de detect_text sobre una respuesta grabada sin filtros:
+    WordFilter (confianza, alto/ancho mínimo) y RegionsOfInterest (más de la mitad de la palabra dentro).
+    """
+    kept = []
+    for d in resp.get("TextDetections", []):
+        box = d.get("Geometry", {}).get("BoundingBox", {"Left": 0, "Top": 0, "Width": 1, "Height": 1})
+        if d["Confidence"] < camera.min_confidence:
+            continue
+        if box["Height"] < camera.min_box_height or box["Width"] < camera.min_box_width:
+            continue
+        if camera.regions and not any(_overlap(box, reg) > 0.5 for reg in camera.regions):
+            continue
+        kept.append(d)
+    return {**resp, "TextDetections": kept}
+
+
+class Command(BaseCommand):
+    help = ("Compara detect_text sin filtros vs con el ROI/WordFilter de una cámara sobre respuestas grabadas "
+            "(JSONL: {response, expected?, camera_id?}). Con --record llama a Rekognition con imágenes y graba.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="JSONL grabado (o imágenes con --record)")
+        parser.add_argument("--camera", default=None, help="camera_id de PLATE_CAMERAS (por defecto, el de cada línea)")
+        parser.add_argument("--regions", default=None, help='probar regiones: "l,t,r,b;l,t,r,b"')
+        parser.add_argument("--min-confidence", type=float, default=None)
+        parser.add_argument("--min-box-height", type=float, default=None)
+        parser.add_argument("--min-box-width", type=float, default=None)
+        parser.add_argument("--repeat", type=int, default=200, help="repeticiones del post-proceso por respuesta")
+        parser.add_argument("--record", action="store_true", help="paths son imágenes: llamar a Rekognition y grabar")
+        parser.add_argument("--out", default="plate_ocr_recorded.jsonl")
+
+    def _camera(self, camera_id, opts):
+        overrides = {k: opts[k] for k in ("min_confidence", "min_box_height", "min_box_width") if opts[k] is not None}
+        if opts["regions"] is not None:
+            overrides["regions"] = opts["regions"]
+        return plate_camera(opts["camera"] or camera_id).with_overrides(overrides)
+
+    def _post_us(self, resp, repeat):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            words = _plate_words(resp)
+        return (time.perf_counter() - t0) / repeat * 1e6, (words[0][0] if words else None)
+
+    # ----- live: grabar respuestas sin filtros y medir la llamada con/sin filtros -----
+    def _record(self, opts):
+        camera = self._camera(None, opts)
+        filters = camera.filters()
+        lat_full, lat_filt = [], []
+        with open(opts["out"], "w") as out:
+            for path in opts["paths"]:
+                data = normalize_image(path, roi=camera.roi)
+                t0 = time.perf_counter()
+                full = _rek().detect_text(Image={"Bytes": data})
+                t1 = time.perf_counter()
+                filt = _rek().detect_text(Image={"Bytes": data}, Filters=filters) if filters else full
+                t2 = time.perf_counter()
+                full.pop("ResponseMetadata", None)
+                filt.pop("ResponseMetadata", None)
+                lat_full.append(t1 - t0)
+                lat_filt.append(t2 - t1)
+                out.write(json.dumps({"image": os.path.basename(path), "camera_id": opts["camera"], "response": full}) + "\n")
+                self.stdout.write(f"{os.path.basename(path)}: {len(full['TextDetections'])} -> "
+                                  f"{len(filt['TextDetections'])} detecciones, {(t1-t0)*1000:.0f} -> {(t2-t1)*1000:.0f} ms")
+        n = len(lat_full)
+        self.stdout.write(self.style.SUCCESS(
+            f"{n} imágenes grabadas en {opts['out']}: detect_text medio {sum(lat_full)/n*1000:.0f} ms sin filtros, "
+            f"{sum(lat_filt)/n*1000:.0f} ms con filtros"
+        ))
+
+    def handle(self, *args, **opts):
+        if opts["record"]:
+            return self._record(opts)
+
+        records = []
+        for path in opts["paths"]:
+            with open(path) as fh:
+                records.extend(json.loads(line) for line in fh if line.strip())
+        if not records:
+            raise CommandError("No hay respuestas grabadas")
+
+        det = [0, 0]; size = [0, 0]; post = [0.0, 0.0]; ok = [0, 0]; labeled = changed = 0
+        for rec in records:
+            camera = self._camera(rec.get("camera_id"), opts)
+            full = rec["response"]
+            filt = simulate_filters(full, camera)
+            us_full, plate_full = self._post_us(full, opts["repeat"])
+            us_filt, plate_filt = self._post_us(filt, opts["repeat"])
+            det[0] += len(full["TextDetections"]); det[1] += len(filt["TextDetections"])
+            size[0] += len(json.dumps(full)); size[1] += len(json.dumps(filt))
+            post[0] += us_full; post[1] += us_filt
+            changed += plate_full != plate_filt
+            if rec.get("expected"):
+                labeled += 1
+                ok[0] += plate_full == rec["expected"]
+                ok[1] += plate_filt == rec["expected"]
+
+        n = len(records)
+        pct = lambda a, b: 100.0 * (1 - b / a) if a else 0.0
+        self.stdout.write(f"detecciones: {det[0]} -> {det[1]} ({pct(*det):.1f}% menos)")
+        self.stdout.write(f"respuesta:   {size[0]/1024:.1f} KB -> {size[1]/1024:.1f} KB ({pct(*size):.1f}% menos)")
+        self.stdout.write(f"post-proceso: {post[0]/n:.1f} µs -> {post[1]/n:.1f} µs por respuesta")
+        self.stdout.write(f"lecturas distintas con filtros: {changed}/{n}")
+        if labeled:
+            self.stdout.write(f"aciertos (expected): {ok[0]}/{labeled} sin filtros, {ok[1]}/{labeled} con filtros")
+        self.stdout.write(self.style.SUCCESS(f"{n} respuestas grabadas"))
@@ -0,0 +1,75 @@
+# ai/management/commands/bench_plate_registry.py
+import random, string, time
+
+from django.core.management.base import BaseCommand
+
+from ai.models import Plate
+from ai.services.plate_registry import PlateRegistry
+
+# sustituciones que suele cometer el OCR (para generar lecturas "malas")
+_OCR_SWAPS = {"0": "O", "O": "0", "1": "I", "I": "1", "8": "B", "B": "8", "5": "S", "S": "5", "2": "Z", "Z": "2"}
+_ALPHABET = string.ascii_uppercase + string.digits
+
+
+def _misread(number: str, rnd: random.Random) -> str:
+    """Una lectura con una confusión típica si se puede; si no, un carácter cambiado."""
+    idx = [i for i, ch in enumerate(number) if ch in _OCR_SWAPS]
+    if idx:
+        i = rnd.choice(idx)
+        return number[:i] + _OCR_SWAPS[number[i]] + number[i + 1:]
+    i = rnd.randrange(len(number))
+    return number[:i] + rnd.choice(_ALPHABET) + number[i + 1:]
+
+
+class Command(BaseCommand):
+    help = ("Mide verificaciones de placa por segundo: registro en memoria (exacta y tolerante a OCR) "
+            "vs consulta a ai_plate.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lookups", type=int, default=200000)
+        parser.add_argument("--db-lookups", type=int, default=2000, help="0 = no medir la BD")
+        parser.add_argument("--hit-ratio", type=float, default=0.5)
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="N placas generadas en memoria en lugar de leer ai_plate")
+
+    def _rate(self, label, fn, queries):
+        t0 = time.perf_counter()
+        hits = sum(1 for q in queries if fn(q))
+        dt = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {len(queries)/dt:,.0f} consultas/s ({dt/len(queries)*1e6:.2f} µs c/u, {hits} aciertos)"
+        ))
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(7)
+        reg = PlateRegistry()
+        t0 = time.perf_counter()
+        if opts["synthetic"]:
+            rows = [("".join(rnd.choices(string.ascii_uppercase, k=3)) + "".join(rnd.choices(string.digits, k=4)), i)
+                    for i in range(opts["synthetic"])]
+            n = reg.load_rows(rows)
+        else:
+            n = reg.load()
+        self.stdout.write(f"carga: {n} placas (+ índices) en {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        known = list(reg.numbers()) or ["ABC123"]
+        def sample(k, mangle=False):
+            out = []
+            for _ in range(k):
+                if rnd.random() < opts["hit_ratio"]:
+                    q = rnd.choice(known)
+                    out.append(_misread(q, rnd) if mangle else q)
+                else:
+                    out.append("".join(rnd.choices(_ALPHABET, k=7)))
+            return out
+
+        self._rate("exacta       ", reg.exists, sample(opts["lookups"]))
+        self._rate("tolerante OCR", lambda q: reg.match(q, suggestions=True), sample(opts["lookups"], mangle=True))
+
+        if opts["db_lookups"] > 0 and not opts["synthetic"]:
+            queries = sample(opts["db_lookups"])
+            t0 = time.perf_counter()
+            for q in queries:
+                Plate.objects.filter(number=q).exists()
+            dt = time.perf_counter() - t0
+            self.stdout.write(f"BD exacta    : {len(queries)/dt:,.0f} consultas/s ({dt/len(queries)*1e3:.2f} ms c/u)")
@@ -0,0 +1,120 @@
+# ai/management/commands/bench_video_events.py
+import random, time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.services.video_rules import DEFAULT_RULES, AlertRule, RuleSet
+from ai.services.video_service import MIN_CONF, detect_events
+
+
+def _group_by_ts(labels):
+    by_ts = {}
+    for it in labels:
+        conf = float(it["Label"].get("Confidence", 0))
+        if conf < MIN_CONF:
+            continue
+        by_ts.setdefault(int(it["Timestamp"]), set()).add(it["Label"]["Name"])
+    return by_ts
+
+
+def detect_events_reference(labels):
+    """Versión original (if a mano, O(n²) en la ventana de Person), para comparar salida y tiempos."""
+    by_ts = _group_by_ts(labels)
+    tss = sorted(by_ts.keys())
+    events = []
+    for ts in tss:
+        names = by_ts[ts]
+        if "Dog" in names:
+            person_near = any("Person" in by_ts[t2] for t2 in tss if abs(t2-ts) <= 2000)
+            if not person_near:
+                events.append({"type": "dog_loose", "timestamp_ms": ts, "confidence": 90.0})
+        WASTE_LABELS = {"Poop", "Feces", "Excrement", "Animal Droppings", "Dung"}
+        if "Dog" in names and any(lbl in names for lbl in WASTE_LABELS):
+            events.append({"type": "dog_waste", "timestamp_ms": ts, "confidence": 85.0})
+        if "Car" in names or "Truck" in names:
+            events.append({"type": "bad_parking", "timestamp_ms": ts, "confidence": 80.0})
+    events.sort(key=lambda e: (e["type"], e["timestamp_ms"]))
+    dedup, last = [], {}
+    for e in events:
+        t = e["type"]
+        if t not in last or abs(e["timestamp_ms"] - last[t]) > 3000:
+            dedup.append(e)
+            last[t] = e["timestamp_ms"]
+    return dedup
+
+
+def synthetic_labels(hours: float, step_ms: int, seed: int):
+    """
+    Línea de tiempo tipo get_label_detection: cada `step_ms` un muestreo con
+    escenas que duran varios segundos (perro paseando, persona, auto
+    estacionado) y ruido de etiquetas sueltas / de baja confianza.
+    """
+    rnd = random.Random(seed)
+    labels, scene, left = [], set(), 0
+    for ts in range(0, int(hours * 3600 * 1000), step_ms):
+        if left <= 0:
+            scene = set(rnd.sample(["Dog", "Person", "Car", "Truck", "Tree", "Grass"], rnd.randint(0, 3)))
+            left = rnd.randint(5, 150)   # muestras que dura la escena
+        left -= 1
+        names = {n for n in scene if rnd.random() < 0.85}
+        if "Dog" in names and rnd.random() < 0.02:
+            names.add(rnd.choice(["Poop", "Feces", "Dung"]))
+        for n in names:
+            labels.append({"Timestamp": ts, "Label": {"Name": n, "Confidence": rnd.uniform(60, 99.9)}})
+    return labels
+
+
+class Command(BaseCommand):
+    help = ("Compara detect_events (reglas compiladas) contra la versión original con líneas de tiempo sintéticas "
+            "(salida idéntica + speedup) y mide cuánto cuesta agregar reglas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=1.0)
+        parser.add_argument("--step-ms", type=int, default=200, help="separación entre muestreos de Rekognition")
+        parser.add_argument("--seeds", type=int, default=3, help="líneas de tiempo distintas")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--skip-reference", action="store_true", help="no correr la versión O(n²) (muy lenta en videos largos)")
+        parser.add_argument("--extra-rules", type=int, default=20, help="reglas adicionales para medir el costo por regla")
+
+    @staticmethod
+    def _extra_rules(n):
+        """Variantes de las reglas (otros tipos, ventanas y labels) para medir el costo por regla."""
+        labels = ["Dog", "Person", "Car", "Truck", "Tree", "Grass"]
+        return tuple(AlertRule.from_dict({
+            "type": f"extra_{i}",
+            "all": [labels[i % len(labels)]],
+            "near" if i % 2 else "absent": {labels[(i + 1) % len(labels)]: 1000 + 250 * (i % 8)},
+            "dedup_ms": 5000,
+        }) for i in range(n))
+
+    def _best(self, fn, labels, repeat):
+        best, out = None, None
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            out = fn(labels)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        return best, out
+
+    def handle(self, *args, **opts):
+        for seed in range(opts["seeds"]):
+            labels = synthetic_labels(opts["hours"], opts["step_ms"], seed)
+            n_ts = len({l["Timestamp"] for l in labels})
+
+            t_new, out = self._best(detect_events, labels, opts["repeat"])
+            line = (f"seed {seed}: {len(labels)} labels / {n_ts} timestamps, {len(out)} eventos | "
+                    f"reglas {t_new*1000:.1f} ms")
+
+            if opts["extra_rules"]:
+                bigger = RuleSet(DEFAULT_RULES + self._extra_rules(opts["extra_rules"]))
+                t_big, out_big = self._best(lambda l: detect_events(l, bigger), labels, opts["repeat"])
+                if [e for e in out_big if e["type"] in {r.type for r in DEFAULT_RULES}] != out:
+                    raise CommandError(f"seed {seed}: las reglas extra cambiaron los eventos base")
+                line += f", con {len(bigger.rules)} reglas {t_big*1000:.1f} ms"
+            if not opts["skip_reference"]:
+                t_ref, ref = self._best(detect_events_reference, labels, 1)
+                if ref != out:
+                    raise CommandError(f"seed {seed}: salida distinta a la versión anterior")
+                line += f" | anterior {t_ref*1000:.0f} ms ({t_ref/t_new:.0f}x)"
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS("salida idéntica en todas las líneas de tiempo"))
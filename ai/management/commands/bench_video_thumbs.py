@@ -0,0 +1,110 @@
+# ai/management/commands/bench_video_thumbs.py
+import os, random, shutil, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.services.video_service import THUMB_UPLOAD_WORKERS, extract_frames
+
+
+def _synthetic_video(seconds: int, fps: int = 25) -> str:
+    """mp4 de prueba (640x360) con contenido que cambia en cada cuadro."""
+    import cv2
+    import numpy as np
+    fd, path = tempfile.mkstemp(suffix=".mp4")
+    os.close(fd)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (640, 360))
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)
+    for i in range(seconds * fps):
+        frame = np.roll(noise, i * 4, axis=1)
+        cv2.putText(frame, str(i), (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        out.write(frame)
+    out.release()
+    return path
+
+
+def _legacy(path: str, timestamps, upload_s: float) -> int:
+    """Como antes: por cada evento copia el video entero (la descarga), seek, un cuadro, sube."""
+    import cv2
+    n = 0
+    for ts in timestamps:
+        fd, tmp = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp)
+            cap = cv2.VideoCapture(tmp)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(round((ts / 1000.0) * fps)))
+            ok, frame = cap.read()
+            cap.release()
+            if ok:
+                cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
+                time.sleep(upload_s)
+                n += 1
+        finally:
+            os.remove(tmp)
+    return n
+
+
+def _batched(path: str, timestamps, upload_s: float) -> int:
+    """Nuevo: una copia, una pasada ordenada, subidas en paralelo."""
+    fd, tmp = tempfile.mkstemp(suffix=".mp4")
+    os.close(fd)
+    try:
+        shutil.copyfile(path, tmp)
+        frames = extract_frames(tmp, timestamps)
+    finally:
+        os.remove(tmp)
+    with ThreadPoolExecutor(max_workers=max(1, min(THUMB_UPLOAD_WORKERS, len(frames) or 1))) as pool:
+        list(pool.map(lambda _d: time.sleep(upload_s), frames.values()))
+    return len(frames)
+
+
+class Command(BaseCommand):
+    help = ("Mide extracción de thumbnails de eventos: por evento (descarga + seek cada vez) vs una pasada "
+            "(una descarga, lectura ordenada, subidas en paralelo). La descarga se simula copiando el archivo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("video", nargs="?", help="mp4 local (si no, --synthetic)")
+        parser.add_argument("--synthetic", type=int, default=60, help="segundos del video de prueba")
+        parser.add_argument("--events", type=int, default=30)
+        parser.add_argument("--upload-ms", type=float, default=40.0, help="latencia simulada de put_object")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        try:
+            import cv2
+        except ImportError:
+            raise CommandError("Se requiere opencv (cv2) para este benchmark")
+
+        path, synthetic = opts["video"], False
+        if not path:
+            path, synthetic = _synthetic_video(opts["synthetic"]), True
+        try:
+            cap = cv2.VideoCapture(path)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            duration_ms = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps * 1000)
+            cap.release()
+            rnd = random.Random(opts["seed"])
+            timestamps = [rnd.randrange(0, max(1, duration_ms - 1000)) for _ in range(opts["events"])]
+            self.stdout.write(f"{os.path.basename(path)}: {os.path.getsize(path)/1e6:.1f} MB, "
+                              f"{duration_ms/1000:.0f} s, {len(timestamps)} eventos")
+
+            upload_s = opts["upload_ms"] / 1000.0
+            for label, fn in (("por evento", _legacy), ("una pasada", _batched)):
+                t0 = time.perf_counter()
+                n = fn(path, timestamps, upload_s)
+                dt = time.perf_counter() - t0
+                self.stdout.write(f"{label}: {n} thumbs en {dt*1000:.0f} ms ({n/dt:.1f} thumbs/s)")
+
+            t0 = time.perf_counter()
+            frames = extract_frames(path, timestamps)
+            dt = time.perf_counter() - t0
+            self.stdout.write(self.style.SUCCESS(
+                f"solo extracción (sin copia ni subida): {len(frames)} cuadros en {dt*1000:.0f} ms "
+                f"({len(frames)/dt:.1f} cuadros/s)"
+            ))
+        finally:
+            if synthetic:
+                os.remove(path)
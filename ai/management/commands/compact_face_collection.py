@@ -0,0 +1,30 @@
+# ai/management/commands/compact_face_collection.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from ai.services.face_service import COLLECTION, VISITOR_COLLECTION, compact_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra de la colección de Rekognition rostros obsoletos (re-enrolamientos), huérfanos "
+        "(usuario inexistente) y de usuarios revocados, en lotes de delete_faces."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", action="append", help="repetible; por defecto residentes y visitantes")
+        parser.add_argument("--dry-run", action="store_true", help="solo contar, no borrar")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **opts):
+        for col in opts["collection"] or [COLLECTION, VISITOR_COLLECTION]:
+            m = compact_collection(col, dry_run=opts["dry_run"])
+            if opts["json"]:
+                self.stdout.write(json.dumps(m))
+                continue
+            self.stdout.write(
+                f"[{col}] antes={m['faces_before']} después={m['faces_after']} borradas={m['deleted']} "
+                f"(viejas={m['superseded']} huérfanas={m['orphaned']} revocadas={m['revoked']}) "
+                f"lotes={m['batches']} {m['seconds']}s{' [dry-run]' if m['dry_run'] else ''}"
+            )
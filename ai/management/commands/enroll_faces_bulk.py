@@ -0,0 +1,51 @@
+# ai/management/commands/enroll_faces_bulk.py
+import csv, json, os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.services.face_service import enroll_faces_bulk, items_from_zip, FACE_BULK_WORKERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Enrola rostros en lote. Fuente: --zip (imágenes <user_id>.jpg o manifest.csv interno) "
+        "o --manifest CSV con columnas user_id,path (rutas relativas al CSV)."
+    )
+
+    def add_arguments(self, parser):
+        src = parser.add_mutually_exclusive_group(required=True)
+        src.add_argument("--zip")
+        src.add_argument("--manifest")
+        parser.add_argument("--workers", type=int, default=FACE_BULK_WORKERS)
+        parser.add_argument("--visitor", action="store_true", help="usar prefijo S3 de visitantes")
+        parser.add_argument("--json", action="store_true", help="imprimir resultados por item en JSON")
+
+    def handle(self, *args, **opts):
+        if opts["zip"]:
+            with open(opts["zip"], "rb") as fh:
+                items = items_from_zip(fh)
+        else:
+            base = os.path.dirname(os.path.abspath(opts["manifest"]))
+            items = []
+            with open(opts["manifest"], newline="", encoding="utf-8-sig") as fh:
+                for row in csv.DictReader(fh):
+                    uid, path = (row.get("user_id") or "").strip(), (row.get("path") or "").strip()
+                    if uid and path:
+                        items.append((uid, os.path.join(base, path)))
+            for uid, path in items:
+                if not os.path.isfile(path):
+                    raise CommandError(f"No existe la imagen de user_id={uid}: {path}")
+
+        if not items:
+            raise CommandError("No hay imágenes para enrolar")
+
+        results = enroll_faces_bulk(items, is_visitor=opts["visitor"], max_workers=opts["workers"])
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2, default=str))
+        else:
+            for r in results:
+                if not r.get("ok"):
+                    self.stdout.write(self.style.WARNING(f"user={r.get('user_id')}: {r.get('error')}"))
+        ok = sum(1 for r in results if r.get("ok"))
+        self.stdout.write(self.style.SUCCESS(f"enrolados {ok}/{len(results)}"))
@@ -0,0 +1,81 @@
+# ai/management/commands/loadtest_login.py
+import math, statistics, time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+PATHS = {
+    ("face", "sync"):     "/api/ai/face/login/",
+    ("face", "async"):    "/api/ai/face/login/async/",
+    ("visitor", "sync"):  "/api/ai/visitor/login/",
+    ("visitor", "async"): "/api/ai/visitor/login/async/",
+}
+
+
+def _pct(values, p):
+    s = sorted(values)
+    return s[max(0, math.ceil(p * len(s)) - 1)]
+
+
+class Command(BaseCommand):
+    help = ("Carga concurrente contra el login facial sync vs async de un servidor en marcha "
+            "(ej. gunicorn -k uvicorn.workers.UvicornWorker backend.asgi). Reporta throughput y latencias.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("image", help="foto de login (se envía en cada request)")
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--kind", choices=["face", "visitor"], default="face")
+        parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def _run(self, url, data, n, concurrency, timeout):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def one(_):
+            t0 = time.perf_counter()
+            try:
+                r = session.post(url, files={"file": ("login.jpg", data, "image/jpeg")}, timeout=timeout)
+                code = r.status_code
+            except requests.RequestException:
+                code = 0
+            return code, time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(n)))
+        wall = time.perf_counter() - t0
+
+        codes = {}
+        for code, _ in results:
+            codes[code] = codes.get(code, 0) + 1
+        lat = [dt for _, dt in results]
+        return {
+            "rps": n / wall if wall else 0.0,
+            "p50": statistics.median(lat),
+            "p95": _pct(lat, 0.95),
+            "max": max(lat),
+            "codes": dict(sorted(codes.items())),
+        }
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["image"], "rb") as fh:
+                data = fh.read()
+        except OSError as e:
+            raise CommandError(str(e))
+
+        modes = ["sync", "async"] if opts["mode"] == "both" else [opts["mode"]]
+        base = opts["base_url"].rstrip("/")
+        for mode in modes:
+            url = base + PATHS[(opts["kind"], mode)]
+            r = self._run(url, data, opts["requests"], opts["concurrency"], opts["timeout"])
+            self.stdout.write(self.style.SUCCESS(
+                f"{mode:5s} {url}: {r['rps']:.1f} req/s  p50 {r['p50']*1000:.0f} ms  "
+                f"p95 {r['p95']*1000:.0f} ms  max {r['max']*1000:.0f} ms  códigos {r['codes']}"
+            ))
@@ -0,0 +1,93 @@
+# ai/management/commands/loadtest_visitor_register.py
+import math, statistics, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+PATH = "/api/ai/visitor/register/"
+
+
+def _pct(values, p):
+    s = sorted(values)
+    return s[max(0, math.ceil(p * len(s)) - 1)]
+
+
+def _server_timing(header: str) -> dict:
+    """'db.tx;dur=3.1, total;dur=820.4' -> {'db.tx': 3.1, 'total': 820.4}"""
+    out = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            k, _, v = param.strip().partition("=")
+            if k == "dur":
+                try:
+                    out[name] = float(v)
+                except ValueError:
+                    pass
+    return out
+
+
+class Command(BaseCommand):
+    help = (
+        "Ráfaga de registros de visitantes contra un servidor en marcha. Reporta, por registro, "
+        "cuánto tiempo estuvo abierta la transacción (db.tx, del header Server-Timing) frente al "
+        "tiempo total del request. OJO: crea visitantes reales (y los enrola)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("image", help="foto de rostro (se envía en cada request)")
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--timeout", type=float, default=60.0)
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["image"], "rb") as fh:
+                data = fh.read()
+        except OSError as e:
+            raise CommandError(str(e))
+
+        url = opts["base_url"].rstrip("/") + PATH
+        concurrency = opts["concurrency"]
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def one(i):
+            t0 = time.perf_counter()
+            try:
+                r = session.post(
+                    url,
+                    data={"first_name": "Carga", "last_name": f"{i}-{uuid.uuid4().hex[:6]}"},
+                    files={"file": ("face.jpg", data, "image/jpeg")},
+                    timeout=opts["timeout"],
+                )
+                return r.status_code, time.perf_counter() - t0, _server_timing(r.headers.get("Server-Timing", ""))
+            except requests.RequestException:
+                return 0, time.perf_counter() - t0, {}
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(opts["requests"])))
+        wall = time.perf_counter() - t0
+
+        codes = {}
+        for code, _, _ in results:
+            codes[code] = codes.get(code, 0) + 1
+        lat = [dt * 1000 for _, dt, _ in results]
+        tx = [st["db.tx"] for _, _, st in results if "db.tx" in st]
+        total = [st["total"] for _, _, st in results if "total" in st]
+
+        self.stdout.write(f"{len(results)} registros en {wall:.1f}s ({len(results)/wall:.1f} req/s)  códigos {dict(sorted(codes.items()))}")
+        self.stdout.write(f"cliente:  p50 {statistics.median(lat):.0f} ms  p95 {_pct(lat, 0.95):.0f} ms")
+        if not tx:
+            self.stdout.write(self.style.WARNING("Sin db.tx en Server-Timing (¿ServerTimingMiddleware activo?)"))
+            return
+        held = sum(tx) / sum(total) * 100 if total else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"transacción abierta (db.tx): p50 {statistics.median(tx):.1f} ms  p95 {_pct(tx, 0.95):.1f} ms  "
+            f"max {max(tx):.1f} ms  = {held:.1f}% del tiempo de servidor"
+        ))
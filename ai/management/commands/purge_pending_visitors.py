@@ -0,0 +1,24 @@
+# ai/management/commands/purge_pending_visitors.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from ai.services.visitor_service import purge_pending_visitors
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra visitantes que quedaron en 'pending' (registro cuya compensación no llegó a correr: "
+        "usuario creado en la fase 1 sin rostro enrolado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=30, help="minutos (default 30)")
+        parser.add_argument("--dry-run", action="store_true", help="solo contar, no borrar")
+
+    def handle(self, *args, **opts):
+        r = purge_pending_visitors(timedelta(minutes=opts["older_than"]), dry_run=opts["dry_run"])
+        self.stdout.write(
+            f"pendientes={r['pending']} borrados={r['deleted']} ids={r['user_ids']}"
+            f"{' [dry-run]' if r['dry_run'] else ''}"
+        )
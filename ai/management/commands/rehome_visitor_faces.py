@@ -0,0 +1,80 @@
+# ai/management/commands/rehome_visitor_faces.py
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError
+
+from ai.models import UserFace
+from ai.services.face_service import (
+    BUCKET, COLLECTION, VISITOR_COLLECTION, FACE_BULK_WORKERS,
+    RekognitionBackend, _ensure_collection,
+)
+from ai.services.login_service import VISITOR_ROLE_NAMES
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los rostros de visitantes de la colección de residentes a la de visitantes: "
+        "re-indexa desde la imagen de enrolamiento en S3, borra la cara vieja y actualiza ai_userface."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--workers", type=int, default=FACE_BULK_WORKERS)
+        parser.add_argument("--limit", type=int, default=0, help="0 = todos")
+
+    def handle(self, *args, **opts):
+        qs = (UserFace.objects
+              .filter(collection_id=COLLECTION, user__role__name__in=VISITOR_ROLE_NAMES)
+              .exclude(status="revoked")
+              .select_related("user")
+              .order_by("id"))
+        if opts["limit"]:
+            qs = qs[:opts["limit"]]
+        rows = list(qs)
+        no_image = [r for r in rows if not r.s3_key]
+        rows = [r for r in rows if r.s3_key]
+        self.stdout.write(f"visitantes en {COLLECTION}: {len(rows) + len(no_image)} (sin imagen en S3: {len(no_image)})")
+        for r in no_image:
+            self.stdout.write(self.style.WARNING(f"  sin s3_key, se omite: user={r.user_id}"))
+        if opts["dry_run"] or not rows:
+            return
+
+        backend = RekognitionBackend()
+        _ensure_collection(VISITOR_COLLECTION)
+
+        def index(row):
+            resp = backend.index_from_s3(VISITOR_COLLECTION, row.user_id, row.s3_key)
+            recs = resp.get("FaceRecords", [])
+            return row, (recs[0]["Face"]["FaceId"] if recs else None)
+
+        moved, failed, old_ids = 0, 0, []
+        with ThreadPoolExecutor(max_workers=opts["workers"]) as pool:
+            for fut in [pool.submit(index, r) for r in rows]:
+                try:
+                    row, new_face_id = fut.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f"  error indexando: {e}"))
+                    continue
+                if not new_face_id:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"  sin rostro detectable: user={row.user_id}"))
+                    continue
+                old_face_id = row.face_id
+                row.collection_id, row.face_id, row.status = VISITOR_COLLECTION, new_face_id, "registered"
+                try:
+                    row.save(update_fields=["collection_id", "face_id", "status", "updated_at"])
+                except IntegrityError:
+                    # ya tenía fila en la colección de visitantes: se actualiza esa y se borra la vieja
+                    UserFace.objects.filter(user_id=row.user_id, collection_id=VISITOR_COLLECTION).update(
+                        face_id=new_face_id, s3_key=row.s3_key, status="registered")
+                    UserFace.objects.filter(pk=row.pk).delete()
+                if old_face_id:
+                    old_ids.append(old_face_id)
+                moved += 1
+
+        deleted = backend.delete_faces(COLLECTION, old_ids) if old_ids else []
+        self.stdout.write(self.style.SUCCESS(
+            f"movidos={moved} fallidos={failed} caras borradas de {COLLECTION}={len(deleted)} (bucket {BUCKET})"
+        ))
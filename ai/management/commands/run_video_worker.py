@@ -0,0 +1,63 @@
+# ai/management/commands/run_video_worker.py
+import signal, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from ai.services.video_jobs import VIDEO_JOB_CONCURRENCY, claim_next, requeue_stale, run_claimed
+
+STALE_CHECK_S = 60
+
+
+class Command(BaseCommand):
+    help = "Procesa los VideoJob en cola con paralelismo acotado (Ctrl+C / SIGTERM termina los que están en curso)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=VIDEO_JOB_CONCURRENCY)
+        parser.add_argument("--poll", type=float, default=2.0, help="segundos entre consultas si la cola está vacía")
+        parser.add_argument("--once", action="store_true", help="vaciar la cola y salir")
+
+    def handle(self, *args, **opts):
+        conc = max(1, opts["concurrency"])
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        n = requeue_stale()
+        if n:
+            self.stdout.write(f"{n} jobs abandonados re-encolados")
+        self.stdout.write(f"video worker: concurrencia {conc}")
+
+        done = 0
+        last_stale = time.monotonic()
+        inflight = {}
+        with ThreadPoolExecutor(max_workers=conc, thread_name_prefix="video-job") as pool:
+            while not stop.is_set():
+                for fut in [f for f in inflight if f.done()]:
+                    job_id = inflight.pop(fut)
+                    status = fut.result() if fut.exception() is None else f"error: {fut.exception()}"
+                    self.stdout.write(f"job {job_id}: {status}")
+                    done += 1
+
+                claimed = False
+                while len(inflight) < conc:
+                    job_id = claim_next()
+                    if job_id is None:
+                        break
+                    inflight[pool.submit(run_claimed, job_id)] = job_id
+                    claimed = True
+
+                if opts["once"] and not inflight and not claimed:
+                    break
+                if time.monotonic() - last_stale > STALE_CHECK_S:
+                    requeue_stale()
+                    last_stale = time.monotonic()
+                if len(inflight) >= conc or (inflight and not claimed):
+                    wait(list(inflight), timeout=opts["poll"], return_when=FIRST_COMPLETED)
+                elif not claimed:
+                    stop.wait(opts["poll"])
+
+            if inflight:
+                self.stdout.write(f"esperando {len(inflight)} jobs en curso...")
+        done += len(inflight)
+        self.stdout.write(self.style.SUCCESS(f"video worker detenido ({done} jobs procesados)"))
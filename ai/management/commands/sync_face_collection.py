@@ -0,0 +1,38 @@
+# ai/management/commands/sync_face_collection.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ai.services.face_service import COLLECTION, VISITOR_COLLECTION
+from ai.services.face_sync import sync_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Sincroniza la colección de Rekognition hacia ai_userface y guarda un reporte de drift. "
+        "Con --loop queda corriendo como job periódico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", action="append", help="repetible; por defecto residentes y visitantes")
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument("--interval", type=int, default=300, help="segundos entre corridas con --loop")
+
+    def handle(self, *args, **opts):
+        collections = opts["collection"] or [COLLECTION, VISITOR_COLLECTION]
+        while True:
+            for col in collections:
+                try:
+                    r = sync_collection(col)
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f"[{col}] error: {e}"))
+                    continue
+                self.stdout.write(
+                    f"[{col}] caras={r.collection_faces} filas={r.db_rows} nuevas={r.created} "
+                    f"corregidas={r.updated} faltantes={r.missing} huérfanas={r.orphaned} viejas={r.superseded}"
+                )
+            if not opts["loop"]:
+                break
+            close_old_connections()
+            time.sleep(opts["interval"])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0010_visitorsession_delete_visitorevent_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userface',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
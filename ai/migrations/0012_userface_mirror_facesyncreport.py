@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0011_userface_embedding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceSyncReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection_id', models.CharField(db_index=True, max_length=128)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+                ('collection_faces', models.IntegerField(default=0)),
+                ('db_rows', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('updated', models.IntegerField(default=0)),
+                ('missing', models.IntegerField(default=0)),
+                ('orphaned', models.IntegerField(default=0)),
+                ('superseded', models.IntegerField(default=0)),
+                ('details', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'db_table': 'ai_face_sync_report',
+                'ordering': ['-finished_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='userface',
+            name='face_id',
+            field=models.CharField(blank=True, db_index=True, max_length=128, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='userface',
+            index=models.Index(fields=['collection_id', 'status'], name='ai_userface_collect_f507f7_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0012_userface_mirror_facesyncreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistryVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'ai_registry_version',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0013_registryversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('s3_video_key', models.CharField(max_length=512)),
+                ('camera_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('status', models.CharField(choices=[('queued', 'En cola'), ('running', 'Procesando'), ('succeeded', 'Terminado'), ('failed', 'Falló')], default='queued', max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('rekognition_job_id', models.CharField(blank=True, db_index=True, max_length=128, null=True)),
+                ('worker', models.CharField(blank=True, default='', max_length=128)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'ai_video_job',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='ai_video_jo_status_0e0302_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alerts', to='ai.videojob'),
+        ),
+    ]
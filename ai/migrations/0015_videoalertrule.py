@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0014_videojob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoAlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('camera_id', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('type', models.CharField(choices=[('dog_loose', 'Perro suelto'), ('dog_waste', 'Perro haciendo necesidades'), ('bad_parking', 'Vehículo mal estacionado')], max_length=32)),
+                ('spec', models.JSONField(default=dict)),
+                ('enabled', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'ai_video_alert_rule',
+            },
+        ),
+    ]
@@ -1,5 +1,8 @@
-from .face import UserFace
+from .face import UserFace, FaceSyncReport
 # ai/models/__init__.py
 from .plate import Plate
+from .registry_version import RegistryVersion
 from .alert import Alert
+from .video_job import VideoJob
+from .video_alert_rule import VideoAlertRule
 from .visitor_session import VisitorSession  # noqa# <- añade esta línea
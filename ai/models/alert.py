@@ -13,6 +13,7 @@ class Alert(models.Model):
     timestamp_ms = models.BigIntegerField()  # milisegundos dentro del video
     confidence = models.FloatField(default=0.0)
     extra = models.JSONField(default=dict, blank=True)
+    job = models.ForeignKey("ai.VideoJob", on_delete=models.SET_NULL, blank=True, null=True, related_name="alerts")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
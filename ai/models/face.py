@@ -5,16 +5,40 @@ from django.conf import settings
 class UserFace(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="faces")
     external_image_id = models.CharField(max_length=128, db_index=True)  # ej: str(user.id)
-    face_id = models.CharField(max_length=128, blank=True, null=True)    # FaceId de Rekognition
+    face_id = models.CharField(max_length=128, blank=True, null=True, db_index=True)  # FaceId de Rekognition
     collection_id = models.CharField(max_length=128)
     s3_key = models.CharField(max_length=512, blank=True, null=True)     # faces/enroll/xxxx.jpg
     status = models.CharField(max_length=32, default="registered")
+    embedding = models.BinaryField(blank=True, null=True)                # float32[] para el motor local
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "ai_userface"
         unique_together = ("user", "collection_id")
+        indexes = [models.Index(fields=["collection_id", "status"])]
 
     def __str__(self):
         return f"{self.user_id} -> {self.external_image_id} ({self.collection_id})"
+
+
+class FaceSyncReport(models.Model):
+    """Resultado de cada sincronización colección Rekognition -> ai_userface (reporte de drift)."""
+    collection_id = models.CharField(max_length=128, db_index=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(auto_now_add=True)
+    collection_faces = models.IntegerField(default=0)   # caras en la colección
+    db_rows = models.IntegerField(default=0)            # filas registered en BD tras el sync
+    created = models.IntegerField(default=0)            # filas nuevas (caras sin fila)
+    updated = models.IntegerField(default=0)            # filas corregidas (face_id/status)
+    missing = models.IntegerField(default=0)            # filas cuya cara ya no está en la colección
+    orphaned = models.IntegerField(default=0)           # caras sin usuario válido
+    superseded = models.IntegerField(default=0)         # caras viejas de un usuario ya enrolado
+    details = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        db_table = "ai_face_sync_report"
+        ordering = ["-finished_at"]
+
+    def __str__(self):
+        return f"sync {self.collection_id} @ {self.finished_at:%Y-%m-%d %H:%M}"
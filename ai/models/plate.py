@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 class Plate(models.Model):
     number = models.CharField(max_length=20, db_index=True)   # no unique si quieres varias por usuario
@@ -11,3 +13,15 @@ class Plate(models.Model):
 
     def __str__(self):
         return f"{self.number} -> {self.user_id}"
+
+
+# ---- Señales: mantener el registro en memoria de placas (ai/services/plate_registry.py) ----
+@receiver(post_save, sender=Plate)
+def _on_plate_saved(sender, instance, created, **kwargs):
+    from ai.services.plate_registry import on_plate_changed
+    on_plate_changed(instance.number, instance.user_id, True, reload=not created)
+
+@receiver(post_delete, sender=Plate)
+def _on_plate_deleted(sender, instance, **kwargs):
+    from ai.services.plate_registry import on_plate_changed
+    on_plate_changed(instance.number, instance.user_id, False)
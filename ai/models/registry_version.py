@@ -0,0 +1,19 @@
+# ai/models/registry_version.py
+from django.db import models
+
+
+class RegistryVersion(models.Model):
+    """
+    Sello de versión de un registro en memoria (p. ej. "plates").
+    Cada escritura lo incrementa; los workers lo consultan cada pocos
+    segundos y recargan su copia si cambió.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "ai_registry_version"
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
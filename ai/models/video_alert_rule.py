@@ -0,0 +1,71 @@
+# ai/models/video_alert_rule.py
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ai.models.alert import Alert
+
+
+class VideoAlertRule(models.Model):
+    """
+    Regla de alerta de video para una cámara (camera_id vacío = global).
+    `type` tiene que ser uno de Alert.TYPE_CHOICES (un tipo nuevo se agrega ahí).
+    `spec` usa el formato de ai/services/video_rules.py (sin "type"):
+        {"all": ["Dog"], "absent": {"Person": 2000}, "confidence": 90, "dedup_ms": 3000}
+    """
+    camera_id = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    type = models.CharField(max_length=32, choices=Alert.TYPE_CHOICES)
+    spec = models.JSONField(default=dict)
+    enabled = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "ai_video_alert_rule"
+
+    def clean(self):
+        from ai.services.video_rules import AlertRule
+        if self.type not in dict(Alert.TYPE_CHOICES):
+            raise ValidationError({"type": f"Tipo de alerta desconocido: {self.type!r} (ver Alert.TYPE_CHOICES)"})
+        try:
+            rule = AlertRule.from_dict({**(self.spec or {}), "type": self.type})
+        except (TypeError, ValueError) as e:
+            raise ValidationError({"spec": str(e)})
+        if self.enabled:
+            self._check_dedup(rule)
+
+    def _check_dedup(self, rule):
+        """El dedup es por tipo y cámara: otra regla activa del mismo tipo no puede usar otro dedup_ms."""
+        from ai.services.video_rules import AlertRule
+        same_camera = (models.Q(camera_id=self.camera_id) if self.camera_id
+                       else models.Q(camera_id__isnull=True) | models.Q(camera_id=""))
+        siblings = (VideoAlertRule.objects.filter(same_camera, type=self.type, enabled=True)
+                    .exclude(pk=self.pk).values_list("spec", flat=True))
+        for spec in siblings:
+            try:
+                other = AlertRule.from_dict({**(spec or {}), "type": self.type})
+            except (TypeError, ValueError):
+                continue
+            if other.dedup_ms != rule.dedup_ms:
+                raise ValidationError({"spec": f"dedup_ms {rule.dedup_ms} distinto del de otra regla "
+                                               f"'{self.type}' de la cámara ({other.dedup_ms})"})
+
+    def save(self, *args, **kwargs):
+        # también desde código/shell, no solo desde el admin: una regla inválida no llega a la BD
+        self.clean()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.type} @ {self.camera_id or '*'}"
+
+
+# ---- Señales: invalidar las reglas cacheadas (ai/services/video_rules.py) ----
+@receiver(post_save, sender=VideoAlertRule)
+def _on_rule_saved(sender, instance, **kwargs):
+    from ai.services.video_rules import invalidate_rules
+    transaction.on_commit(invalidate_rules)
+
+@receiver(post_delete, sender=VideoAlertRule)
+def _on_rule_deleted(sender, instance, **kwargs):
+    from ai.services.video_rules import invalidate_rules
+    transaction.on_commit(invalidate_rules)
@@ -0,0 +1,34 @@
+# ai/models/video_job.py
+from django.db import models
+
+
+class VideoJob(models.Model):
+    """
+    Análisis de un video subido (Rekognition label detection -> Alert).
+    La vista solo sube y encola; lo procesa `run_video_worker` (o el pool
+    en proceso, ver ai/services/video_jobs.py).
+    """
+    QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "En cola"),
+        (RUNNING, "Procesando"),
+        (SUCCEEDED, "Terminado"),
+        (FAILED, "Falló"),
+    ]
+    s3_video_key = models.CharField(max_length=512)
+    camera_id = models.CharField(max_length=64, blank=True, null=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    rekognition_job_id = models.CharField(max_length=128, blank=True, null=True, db_index=True)
+    worker = models.CharField(max_length=128, blank=True, default="")   # quién lo tomó (host:pid)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "ai_video_job"
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"video job {self.pk} ({self.status})"
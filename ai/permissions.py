@@ -0,0 +1,15 @@
+# ai/permissions.py
+from rest_framework import permissions
+
+ADMIN_ROLE_NAMES = ("administrador", "administrator", "admin")
+
+
+class IsAdminRole(permissions.BasePermission):
+    """Usuario autenticado con rol de administrador (tabla role)."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        role = getattr(user, "role", None)
+        return bool(role and str(getattr(role, "name", "")).lower() in ADMIN_ROLE_NAMES)
@@ -28,14 +28,15 @@ class PlateSerializer(serializers.ModelSerializer):
 
 
 
-import os, boto3
+import os
 from rest_framework import serializers
 from ai.models.alert import Alert
+from ai.models.video_job import VideoJob
+from ai.services.aws_clients import get_client
 
 REGION        = os.getenv("AWS_REGION", "us-east-1")
 INPUT_BUCKET  = os.getenv("AWS_STORAGE_BUCKET_NAME", "").strip()
 OUTPUT_BUCKET = (os.getenv("ALERTS_BUCKET", "").strip() or INPUT_BUCKET)
-_s3 = boto3.client("s3", region_name=REGION)
 
 class AlertSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
@@ -57,7 +58,7 @@ class AlertSerializer(serializers.ModelSerializer):
         }.get(obj.type, obj.type)
 
     def _presign(self, bucket: str, key: str) -> str:
-        return _s3.generate_presigned_url(
+        return get_client("s3", REGION).generate_presigned_url(
             "get_object",
             Params={"Bucket": bucket, "Key": key},
             ExpiresIn=3600,
@@ -77,6 +78,23 @@ class AlertSerializer(serializers.ModelSerializer):
             return None
 
 
+class VideoJobSerializer(serializers.ModelSerializer):
+    video_key = serializers.CharField(source="s3_video_key")
+    events = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VideoJob
+        fields = [
+            "id","status","camera_id","video_key","attempts","error",
+            "created_at","started_at","finished_at","events"
+        ]
+
+    def get_events(self, obj: VideoJob):
+        if obj.status != VideoJob.SUCCEEDED:
+            return []
+        return AlertSerializer(obj.alerts.order_by("timestamp_ms"), many=True).data
+
+
 
 from rest_framework import serializers
 
@@ -0,0 +1,71 @@
+# ai/services/aws_clients.py
+"""
+Registro único (por proceso) de clientes boto3 para todo el módulo AI.
+
+- Los clientes se crean de forma perezosa la primera vez que se piden.
+- Un solo cliente por servicio/región: boto3 los permite compartir entre hilos.
+- Pool HTTP, reintentos y timeouts configurables por env.
+"""
+from __future__ import annotations
+import os, threading
+from typing import Any, Dict, Tuple
+
+import boto3
+from botocore.config import Config
+
+def _getenv(name: str, default: str = "") -> str:
+    return os.getenv(name, default).strip()
+
+AWS_REGION          = _getenv("AWS_REGION", "us-east-1")
+AWS_MAX_POOL        = int(_getenv("AWS_MAX_POOL_CONNECTIONS", "32"))
+AWS_MAX_ATTEMPTS    = int(_getenv("AWS_MAX_ATTEMPTS", "3"))
+AWS_RETRY_MODE      = _getenv("AWS_RETRY_MODE", "standard")   # legacy | standard | adaptive
+AWS_CONNECT_TIMEOUT = float(_getenv("AWS_CONNECT_TIMEOUT", "3"))
+AWS_READ_TIMEOUT    = float(_getenv("AWS_READ_TIMEOUT", "20"))
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+
+def client_config() -> Config:
+    return Config(
+        max_pool_connections=AWS_MAX_POOL,
+        retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": AWS_RETRY_MODE},
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+    )
+
+
+def get_client(service: str, region: str | None = None):
+    """Retorna el cliente compartido de `service` (lo crea si aún no existe)."""
+    region = region or AWS_REGION
+    k = (service, region)
+    c = _clients.get(k)
+    if c is not None:
+        return c
+    with _lock:
+        c = _clients.get(k)
+        if c is None:
+            # Sin credenciales en env -> cadena por defecto de boto3 (rol, ~/.aws, ...)
+            session = boto3.session.Session(
+                aws_access_key_id=_getenv("AWS_ACCESS_KEY_ID") or None,
+                aws_secret_access_key=_getenv("AWS_SECRET_ACCESS_KEY") or None,
+                region_name=region,
+            )
+            c = session.client(service, config=client_config())
+            _clients[k] = c
+    return c
+
+
+def s3():
+    return get_client("s3")
+
+
+def rekognition():
+    return get_client("rekognition")
+
+
+def reset_clients() -> None:
+    """Descarta los clientes cacheados (p.ej. tras rotar credenciales)."""
+    with _lock:
+        _clients.clear()
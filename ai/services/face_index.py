@@ -0,0 +1,210 @@
+# ai/services/face_index.py
+"""
+Índice vectorial en memoria para el motor local de reconocimiento facial.
+
+- Un índice por colección, construido desde ai_userface (columna `embedding`).
+- Búsqueda top-k por similitud coseno con NumPy (vectores normalizados).
+- Se actualiza en el proceso con cada enrolamiento y, cada
+  FACE_LOCAL_REFRESH_S segundos, relee solo las filas modificadas
+  (para ver lo que enrolaron otros workers).
+
+Requiere numpy y un embedder (ver `get_embedder`), que no están en
+requirements.txt: `pip install -r requirements-face-local.txt`. Se importa
+solo si FACE_MATCH_BACKEND=local, y LocalBackend lo verifica al arrancar.
+"""
+from __future__ import annotations
+import os, time, threading, importlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ai.models import UserFace
+
+FACE_LOCAL_REFRESH_S = float(os.getenv("FACE_LOCAL_REFRESH_S", "30"))
+FACE_LOCAL_EMBEDDER  = os.getenv("FACE_LOCAL_EMBEDDER", "").strip()   # "paquete.modulo:funcion"
+EMBEDDING_DTYPE      = np.float32
+
+
+# ---------------------------
+# Embeddings
+# ---------------------------
+def _face_recognition_embedder(data: bytes) -> Optional[np.ndarray]:
+    """Embedder por defecto: dlib vía `face_recognition` (128-d). Import perezoso."""
+    import io
+    import face_recognition  # type: ignore
+
+    img = face_recognition.load_image_file(io.BytesIO(data))
+    encs = face_recognition.face_encodings(img, num_jitters=1)
+    return np.asarray(encs[0], dtype=EMBEDDING_DTYPE) if encs else None
+
+_embedder: Optional[Callable[[bytes], Optional[np.ndarray]]] = None
+
+def get_embedder() -> Callable[[bytes], Optional[np.ndarray]]:
+    """Retorna la función bytes -> vector (o None si no hay rostro)."""
+    global _embedder
+    if _embedder is None:
+        if FACE_LOCAL_EMBEDDER:
+            mod, _, attr = FACE_LOCAL_EMBEDDER.partition(":")
+            _embedder = getattr(importlib.import_module(mod), attr or "embed")
+        else:
+            importlib.import_module("face_recognition")   # que falle acá y no en el primer embed
+            _embedder = _face_recognition_embedder
+    return _embedder
+
+def embed(data: bytes) -> Optional[np.ndarray]:
+    vec = get_embedder()(data)
+    if vec is None:
+        return None
+    return _normalize(np.asarray(vec, dtype=EMBEDDING_DTYPE))
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+def to_bytes(vec: np.ndarray) -> bytes:
+    return np.asarray(vec, dtype=EMBEDDING_DTYPE).tobytes()
+
+def from_bytes(raw: bytes | memoryview) -> np.ndarray:
+    return np.frombuffer(bytes(raw), dtype=EMBEDDING_DTYPE)
+
+
+# ---------------------------
+# Índice
+# ---------------------------
+class FaceIndex:
+    """
+    Matriz (n, d) de embeddings normalizados + lista paralela de external_ids.
+    Las escrituras reemplazan los arrays (copy-on-write), así las búsquedas
+    concurrentes no necesitan lock.
+    """
+
+    def __init__(self, dim: int | None = None):
+        self.dim = dim
+        self._ids: List[str] = []
+        self._face_ids: List[str] = []
+        self._mat = np.zeros((0, dim or 0), dtype=EMBEDDING_DTYPE)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, rows: List[Tuple[str, str, np.ndarray]]) -> None:
+        """Carga completa: rows = [(external_id, face_id, vector)]."""
+        with self._lock:
+            self._ids = [r[0] for r in rows]
+            self._face_ids = [r[1] for r in rows]
+            if rows:
+                self._mat = np.vstack([_normalize(r[2]) for r in rows]).astype(EMBEDDING_DTYPE)
+                self.dim = self._mat.shape[1]
+            else:
+                self._mat = np.zeros((0, self.dim or 0), dtype=EMBEDDING_DTYPE)
+
+    def upsert(self, external_id: str, face_id: str, vec: np.ndarray) -> None:
+        vec = _normalize(np.asarray(vec, dtype=EMBEDDING_DTYPE))
+        with self._lock:
+            ids, fids = list(self._ids), list(self._face_ids)
+            if self.dim is None or not ids:
+                self.dim = vec.shape[0]
+                mat = np.zeros((0, self.dim), dtype=EMBEDDING_DTYPE)
+            else:
+                mat = self._mat
+            if vec.shape[0] != self.dim:
+                raise ValueError(f"Dimensión de embedding {vec.shape[0]} != {self.dim}")
+            try:
+                i = ids.index(external_id)
+                mat = mat.copy()
+                mat[i] = vec
+                fids[i] = face_id
+            except ValueError:
+                mat = np.vstack([mat, vec[None, :]])
+                ids.append(external_id)
+                fids.append(face_id)
+            self._ids, self._face_ids, self._mat = ids, fids, mat
+
+    def remove(self, external_id: str) -> bool:
+        with self._lock:
+            if external_id not in self._ids:
+                return False
+            i = self._ids.index(external_id)
+            self._ids = self._ids[:i] + self._ids[i + 1:]
+            self._face_ids = self._face_ids[:i] + self._face_ids[i + 1:]
+            self._mat = np.delete(self._mat, i, axis=0)
+            return True
+
+    def remove_face_ids(self, face_ids) -> List[str]:
+        """Quita por face_id (revocación/compactación). Retorna los que estaban."""
+        targets = set(face_ids)
+        with self._lock:
+            keep = [i for i, f in enumerate(self._face_ids) if f not in targets]
+            removed = [f for f in self._face_ids if f in targets]
+            if removed:
+                self._ids = [self._ids[i] for i in keep]
+                self._face_ids = [self._face_ids[i] for i in keep]
+                self._mat = self._mat[keep]
+            return removed
+
+    def search(self, vec: np.ndarray, k: int = 5) -> List[Tuple[str, str, float]]:
+        """Top-k por similitud coseno. Retorna [(external_id, face_id, sim 0..1)]."""
+        ids, fids, mat = self._ids, self._face_ids, self._mat
+        if not ids:
+            return []
+        q = _normalize(np.asarray(vec, dtype=EMBEDDING_DTYPE))
+        sims = mat @ q
+        k = min(k, len(ids))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(ids[i], fids[i], float(sims[i])) for i in top]
+
+
+# ---------------------------
+# Registro por colección (sincronizado con BD)
+# ---------------------------
+_indexes: Dict[str, FaceIndex] = {}
+_synced_at: Dict[str, Tuple[float, object]] = {}   # collection -> (monotonic, max updated_at)
+_reg_lock = threading.Lock()
+
+def _rows_qs(collection_id: str):
+    return (UserFace.objects
+            .filter(collection_id=collection_id, embedding__isnull=False)
+            .values_list("external_image_id", "face_id", "embedding", "status", "updated_at"))
+
+def get_index(collection_id: str) -> FaceIndex:
+    """Índice de la colección; lo construye desde BD la primera vez y lo refresca incrementalmente."""
+    idx = _indexes.get(collection_id)
+    if idx is None:
+        with _reg_lock:
+            idx = _indexes.get(collection_id)
+            if idx is None:
+                idx = FaceIndex()
+                rows, last = [], None
+                for ext_id, face_id, emb, st, upd in _rows_qs(collection_id):
+                    if st == "registered":
+                        rows.append((ext_id, face_id or "", from_bytes(emb)))
+                    last = upd if last is None or upd > last else last
+                idx.load(rows)
+                _indexes[collection_id] = idx
+                _synced_at[collection_id] = (time.monotonic(), last)
+        return idx
+
+    ts, last = _synced_at.get(collection_id, (0.0, None))
+    if time.monotonic() - ts >= FACE_LOCAL_REFRESH_S:
+        _refresh(collection_id, idx, last)
+    return idx
+
+def _refresh(collection_id: str, idx: FaceIndex, since) -> None:
+    qs = _rows_qs(collection_id)
+    if since is not None:
+        qs = qs.filter(updated_at__gt=since)
+    last = since
+    for ext_id, face_id, emb, st, upd in qs:
+        if st == "registered":
+            idx.upsert(ext_id, face_id or "", from_bytes(emb))
+        else:
+            idx.remove(ext_id)
+        last = upd if last is None or upd > last else last
+    _synced_at[collection_id] = (time.monotonic(), last)
+
+def reset_indexes() -> None:
+    with _reg_lock:
+        _indexes.clear()
+        _synced_at.clear()
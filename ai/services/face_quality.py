@@ -0,0 +1,199 @@
+# ai/services/face_quality.py
+"""
+Filtro local de calidad para cuadros de login, antes de cualquier llamada a AWS.
+
+Mide (sobre la imagen reducida a QC_ANALYSIS_EDGE para que los umbrales no
+dependan de la resolución):
+- resolución mínima del cuadro original,
+- nitidez: varianza del Laplaciano,
+- exposición: brillo medio y fracción de píxeles saturados (histograma),
+- presencia de rostro (NO_FACE): Haar cascade de OpenCV
+  (opencv-python-headless, en requirements.txt). Si cv2 no se puede
+  usar el chequeo queda apagado y se avisa una vez en el log.
+
+Un cuadro inútil levanta FaceQualityError (code="LOW_QUALITY") en milisegundos.
+
+`select_best_frame` aplica lo mismo a una ráfaga del kiosco y elige el mejor
+cuadro (nitidez y tamaño del rostro) para hacer una sola búsqueda en AWS.
+"""
+from __future__ import annotations
+import io, os, logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageFilter, ImageOps, ImageStat
+
+log = logging.getLogger(__name__)
+
+def _getenv(name: str, default: str = "") -> str:
+    return os.getenv(name, default).strip()
+
+FACE_QC_ENABLED        = _getenv("FACE_QC_ENABLED", "1") not in ("0", "false", "False", "")
+FACE_QC_MIN_WIDTH      = int(_getenv("FACE_QC_MIN_WIDTH", "240"))
+FACE_QC_MIN_HEIGHT     = int(_getenv("FACE_QC_MIN_HEIGHT", "240"))
+FACE_QC_MIN_SHARPNESS  = float(_getenv("FACE_QC_MIN_SHARPNESS", "12"))
+FACE_QC_MIN_BRIGHTNESS = float(_getenv("FACE_QC_MIN_BRIGHTNESS", "40"))
+FACE_QC_MAX_BRIGHTNESS = float(_getenv("FACE_QC_MAX_BRIGHTNESS", "220"))
+FACE_QC_MAX_CLIPPED    = float(_getenv("FACE_QC_MAX_CLIPPED", "0.5"))    # fracción de píxeles <=5 o >=250
+FACE_QC_DETECT_FACE    = _getenv("FACE_QC_DETECT_FACE", "1") not in ("0", "false", "False", "")
+QC_ANALYSIS_EDGE       = 320
+
+LOW_QUALITY = "LOW_QUALITY"
+
+# Laplaciano 3x3; offset 128 para no recortar los valores negativos
+_LAPLACE = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+
+class FaceQualityError(Exception):
+    """Cuadro rechazado localmente. `reason` dice por qué; `metrics` trae las medidas."""
+
+    code = LOW_QUALITY
+
+    def __init__(self, reason: str, metrics: Dict[str, Any]):
+        super().__init__(f"Imagen de baja calidad: {reason}")
+        self.reason = reason
+        self.metrics = metrics
+
+    def as_response(self) -> Dict[str, Any]:
+        return {"ok": False, "recognized": False, "code": self.code, "reason": self.reason, "metrics": self.metrics}
+
+
+def _sharpness(gray: Image.Image) -> float:
+    lap = gray.filter(_LAPLACE)
+    w, h = lap.size
+    # PIL deja el borde de 1px sin filtrar: se descarta
+    if w > 2 and h > 2:
+        lap = lap.crop((1, 1, w - 1, h - 1))
+    return float(ImageStat.Stat(lap).var[0])
+
+def _exposure(gray: Image.Image) -> Dict[str, float]:
+    hist = gray.histogram()
+    total = float(sum(hist)) or 1.0
+    mean = sum(i * c for i, c in enumerate(hist)) / total
+    clipped = (sum(hist[:6]) + sum(hist[250:])) / total
+    return {"brightness": round(mean, 1), "clipped": round(clipped, 3)}
+
+_cascade = None
+_cv2_warned = False
+
+def _face_fraction(gray: Image.Image) -> Optional[float]:
+    """Área del rostro más grande / área del cuadro (0 si no hay) con OpenCV; None sin cv2."""
+    global _cascade, _cv2_warned
+    try:
+        import cv2  # import perezoso
+        import numpy as np
+        if _cascade is None:
+            _cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    except (ImportError, AttributeError) as e:   # AttributeError: build de OpenCV sin objdetect/haar
+        if not _cv2_warned:
+            _cv2_warned = True
+            log.warning("Sin OpenCV utilizable (%s): el chequeo de presencia de rostro (NO_FACE) está apagado", e)
+        return None
+    faces = _cascade.detectMultiScale(np.asarray(gray), scaleFactor=1.1, minNeighbors=4, minSize=(40, 40))
+    if len(faces) == 0:
+        return 0.0
+    w, h = gray.size
+    return max(int(fw) * int(fh) for _x, _y, fw, fh in faces) / float(w * h)
+
+def _has_face(gray: Image.Image) -> Optional[bool]:
+    """True/False con OpenCV; None si cv2 no está disponible (no se evalúa)."""
+    frac = _face_fraction(gray)
+    return None if frac is None else frac > 0
+
+
+def measure(data: bytes) -> Tuple[Dict[str, Any], Image.Image]:
+    """Calcula las métricas de calidad sin decidir. Retorna (métricas, gris reducido)."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        gray = img.convert("L")
+    gray.thumbnail((QC_ANALYSIS_EDGE, QC_ANALYSIS_EDGE))
+    m: Dict[str, Any] = {"width": width, "height": height, "sharpness": round(_sharpness(gray), 1)}
+    m.update(_exposure(gray))
+    return m, gray
+
+
+def check_face_quality(data: bytes) -> Dict[str, Any]:
+    """
+    Valida el cuadro. Retorna las métricas si pasa; si no, levanta FaceQualityError.
+    No hace nada (retorna {}) si FACE_QC_ENABLED=0.
+    """
+    if not FACE_QC_ENABLED:
+        return {}
+    try:
+        m, gray = measure(data)
+    except Exception:
+        raise FaceQualityError("unreadable", {})
+    reason = _reject_reason(m, gray)
+    if reason:
+        raise FaceQualityError(reason, m)
+    return m
+
+
+def _reject_reason(m: Dict[str, Any], gray: Image.Image) -> Optional[str]:
+    """Aplica los umbrales sobre las métricas (y agrega m["face"]/m["face_frac"]). None si pasa."""
+    if m["width"] < FACE_QC_MIN_WIDTH or m["height"] < FACE_QC_MIN_HEIGHT:
+        return "low_resolution"
+    if m["brightness"] < FACE_QC_MIN_BRIGHTNESS:
+        return "too_dark"
+    if m["brightness"] > FACE_QC_MAX_BRIGHTNESS:
+        return "too_bright"
+    if m["clipped"] > FACE_QC_MAX_CLIPPED:
+        return "bad_exposure"
+    if m["sharpness"] < FACE_QC_MIN_SHARPNESS:
+        return "blurry"
+    if FACE_QC_DETECT_FACE:
+        frac = _face_fraction(gray)
+        if frac is not None:
+            m["face"] = frac > 0
+            m["face_frac"] = round(frac, 3)
+            if not m["face"]:
+                return "no_face"
+    return None
+
+
+# ---------------------------
+# Ráfagas (varios cuadros por intento)
+# ---------------------------
+def frame_score(m: Dict[str, Any]) -> float:
+    """
+    Nitidez ponderada por el tamaño del rostro: entre dos cuadros igual de
+    nítidos gana el que tiene la cara más cerca. Sin cv2 solo cuenta la nitidez.
+    """
+    face_frac = m.get("face_frac")
+    return m["sharpness"] * (0.5 + face_frac) if face_frac is not None else m["sharpness"]
+
+
+def select_best_frame(frames: Sequence[bytes]) -> Tuple[int, Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Evalúa cada cuadro localmente y retorna (índice del mejor, sus métricas, resumen por cuadro).
+    Si ninguno pasa el filtro levanta FaceQualityError con el motivo del cuadro más nítido
+    (sin llamar a AWS). Con FACE_QC_ENABLED=0 gana el más nítido.
+    """
+    if not frames:
+        raise FaceQualityError("no_frames", {})
+    summary: List[Dict[str, Any]] = []
+    best_i, best_score, best_m = -1, -1.0, None
+    fallback = None   # (nitidez, motivo, métricas) del mejor rechazado
+    for i, data in enumerate(frames):
+        try:
+            m, gray = measure(data)
+        except Exception:
+            summary.append({"index": i, "reason": "unreadable"})
+            continue
+        reason = _reject_reason(m, gray) if FACE_QC_ENABLED else None
+        if reason:
+            summary.append({"index": i, "reason": reason, "sharpness": m["sharpness"]})
+            if fallback is None or m["sharpness"] > fallback[0]:
+                fallback = (m["sharpness"], reason, m)
+            continue
+        score = frame_score(m)
+        summary.append({"index": i, "score": round(score, 1), "sharpness": m["sharpness"],
+                        "face_frac": m.get("face_frac")})
+        if score > best_score:
+            best_i, best_score, best_m = i, score, m
+    if best_m is None:
+        if fallback is None:
+            raise FaceQualityError("unreadable", {"frames": summary})
+        _, reason, m = fallback
+        raise FaceQualityError(reason, dict(m, frames=summary))
+    return best_i, best_m, summary
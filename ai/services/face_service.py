@@ -1,11 +1,23 @@
 # ai/services/face_service.py
 from __future__ import annotations
-import os, uuid, boto3
-from typing import Optional, Tuple, Dict, Any
+import os, io, csv, uuid, time, logging, threading, zipfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, Any, Callable, Iterable, List
 from botocore.exceptions import ClientError
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.utils import timezone
 
 from ai.models import UserFace  # persiste en BD
+from ai.services.aws_clients import get_client
+from ai.services.s3_archive import archive_bytes, put_bytes
+from ai.services.match_cache import match_cache, perceptual_hash
+from ai.services.face_quality import check_face_quality
+from ai.services.image_prep import normalize_image, parse_roi, read_bytes as _read_bytes
+from ai.services.timing import stage
+
+log = logging.getLogger(__name__)
 
 # ---------------------------
 # Env y clientes AWS
@@ -13,12 +25,28 @@ from ai.models import UserFace  # persiste en BD
 def _getenv(name: str, default: str = "") -> str:
     return os.getenv(name, default).strip()
 
-AWS_ACCESS_KEY_ID     = _getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = _getenv("AWS_SECRET_ACCESS_KEY")
-AWS_REGION            = _getenv("AWS_REGION", "us-east-1")
 BUCKET                = _getenv("AWS_STORAGE_BUCKET_NAME")
-COLLECTION            = _getenv("AWS_COLLECTION_ID", "usuarios_faces")
+COLLECTION            = _getenv("AWS_COLLECTION_ID", "usuarios_faces")          # residentes / usuarios
+VISITOR_COLLECTION    = _getenv("AWS_VISITOR_COLLECTION_ID", f"{COLLECTION}_visitors")
+# Buscar en ambas colecciones en paralelo (p.ej. kioscos mixtos)
+FACE_SEARCH_BOTH      = _getenv("FACE_SEARCH_BOTH", "0") in ("1", "true", "True")
 FACE_THRESHOLD        = int(_getenv("FACE_THRESHOLD", "85"))
+# Enviar bytes directo a Rekognition y archivar en S3 en segundo plano
+FACE_INLINE_BYTES     = _getenv("FACE_INLINE_BYTES", "1") not in ("0", "false", "False", "")
+REKOGNITION_MAX_BYTES = 5 * 1024 * 1024  # límite de Image.Bytes en Rekognition
+# Cache de existencia de la colección (segundos)
+FACE_COLLECTION_TTL   = float(_getenv("FACE_COLLECTION_TTL", "600"))
+# Motor de matching: "rekognition" (nube) | "local" (embeddings + índice NumPy)
+FACE_MATCH_BACKEND    = _getenv("FACE_MATCH_BACKEND", "rekognition").lower()
+FACE_LOCAL_THRESHOLD  = float(_getenv("FACE_LOCAL_THRESHOLD", "80"))
+LOCAL_FACE_PREFIX     = "local-"   # face_id de las filas del motor local (no existen en Rekognition)
+# Recorte opcional antes de enviar (fracciones "l,t,r,b"; vacío = cuadro completo)
+FACE_ROI              = parse_roi(_getenv("FACE_ROI"))
+# delete_faces acepta hasta 4096 ids por llamada
+DELETE_BATCH          = 4096
+# Enrolamiento masivo
+FACE_BULK_WORKERS     = int(_getenv("FACE_BULK_WORKERS", "8"))
+FACE_BULK_MAX_ITEMS   = int(_getenv("FACE_BULK_MAX_ITEMS", "1000"))
 
 # Prefijos (usuarios normales)
 FACE_ENROLL_PREFIX = _getenv("FACE_ENROLL_PREFIX", "faces/enroll/")
@@ -27,52 +55,139 @@ FACE_LOGIN_PREFIX  = _getenv("FACE_LOGIN_PREFIX",  "faces/login/")
 VISITOR_ENROLL_PREFIX = _getenv("VISITOR_ENROLL_PREFIX", "faces/visitors/enroll/")
 VISITOR_LOGIN_PREFIX  = _getenv("VISITOR_LOGIN_PREFIX",  "faces/visitors/login/")
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
-)
-rekognition = boto3.client(
-    "rekognition",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
-)
+def _s3():
+    return get_client("s3")
+
+def _rek():
+    return get_client("rekognition")
 
 # ---------------------------
 # Helpers
 # ---------------------------
 def _upload_blob_to_s3(file_obj, key: str) -> None:
-    """Soporta InMemoryUploadedFile / TemporaryUploadedFile / path."""
+    """Soporta InMemoryUploadedFile / TemporaryUploadedFile / bytes / path."""
     extra = {"ContentType": "image/jpeg"}
-    if isinstance(file_obj, (InMemoryUploadedFile, TemporaryUploadedFile)):
-        file_obj.seek(0)
-        s3.upload_fileobj(file_obj, BUCKET, key, ExtraArgs=extra)
+    with stage("s3.upload"):
+        if isinstance(file_obj, (bytes, bytearray)):
+            _s3().put_object(Bucket=BUCKET, Key=key, Body=bytes(file_obj), **extra)
+        elif isinstance(file_obj, (InMemoryUploadedFile, TemporaryUploadedFile)):
+            file_obj.seek(0)
+            _s3().upload_fileobj(file_obj, BUCKET, key, ExtraArgs=extra)
+        else:
+            _s3().upload_file(file_obj, BUCKET, key, ExtraArgs=extra)
+
+def _image_ref(file_obj, key: str, archive: bool = True, durable: bool = False) -> Dict[str, Any]:
+    """
+    Prepara el parámetro Image para Rekognition.
+    - Modo inline: manda los bytes y archiva la copia en S3 en segundo plano.
+    - Si no aplica (desactivado o imagen > 5MB): sube a S3 y usa S3Object.
+    archive=False: la copia ya fue escrita por el llamador (ver _archive_once).
+    durable=True: la copia se sube antes de retornar (la key se guarda en BD).
+    """
+    if FACE_INLINE_BYTES:
+        data = _read_bytes(file_obj)
+        if len(data) <= REKOGNITION_MAX_BYTES:
+            if archive and durable:
+                put_bytes(BUCKET, key, data)
+            elif archive:
+                archive_bytes(BUCKET, key, data)
+            return {"Bytes": data}
+    if archive:
+        _upload_blob_to_s3(file_obj, key)
+    return {"S3Object": {"Bucket": BUCKET, "Name": key}}
+
+def _archive_once(data: bytes, key: str) -> None:
+    """Escribe la copia en S3 una sola vez cuando la misma imagen va a varias colecciones."""
+    if FACE_INLINE_BYTES and len(data) <= REKOGNITION_MAX_BYTES:
+        archive_bytes(BUCKET, key, data)
     else:
-        s3.upload_file(file_obj, BUCKET, key, ExtraArgs=extra)
+        _upload_blob_to_s3(data, key)   # S3Object necesita el objeto antes de buscar
+
+def collection_for(is_visitor: bool) -> str:
+    """Colección de la población: visitantes y residentes se indexan por separado."""
+    return VISITOR_COLLECTION if is_visitor else COLLECTION
+
+# ---------------------------
+# Cache de estado de colecciones (por proceso)
+# ---------------------------
+_collection_ok: Dict[str, float] = {}   # collection_id -> expira_en (monotonic)
+_collection_lock = threading.Lock()
+_collection_stats = {"hits": 0, "misses": 0, "created": 0, "invalidations": 0}
+
+def _is_not_found(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") == "ResourceNotFoundException"
+
+def _ensure_collection(collection_id: str = COLLECTION) -> None:
+    """
+    Crea la colección si no existe (idempotente).
+    El resultado se memoriza FACE_COLLECTION_TTL segundos para no llamar a
+    describe_collection en cada login.
+    """
+    now = time.monotonic()
+    with _collection_lock:
+        exp = _collection_ok.get(collection_id)
+        if exp is not None and exp > now:
+            _collection_stats["hits"] += 1
+            return
+        _collection_stats["misses"] += 1
 
-def _ensure_collection() -> None:
-    """Crea la colección si no existe (idempotente)."""
     try:
-        rekognition.describe_collection(CollectionId=COLLECTION)
+        _rek().describe_collection(CollectionId=collection_id)
     except ClientError as e:
-        code = e.response.get("Error", {}).get("Code")
-        if code == "ResourceNotFoundException":
-            rekognition.create_collection(CollectionId=COLLECTION)
+        if not _is_not_found(e):
+            raise
+        try:
+            _rek().create_collection(CollectionId=collection_id)
+        except ClientError as e2:
+            # otro worker la creó entre medio
+            if e2.response.get("Error", {}).get("Code") != "ResourceAlreadyExistsException":
+                raise
+        with _collection_lock:
+            _collection_stats["created"] += 1
+
+    with _collection_lock:
+        _collection_ok[collection_id] = time.monotonic() + FACE_COLLECTION_TTL
+
+def invalidate_collection_cache(collection_id: str | None = None) -> None:
+    """Olvida el estado cacheado de una colección (o de todas si None)."""
+    with _collection_lock:
+        if collection_id is None:
+            _collection_ok.clear()
         else:
+            _collection_ok.pop(collection_id, None)
+        _collection_stats["invalidations"] += 1
+
+def collection_cache_stats() -> Dict[str, int]:
+    with _collection_lock:
+        return dict(_collection_stats, cached=len(_collection_ok))
+
+def _call_with_collection(collection_id: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Ejecuta fn() asegurando la colección. Si la colección desapareció
+    (borrada fuera del proceso) invalida el cache, la recrea y reintenta una vez.
+    """
+    _ensure_collection(collection_id)
+    try:
+        return fn()
+    except ClientError as e:
+        if not _is_not_found(e):
             raise
+        invalidate_collection_cache(collection_id)
+        _ensure_collection(collection_id)
+        return fn()
 
-def _upsert_userface(user_id: int | str, face_id: Optional[str], s3_key: str) -> UserFace:
+def _upsert_userface(user_id: int | str, face_id: Optional[str], s3_key: str,
+                     embedding: Optional[bytes] = None, collection_id: str = COLLECTION) -> UserFace:
     """Crea/actualiza fila en BD para (user, collection)."""
     uf, _ = UserFace.objects.update_or_create(
         user_id=int(user_id),
-        collection_id=COLLECTION,
+        collection_id=collection_id,
         defaults={
             "external_image_id": str(user_id),
             "face_id": face_id,
             "s3_key": s3_key,
             "status": "registered" if face_id else "pending",
+            "embedding": embedding,
         },
     )
     return uf
@@ -81,84 +196,495 @@ def _norm_prefix(prefix: str | None, fallback: str) -> str:
     p = (prefix or fallback).strip().rstrip("/")
     return f"{p}/" if p else ""
 
+# ---------------------------
+# Motores de matching
+# ---------------------------
+class FaceMatchBackend(ABC):
+    """
+    Interfaz de un motor de reconocimiento.
+    Las respuestas usan la forma de Rekognition (FaceRecords / FaceMatches)
+    para que enroll_face/search_by_image no dependan del motor.
+    """
+    name = "base"
+
+    @abstractmethod
+    def index_face(self, collection_id: str, user_id: int | str, file_obj, key: str) -> Tuple[Optional[str], Dict[str, Any], Optional[bytes]]:
+        """Indexa un rostro. Retorna (face_id, raw, embedding_bytes)."""
+
+    @abstractmethod
+    def search_faces(self, collection_id: str, file_obj, key: str, max_faces: int = 5,
+                     archive: bool = True) -> Dict[str, Any]:
+        """Busca rostros parecidos. Retorna dict con "FaceMatches". archive=False: no escribe la copia en S3."""
+
+    @abstractmethod
+    def delete_faces(self, collection_id: str, face_ids: List[str]) -> List[str]:
+        """Borra rostros de la colección. Retorna los face_ids efectivamente borrados."""
+
+    def face_count(self, collection_id: str) -> Optional[int]:
+        """Cantidad de rostros en la colección (None si no se puede saber)."""
+        return None
+
+
+class RekognitionBackend(FaceMatchBackend):
+    name = "rekognition"
+
+    def index_face(self, collection_id, user_id, file_obj, key):
+        image = _image_ref(file_obj, key, durable=True)
+        with stage("rekognition.index"):
+            resp = _call_with_collection(collection_id, lambda: _rek().index_faces(
+                CollectionId=collection_id,
+                Image=image,
+                ExternalImageId=str(user_id),
+                DetectionAttributes=["DEFAULT"],
+                MaxFaces=1,
+                QualityFilter="AUTO",
+            ))
+        face_records = resp.get("FaceRecords", [])
+        face_id = face_records[0]["Face"]["FaceId"] if face_records else None
+        return face_id, resp, None
+
+    def index_from_s3(self, collection_id: str, user_id: int | str, s3_key: str) -> Dict[str, Any]:
+        """Re-indexa una imagen ya archivada en S3 (migraciones entre colecciones)."""
+        return _call_with_collection(collection_id, lambda: _rek().index_faces(
+            CollectionId=collection_id,
+            Image={"S3Object": {"Bucket": BUCKET, "Name": s3_key}},
+            ExternalImageId=str(user_id),
+            DetectionAttributes=["DEFAULT"],
+            MaxFaces=1,
+            QualityFilter="AUTO",
+        ))
+
+    def search_faces(self, collection_id, file_obj, key, max_faces=5, archive=True):
+        image = _image_ref(file_obj, key, archive=archive)
+        with stage("rekognition.search"):
+            return _call_with_collection(collection_id, lambda: _rek().search_faces_by_image(
+                CollectionId=collection_id,
+                Image=image,
+                MaxFaces=max_faces,
+                FaceMatchThreshold=FACE_THRESHOLD,
+            ))
+
+    def delete_faces(self, collection_id, face_ids):
+        deleted: List[str] = []
+        ids = [f for f in dict.fromkeys(face_ids) if f]
+        for i in range(0, len(ids), DELETE_BATCH):
+            try:
+                r = _rek().delete_faces(CollectionId=collection_id, FaceIds=ids[i:i + DELETE_BATCH])
+            except ClientError as e:
+                if _is_not_found(e):
+                    return deleted
+                raise
+            deleted.extend(r.get("DeletedFaces", []))
+        return deleted
+
+    def face_count(self, collection_id):
+        try:
+            return int(_rek().describe_collection(CollectionId=collection_id).get("FaceCount", 0))
+        except ClientError as e:
+            if _is_not_found(e):
+                return 0
+            raise
+
+
+class LocalBackend(FaceMatchBackend):
+    """
+    Motor local: embedding en el propio servidor + índice NumPy en memoria
+    (ai/services/face_index.py). La copia en S3 se archiva en segundo plano.
+    """
+    name = "local"
+
+    def __init__(self):
+        # numpy y el embedder son opcionales (requirements-face-local.txt): verificar al arrancar
+        try:
+            from ai.services import face_index
+            face_index.get_embedder()
+        except (ImportError, AttributeError) as e:
+            raise ImproperlyConfigured(
+                "FACE_MATCH_BACKEND=local requiere numpy y un embedder "
+                f"(pip install -r requirements-face-local.txt, o FACE_LOCAL_EMBEDDER): {e}"
+            ) from e
+
+    def index_face(self, collection_id, user_id, file_obj, key):
+        from ai.services import face_index
+        data = _read_bytes(file_obj)
+        put_bytes(BUCKET, key, data)   # UserFace.s3_key apunta aquí: sin copia no hay enrolamiento
+        with stage("local.embed"):
+            vec = face_index.embed(data)
+        if vec is None:
+            return None, {"FaceRecords": [], "Backend": self.name}, None
+        face_id = f"{LOCAL_FACE_PREFIX}{uuid.uuid4()}"
+        face_index.get_index(collection_id).upsert(str(user_id), face_id, vec)
+        raw = {"FaceRecords": [{"Face": {"FaceId": face_id, "ExternalImageId": str(user_id)}}], "Backend": self.name}
+        return face_id, raw, face_index.to_bytes(vec)
+
+    def search_faces(self, collection_id, file_obj, key, max_faces=5, archive=True):
+        from ai.services import face_index
+        data = _read_bytes(file_obj)
+        if archive:
+            archive_bytes(BUCKET, key, data)
+        with stage("local.embed"):
+            vec = face_index.embed(data)
+        if vec is None:
+            return {"FaceMatches": [], "Backend": self.name}
+        with stage("local.search"):
+            hits = face_index.get_index(collection_id).search(vec, k=max_faces)
+        matches = [
+            {"Similarity": sim * 100.0, "Face": {"FaceId": fid, "ExternalImageId": ext}}
+            for ext, fid, sim in hits if sim * 100.0 >= FACE_LOCAL_THRESHOLD
+        ]
+        return {"FaceMatches": matches, "Backend": self.name}
+
+    def delete_faces(self, collection_id, face_ids):
+        from ai.services import face_index
+        return face_index.get_index(collection_id).remove_face_ids(face_ids)
+
+    def face_count(self, collection_id):
+        from ai.services import face_index
+        return len(face_index.get_index(collection_id))
+
+
+_BACKENDS: Dict[str, type] = {"rekognition": RekognitionBackend, "local": LocalBackend}
+_backend: Optional[FaceMatchBackend] = None
+
+def get_backend() -> FaceMatchBackend:
+    """Motor configurado en FACE_MATCH_BACKEND (instancia única por proceso)."""
+    global _backend
+    if _backend is None:
+        try:
+            _backend = _BACKENDS[FACE_MATCH_BACKEND]()
+        except KeyError:
+            raise RuntimeError(f"FACE_MATCH_BACKEND desconocido: {FACE_MATCH_BACKEND}")
+    return _backend
+
 # ---------------------------
 # API de servicio
 # ---------------------------
 def enroll_face(user_id: int | str, file_obj, *, key_prefix: str | None = None, is_visitor: bool = False) -> Dict[str, Any]:
     """
-    Sube imagen de enrolamiento a S3, indexa en Rekognition con ExternalImageId=user_id
-    y persiste/actualiza en BD (ai_userface).
+    Indexa la imagen en el motor configurado (Rekognition por defecto) con
+    ExternalImageId=user_id, guarda la copia en S3 y persiste/actualiza en BD (ai_userface).
+    La imagen se normaliza antes (EXIF, tamaño, JPEG; ver image_prep).
+    La copia en S3 se sube antes de guardar s3_key (rehome/backfill la leen después).
 
     - key_prefix: prefijo S3 custom (opcional)
-    - is_visitor: si True usa VISITOR_ENROLL_PREFIX por defecto
+    - is_visitor: si True usa VISITOR_ENROLL_PREFIX y la colección de visitantes
     """
     if not BUCKET or not COLLECTION:
         raise RuntimeError("Config AWS incompleta: BUCKET/COLLECTION")
 
-    _ensure_collection()
-
+    collection_id = collection_for(is_visitor)
     default_prefix = VISITOR_ENROLL_PREFIX if is_visitor else FACE_ENROLL_PREFIX
     prefix = _norm_prefix(key_prefix, default_prefix)
     key = f"{prefix}{uuid.uuid4()}.jpg"
-    _upload_blob_to_s3(file_obj, key)
-
-    resp = rekognition.index_faces(
-        CollectionId=COLLECTION,
-        Image={"S3Object": {"Bucket": BUCKET, "Name": key}},
-        ExternalImageId=str(user_id),
-        DetectionAttributes=["DEFAULT"],
-        MaxFaces=1,
-        QualityFilter="AUTO",
-    )
+    with stage("face.prep"):
+        data = normalize_image(file_obj, roi=FACE_ROI)
 
-    face_records = resp.get("FaceRecords", [])
-    face_id = face_records[0]["Face"]["FaceId"] if face_records else None
+    backend = get_backend()
+    with stage("db.userface"):
+        previous = (UserFace.objects
+                    .filter(user_id=int(user_id), collection_id=collection_id)
+                    .values_list("face_id", flat=True).first())
 
-    uf = _upsert_userface(user_id=user_id, face_id=face_id, s3_key=key)
+    with stage("face.index"):
+        face_id, resp, embedding = backend.index_face(collection_id, user_id, data, key)
+
+    try:
+        with stage("db.userface"):
+            uf = _upsert_userface(user_id=user_id, face_id=face_id, s3_key=key, embedding=embedding,
+                                  collection_id=collection_id)
+    except Exception:
+        # sin fila que la respalde, la cara recién indexada quedaría huérfana
+        if face_id:
+            _delete_quietly(backend, collection_id, [face_id])
+        raise
+
+    # Re-enrolamiento: la cara anterior queda obsoleta y se borra de la colección
+    if face_id and previous and previous != face_id:
+        _delete_quietly(backend, collection_id, [previous])
 
     return {
         "ok": True,
         "user_id": int(user_id),
         "external_image_id": str(user_id),
         "face_id": face_id,
-        "collection_id": COLLECTION,
+        "collection_id": collection_id,
         "s3_key": key,
         "db_id": uf.id,
         "raw": resp,
     }
 
-def search_by_image(file_obj, *, key_prefix: str | None = None, is_visitor: bool = False) -> Tuple[Optional[str], Optional[float], str, Dict[str, Any]]:
+def _best_match(resp: Dict[str, Any]) -> Tuple[Optional[str], Optional[float]]:
+    matches = resp.get("FaceMatches", [])
+    if not matches:
+        return None, None
+    best = max(matches, key=lambda m: m.get("Similarity", 0.0))
+    return best["Face"].get("ExternalImageId"), float(best.get("Similarity", 0.0))
+
+def search_by_image(file_obj, *, key_prefix: str | None = None, is_visitor: bool = False,
+                    search_both: bool | None = None, quality_checked: bool = False) -> Tuple[Optional[str], Optional[float], str, Dict[str, Any]]:
     """
-    Sube imagen de login a S3 y busca coincidencias en Rekognition.
+    Busca coincidencias en el motor configurado (Rekognition por defecto)
+    y guarda la imagen de login en S3.
+    La imagen se normaliza antes (EXIF, tamaño, JPEG; ver image_prep).
+    La copia en S3 se sube antes de guardar s3_key (rehome/backfill la leen después).
     Retorna: (external_id, similarity, s3_key, raw_response)
 
+    Con FACE_MATCH_CACHE_TTL > 0 los resultados recientes se cachean por hash
+    perceptual, prefijo y colecciones (ver match_cache); en un acierto no hay llamadas a S3/Rekognition y raw_response trae "Cached": True.
+
     - key_prefix: prefijo S3 custom (opcional)
-    - is_visitor: si True usa VISITOR_LOGIN_PREFIX por defecto
+    - is_visitor: si True usa VISITOR_LOGIN_PREFIX y busca solo en la colección de visitantes
+    - search_both: busca en residentes y visitantes en paralelo y gana la mayor similitud
+      (por defecto FACE_SEARCH_BOTH); raw_response trae "Collection" con la ganadora
+    - quality_checked: el llamador ya pasó el cuadro por el filtro de calidad
+      (p. ej. select_best_frame en las ráfagas del kiosco)
     """
     if not BUCKET or not COLLECTION:
         raise RuntimeError("Config AWS incompleta: BUCKET/COLLECTION")
 
-    _ensure_collection()
+    both = FACE_SEARCH_BOTH if search_both is None else search_both
+    collections = [COLLECTION, VISITOR_COLLECTION] if both else [collection_for(is_visitor)]
 
     default_prefix = VISITOR_LOGIN_PREFIX if is_visitor else FACE_LOGIN_PREFIX
     prefix = _norm_prefix(key_prefix, default_prefix)
+    # un acierto solo vale para el mismo prefijo y las mismas colecciones
+    cache_scope = f"{prefix}|{'+'.join(collections)}"
     key = f"{prefix}{uuid.uuid4()}.jpg"
-    _upload_blob_to_s3(file_obj, key)
+    with stage("face.prep"):
+        data = normalize_image(file_obj, roi=FACE_ROI)
+    # Cuadros borrosos/oscuros/sin rostro se rechazan aquí (FaceQualityError), sin llamar a AWS
+    if not quality_checked:
+        with stage("face.quality"):
+            check_face_quality(data)
+
+    # Reintentos del kiosco con el mismo cuadro: responder sin llamar a AWS
+    phash, cached = None, None
+    if match_cache.enabled:
+        with stage("face.cache"):
+            phash = perceptual_hash(data)
+            if phash is not None:
+                cached = match_cache.get(cache_scope, phash)
+    if cached is not None:
+        ext_id, sim, cached_key = cached
+        return (ext_id, sim, cached_key, {"FaceMatches": [], "Cached": True})
+
+    backend = get_backend()
+    with stage("face.search"):
+        if len(collections) == 1:
+            resp = backend.search_faces(collections[0], data, key, max_faces=5)
+            resp["Collection"] = collections[0]
+        else:
+            _archive_once(data, key)
+            with ThreadPoolExecutor(max_workers=len(collections), thread_name_prefix="face-search") as pool:
+                futures = {c: pool.submit(backend.search_faces, c, data, key, 5, False) for c in collections}
+                per_col = {c: f.result() for c, f in futures.items()}
+            winner = max(collections, key=lambda c: _best_match(per_col[c])[1] or -1.0)
+            resp = dict(per_col[winner], Collection=winner, PerCollection=per_col)
+
+    external_id, similarity = _best_match(resp)
+
+    if phash is not None:
+        match_cache.put(cache_scope, phash, (external_id, similarity, key))
+
+    return (external_id, similarity, key, resp)
+
+
+# ---------------------------
+# Enrolamiento masivo
+# ---------------------------
+_IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+def items_from_zip(zip_file) -> List[Tuple[str, bytes]]:
+    """
+    Lee un zip de enrolamiento y retorna [(user_id, bytes)].
+    - Con manifest.csv (columnas user_id,filename) se usa ese mapeo.
+    - Si no, cada imagen se llama <user_id>.jpg|.jpeg|.png
+    """
+    items: List[Tuple[str, bytes]] = []
+    with zipfile.ZipFile(zip_file) as zf:
+        names = {os.path.basename(n): n for n in zf.namelist() if not n.endswith("/")}
+        if "manifest.csv" in names:
+            text = zf.read(names["manifest.csv"]).decode("utf-8-sig")
+            for row in csv.DictReader(io.StringIO(text)):
+                fname = (row.get("filename") or "").strip()
+                uid = (row.get("user_id") or "").strip()
+                if not fname or not uid:
+                    continue
+                member = names.get(os.path.basename(fname))
+                items.append((uid, zf.read(member) if member else b""))
+        else:
+            for base, member in sorted(names.items()):
+                stem, ext = os.path.splitext(base)
+                if ext.lower() in _IMAGE_EXTS:
+                    items.append((stem, zf.read(member)))
+    if len(items) > FACE_BULK_MAX_ITEMS:
+        raise ValueError(f"Máximo {FACE_BULK_MAX_ITEMS} imágenes por lote (recibidas {len(items)})")
+    return items
+
+def enroll_faces_bulk(items: Iterable[Tuple[int | str, Any]], *, key_prefix: str | None = None,
+                      is_visitor: bool = False, max_workers: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Enrolamiento de muchos rostros: subidas + index_faces en un pool acotado
+    y un único upsert masivo en ai_userface.
+    items: [(user_id, file_obj|bytes|path)]. Retorna un resultado por item, en orden.
+    """
+    from django.contrib.auth import get_user_model
 
-    resp = rekognition.search_faces_by_image(
-        CollectionId=COLLECTION,
-        Image={"S3Object": {"Bucket": BUCKET, "Name": key}},
-        MaxFaces=5,
-        FaceMatchThreshold=FACE_THRESHOLD,
+    if not BUCKET or not COLLECTION:
+        raise RuntimeError("Config AWS incompleta: BUCKET/COLLECTION")
+
+    items = list(items)
+    if len(items) > FACE_BULK_MAX_ITEMS:
+        raise ValueError(f"Máximo {FACE_BULK_MAX_ITEMS} imágenes por lote (recibidas {len(items)})")
+
+    results: List[Dict[str, Any]] = [{} for _ in items]
+    valid_ids = set(
+        get_user_model().objects
+        .filter(id__in=[int(u) for u, _ in items if str(u).isdigit()])
+        .values_list("id", flat=True)
     )
 
-    matches = resp.get("FaceMatches", [])
-    if not matches:
-        return (None, None, key, resp)
+    todo = []
+    for i, (uid, f) in enumerate(items):
+        if not str(uid).isdigit() or int(uid) not in valid_ids:
+            results[i] = {"ok": False, "user_id": uid, "error": "Usuario no existe"}
+        elif not f:
+            results[i] = {"ok": False, "user_id": int(uid), "error": "Imagen vacía o faltante"}
+        else:
+            todo.append(i)
+
+    collection_id = collection_for(is_visitor)
+    default_prefix = VISITOR_ENROLL_PREFIX if is_visitor else FACE_ENROLL_PREFIX
+    prefix = _norm_prefix(key_prefix, default_prefix)
+    backend = get_backend()
+    if todo:
+        _ensure_collection(collection_id)
+
+    def work(i: int):
+        uid, f = items[i]
+        key = f"{prefix}{uuid.uuid4()}.jpg"
+        face_id, _resp, embedding = backend.index_face(collection_id, uid, normalize_image(f, roi=FACE_ROI), key)
+        return i, int(uid), face_id, key, embedding
+
+    previous = dict(
+        UserFace.objects
+        .filter(collection_id=collection_id, user_id__in=[int(items[i][0]) for i in todo])
+        .exclude(face_id__isnull=True)
+        .values_list("user_id", "face_id")
+    )
+
+    rows: Dict[int, Tuple[int, Optional[str], str, Optional[bytes]]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers or FACE_BULK_WORKERS, thread_name_prefix="face-bulk") as pool:
+        futures = {pool.submit(work, i): i for i in todo}
+        for fut, i in futures.items():
+            try:
+                _, uid, face_id, key, embedding = fut.result()
+            except Exception as e:
+                results[i] = {"ok": False, "user_id": int(items[i][0]), "error": str(e)}
+                continue
+            if not face_id:
+                results[i] = {"ok": False, "user_id": uid, "error": "No se detectó rostro", "s3_key": key}
+            else:
+                results[i] = {"ok": True, "user_id": uid, "face_id": face_id, "s3_key": key, "collection_id": collection_id}
+            # un usuario repetido en el lote: gana el último
+            rows[uid] = (i, face_id, key, embedding)
+
+    if rows:
+        objs = [
+            UserFace(
+                user_id=uid,
+                collection_id=collection_id,
+                external_image_id=str(uid),
+                face_id=face_id,
+                s3_key=key,
+                status="registered" if face_id else "pending",
+                embedding=embedding,
+            )
+            for uid, (_i, face_id, key, embedding) in rows.items()
+        ]
+        saved = UserFace.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["user", "collection_id"],
+            update_fields=["external_image_id", "face_id", "s3_key", "status", "embedding", "updated_at"],
+        )
+        for obj in saved:
+            i = rows[obj.user_id][0]
+            if results[i].get("ok"):
+                results[i]["db_id"] = obj.pk
+
+        stale = [previous[uid] for uid, (_i, fid, _k, _e) in rows.items()
+                 if fid and previous.get(uid) and previous[uid] != fid]
+        if stale:
+            _delete_quietly(backend, collection_id, stale)
 
-    matches.sort(key=lambda m: m.get("Similarity", 0.0), reverse=True)
-    best = matches[0]
-    external_id = best["Face"].get("ExternalImageId")
-    similarity = float(best.get("Similarity", 0.0))
+    return results
 
-    return (external_id, similarity, key, resp)
\ No newline at end of file
+
+# ---------------------------
+# Revocación y compactación
+# ---------------------------
+def _delete_quietly(backend: FaceMatchBackend, collection_id: str, face_ids: List[str]) -> None:
+    """Borrado best-effort (lo que quede lo limpia compact_face_collection)."""
+    try:
+        backend.delete_faces(collection_id, face_ids)
+    except Exception:
+        log.exception("No se pudieron borrar %d caras viejas de %s", len(face_ids), collection_id)
+
+def revoke_face(user_id: int | str, collection_id: str | None = None) -> Dict[str, Any]:
+    """
+    Borra de la colección los rostros del usuario y marca sus filas como "revoked".
+    collection_id=None revoca en todas las colecciones donde esté enrolado.
+    """
+    rows = UserFace.objects.filter(user_id=int(user_id))
+    if collection_id:
+        rows = rows.filter(collection_id=collection_id)
+    rows = list(rows)
+    if not rows:
+        return {"ok": False, "user_id": int(user_id), "revoked": 0, "deleted_faces": []}
+
+    backend = get_backend()
+    by_col: Dict[str, List[str]] = {}
+    for r in rows:
+        if r.face_id:
+            by_col.setdefault(r.collection_id, []).append(r.face_id)
+    deleted: List[str] = []
+    for col, ids in by_col.items():
+        deleted += backend.delete_faces(col, ids)
+
+    # update() no toca auto_now: se fija updated_at para que los índices locales de otros workers lo vean
+    UserFace.objects.filter(id__in=[r.id for r in rows]).update(status="revoked", updated_at=timezone.now())
+    match_cache.clear()   # que un reintento cacheado no deje entrar a un usuario revocado
+    return {"ok": True, "user_id": int(user_id), "revoked": len(rows), "deleted_faces": deleted}
+
+def compact_collection(collection_id: str = COLLECTION, *, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Elimina de la colección rostros obsoletos (re-enrolamientos), huérfanos
+    (usuario inexistente o ExternalImageId inválido) y de usuarios revocados.
+    Retorna métricas de la corrida (tamaño antes/después).
+    Opera sobre la colección de Rekognition (el índice local se reconstruye desde BD).
+    """
+    from ai.services.face_sync import list_collection_faces, classify_faces
+
+    backend = RekognitionBackend()
+    started = time.monotonic()
+    before = backend.face_count(collection_id)
+    faces = list_collection_faces(collection_id)
+    c = classify_faces(collection_id, faces)
+    victims = c["superseded"] + c["orphaned"] + c["revoked"]
+
+    deleted = [] if dry_run else backend.delete_faces(collection_id, victims)
+    after = before if dry_run else backend.face_count(collection_id)
+    return {
+        "collection_id": collection_id,
+        "dry_run": dry_run,
+        "faces_before": before,
+        "faces_after": after,
+        "listed": len(faces),
+        "superseded": len(c["superseded"]),
+        "orphaned": len(c["orphaned"]),
+        "revoked": len(c["revoked"]),
+        "deleted": len(deleted),
+        "batches": (len(victims) + DELETE_BATCH - 1) // DELETE_BATCH,
+        "seconds": round(time.monotonic() - started, 2),
+    }
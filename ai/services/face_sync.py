@@ -0,0 +1,148 @@
+# ai/services/face_sync.py
+"""
+Espejo local (ai_userface) de la colección de Rekognition.
+
+Rekognition no ofrece "cambios desde X", así que la colección se lista
+completa (list_faces, páginas de 4096), pero la BD se actualiza de forma
+incremental: solo se crean/modifican las filas que difieren. Cada corrida
+deja un FaceSyncReport con el drift encontrado, que es lo que leen las
+vistas de estado/debug en lugar de paginar la colección en cada request.
+
+Las filas del motor local (face_id "local-...") no viven en Rekognition:
+no se marcan como faltantes ni se les adopta otra cara, y con
+FACE_MATCH_BACKEND=local la sincronización no corre.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from ai.models import UserFace, FaceSyncReport
+from ai.services.aws_clients import get_client
+from ai.services.face_service import FACE_MATCH_BACKEND, LOCAL_FACE_PREFIX
+
+LIST_PAGE_SIZE = 4096
+DETAIL_SAMPLE  = 50   # máximo de ids de ejemplo por categoría en el reporte
+
+
+def list_collection_faces(collection_id: str) -> List[Dict[str, Any]]:
+    """Todas las caras de la colección: [{FaceId, ExternalImageId, ...}]."""
+    rek = get_client("rekognition")
+    faces, token = [], None
+    while True:
+        kw = {"CollectionId": collection_id, "MaxResults": LIST_PAGE_SIZE}
+        if token:
+            kw["NextToken"] = token
+        r = rek.list_faces(**kw)
+        faces.extend(r.get("Faces", []))
+        token = r.get("NextToken")
+        if not token:
+            return faces
+
+
+def classify_faces(collection_id: str, faces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Cruza la colección con ai_userface (sin escribir).
+    Retorna:
+      in_sync:    face_ids presentes en ambos lados
+      adopt:      {user_id: face_id}  cara del usuario cuya fila apunta a otra cara inexistente (o no hay fila)
+      superseded: [face_id]  caras viejas de un usuario cuya fila apunta a otra cara vigente
+      orphaned:   [face_id]  caras sin usuario válido
+      revoked:    [face_id]  caras de usuarios revocados que siguen en la colección
+      missing:    [row_id]   filas registered cuya cara no está en la colección
+      local:      [face_id]  caras de usuarios cuya fila es del motor local (no se tocan)
+    """
+    rows = {uf.user_id: uf for uf in UserFace.objects.filter(collection_id=collection_id)}
+    in_collection = {f["FaceId"] for f in faces}
+
+    ext_ids = {f.get("ExternalImageId") for f in faces}
+    user_ids = {int(x) for x in ext_ids if x and x.isdigit()}
+    existing_users = set(get_user_model().objects.filter(id__in=user_ids).values_list("id", flat=True))
+
+    in_sync, superseded, orphaned, revoked, local = [], [], [], [], []
+    adopt: Dict[int, str] = {}
+    for f in faces:
+        fid, ext = f["FaceId"], f.get("ExternalImageId") or ""
+        if not ext.isdigit() or int(ext) not in existing_users:
+            orphaned.append(fid)
+            continue
+        uid = int(ext)
+        row = rows.get(uid)
+        if row is not None and row.status == "revoked":
+            revoked.append(fid)
+        elif row is not None and _is_local(row):
+            local.append(fid)
+        elif row is not None and row.face_id == fid:
+            in_sync.append(fid)
+        elif row is not None and row.face_id in in_collection:
+            superseded.append(fid)
+        elif uid in adopt:
+            # varias caras sin fila vigente: se adopta una, el resto queda como vieja
+            superseded.append(fid)
+        else:
+            adopt[uid] = fid
+
+    missing = [
+        row.id for row in rows.values()
+        if row.status == "registered" and not _is_local(row)
+        and row.face_id not in in_collection and row.user_id not in adopt
+    ]
+    return {"in_sync": in_sync, "adopt": adopt, "superseded": superseded,
+            "orphaned": orphaned, "revoked": revoked, "missing": missing, "local": local}
+
+
+def _is_local(row: UserFace) -> bool:
+    return (row.face_id or "").startswith(LOCAL_FACE_PREFIX)
+
+
+def sync_collection(collection_id: str) -> FaceSyncReport:
+    """Sincroniza la colección a ai_userface y guarda el reporte de drift."""
+    if FACE_MATCH_BACKEND == "local":
+        # ai_userface es la fuente de verdad del motor local: no hay colección que espejar
+        raise RuntimeError("FACE_MATCH_BACKEND=local: no hay colección de Rekognition que sincronizar")
+    started = timezone.now()
+    faces = list_collection_faces(collection_id)
+    c = classify_faces(collection_id, faces)
+
+    rows = {uf.user_id: uf for uf in UserFace.objects.filter(collection_id=collection_id, user_id__in=c["adopt"].keys())}
+    to_create, to_update = [], []
+    for uid, fid in c["adopt"].items():
+        row = rows.get(uid)
+        if row is None:
+            to_create.append(UserFace(
+                user_id=uid, collection_id=collection_id, external_image_id=str(uid),
+                face_id=fid, status="registered",
+            ))
+        else:
+            row.face_id, row.status, row.updated_at = fid, "registered", timezone.now()
+            to_update.append(row)
+    if to_create:
+        UserFace.objects.bulk_create(to_create, ignore_conflicts=True)
+    if to_update:
+        UserFace.objects.bulk_update(to_update, ["face_id", "status", "updated_at"])
+    if c["missing"]:
+        UserFace.objects.filter(id__in=c["missing"]).update(status="missing", updated_at=timezone.now())
+
+    return FaceSyncReport.objects.create(
+        collection_id=collection_id,
+        started_at=started,
+        collection_faces=len(faces),
+        db_rows=UserFace.objects.filter(collection_id=collection_id, status="registered").count(),
+        created=len(to_create),
+        updated=len(to_update),
+        missing=len(c["missing"]),
+        orphaned=len(c["orphaned"]),
+        superseded=len(c["superseded"]),
+        details={
+            "orphaned": c["orphaned"][:DETAIL_SAMPLE],
+            "superseded": c["superseded"][:DETAIL_SAMPLE],
+            "revoked": c["revoked"][:DETAIL_SAMPLE],
+            "missing_rows": c["missing"][:DETAIL_SAMPLE],
+            "local": c["local"][:DETAIL_SAMPLE],
+        },
+    )
+
+
+def last_report(collection_id: str) -> FaceSyncReport | None:
+    return FaceSyncReport.objects.filter(collection_id=collection_id).first()
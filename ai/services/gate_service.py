@@ -0,0 +1,48 @@
+# ai/services/gate_service.py
+"""
+Decisión combinada del portón vehicular: rostro del conductor + placa.
+
+El cálculo de los dos reconocedores lo hace la vista (en paralelo); aquí
+solo se resuelve la placa (registro en memoria, ver plate_registry) y se
+combina el resultado.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from ai.services.plate_registry import PlateCandidate, plate_registry
+
+ALLOW  = "allow"
+REVIEW = "review"   # lo decide el guardia
+DENY   = "deny"
+
+
+def plate_candidates(number: Optional[str]) -> List[PlateCandidate]:
+    """
+    Placas registradas compatibles con la lectura del OCR (exacta o tolerante a O/0, B/8, ...).
+    Sin las de distancia 1: una placa distinta en un carácter no cuenta. Sin consultar ai_plate.
+    """
+    return plate_registry.match(number)
+
+
+def decide(face_user_id: Optional[int], plate_number: Optional[str],
+           candidates: List[PlateCandidate]) -> Dict[str, Any]:
+    """
+    allow:  rostro reconocido y alguna placa candidata es suya
+    review: solo uno de los dos coincide, o placa de otro usuario
+    deny:   ni rostro ni placa registrada
+    "plate_match" dice qué candidata se usó (exacta o por confusión).
+    """
+    if face_user_id is not None:
+        own = next((c for c in candidates if face_user_id in c.owner_ids), None)
+        if own is not None:
+            return {"decision": ALLOW, "reason": "face_and_plate_match", "plate_match": own.as_dict()}
+        if not plate_number:
+            reason = "plate_not_read"
+        elif candidates:
+            reason = "plate_owner_mismatch"
+        else:
+            reason = "plate_not_registered"
+        return {"decision": REVIEW, "reason": reason, "plate_match": None}
+    if candidates:
+        return {"decision": REVIEW, "reason": "face_not_recognized", "plate_match": candidates[0].as_dict()}
+    return {"decision": DENY, "reason": "no_match", "plate_match": None}
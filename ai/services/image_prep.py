@@ -0,0 +1,93 @@
+# ai/services/image_prep.py
+"""
+Pre-procesamiento de imágenes antes de S3/Rekognition (rostros y placas).
+
+1) Corrige la orientación EXIF (las fotos de celular vienen rotadas por metadato).
+2) Recorta opcionalmente a una región de interés (fracciones 0..1 del cuadro).
+3) Reduce al borde máximo configurado.
+4) Re-codifica a JPEG con la calidad configurada (sin EXIF).
+
+Si la imagen no se puede decodificar se devuelven los bytes originales
+y Rekognition decide.
+"""
+from __future__ import annotations
+import io, os
+from typing import Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+def _getenv(name: str, default: str = "") -> str:
+    return os.getenv(name, default).strip()
+
+IMAGE_PREP_ENABLED = _getenv("IMAGE_PREP_ENABLED", "1") not in ("0", "false", "False", "")
+IMAGE_MAX_EDGE     = int(_getenv("IMAGE_MAX_EDGE", "1280"))
+IMAGE_JPEG_QUALITY = int(_getenv("IMAGE_JPEG_QUALITY", "85"))
+
+Roi = Tuple[float, float, float, float]   # (left, top, right, bottom) en fracciones
+
+
+def parse_roi(value: str | Sequence[float] | None) -> Optional[Roi]:
+    """ "0.1,0.2,0.9,1" -> (0.1, 0.2, 0.9, 1.0). None/"" -> None."""
+    if not value:
+        return None
+    parts = [float(p) for p in (value.split(",") if isinstance(value, str) else value)]
+    if len(parts) != 4:
+        raise ValueError(f"ROI inválida (se esperan 4 valores): {value!r}")
+    l, t, r, b = (min(max(p, 0.0), 1.0) for p in parts)
+    if r <= l or b <= t:
+        raise ValueError(f"ROI vacía: {value!r}")
+    return (l, t, r, b)
+
+
+def read_bytes(src) -> bytes:
+    """bytes / path / file-like (uploads de Django) -> bytes, dejando el puntero al inicio."""
+    if isinstance(src, (bytes, bytearray)):
+        return bytes(src)
+    if isinstance(src, str):
+        with open(src, "rb") as fh:
+            return fh.read()
+    src.seek(0)
+    data = src.read()
+    src.seek(0)
+    return data
+
+
+def normalize_image(src, *, max_edge: int | None = None, quality: int | None = None,
+                    roi: Optional[Roi] = None) -> bytes:
+    """Aplica el pipeline y retorna JPEG en bytes (o el original si no conviene/no se puede)."""
+    data = read_bytes(src)
+    if not IMAGE_PREP_ENABLED:
+        return data
+
+    max_edge = max_edge or IMAGE_MAX_EDGE
+    quality = quality or IMAGE_JPEG_QUALITY
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            orig_format = img.format
+            if orig_format == "JPEG" and roi is None:
+                # decodifica directo a escala reducida (DCT) cuando sobra resolución
+                img.draft("RGB", (max_edge, max_edge))
+            rotated = img.getexif().get(0x0112, 1) not in (1, None)
+            img = ImageOps.exif_transpose(img)
+
+            if roi is not None:
+                w, h = img.size
+                l, t, r, b = roi
+                img = img.crop((int(l * w), int(t * h), int(r * w), int(b * h)))
+
+            resized = max(img.size) > max_edge
+            if resized:
+                img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=quality, optimize=True)
+            result = out.getvalue()
+    except Exception:
+        return data
+
+    # JPEG ya chico y sin cambios geométricos: no re-codificar si no ahorra bytes
+    if orig_format == "JPEG" and roi is None and not rotated and not resized and len(result) >= len(data):
+        return data
+    return result
@@ -0,0 +1,82 @@
+# ai/services/login_service.py
+"""
+Armado de la respuesta de login biométrico (tokens JWT + rol + permisos).
+Compartido por las vistas sync (DRF) y async (ASGI) para que respondan igual.
+"""
+from __future__ import annotations
+import logging
+from typing import Any, Dict, List, Optional
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ai.services.timing import stage
+
+log = logging.getLogger(__name__)
+
+VISITOR_ROLE_NAMES = ("Visitante", "VISITOR")
+
+
+def role_permissions(role) -> List[str]:
+    """Permisos del rol: intenta 'codename' -> 'code' -> 'name'."""
+    if role is None or not hasattr(role, "permissions"):
+        return []
+    try:
+        model_fields = {f.name for f in role.permissions.model._meta.fields}
+        for field in ("codename", "code", "name"):
+            if field in model_fields:
+                with stage("db.permissions"):
+                    return list(role.permissions.values_list(field, flat=True))
+    except Exception:
+        log.exception("No se pudieron leer los permisos del rol %s", getattr(role, "pk", None))
+    return []
+
+
+def is_visitor_role(role_name: Optional[str]) -> bool:
+    return role_name in VISITOR_ROLE_NAMES
+
+
+def user_summary(user, role_name: Optional[str]) -> Dict[str, Any]:
+    return {
+        "id": user.id,
+        "email": getattr(user, "email", ""),
+        "first_name": getattr(user, "first_name", ""),
+        "last_name": getattr(user, "last_name", ""),
+        "role": {"name": role_name} if role_name else None,
+    }
+
+
+def issue_tokens(user) -> Dict[str, str]:
+    with stage("jwt.tokens"):
+        refresh = RefreshToken.for_user(user)
+        return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+
+def face_login_payload(user, similarity: Optional[float], perms: List[str], tokens: Dict[str, str]) -> Dict[str, Any]:
+    """Cuerpo de /face/login/ cuando hay coincidencia."""
+    role_name = getattr(getattr(user, "role", None), "name", None)
+    return {
+        "recognized": True,
+        "similarity": similarity,
+        "user": user_summary(user, role_name),
+        "access": tokens["access"],
+        "refresh": tokens["refresh"],
+        "role": role_name,
+        "permissions": perms,
+    }
+
+
+def visitor_login_payload(user, session_id: int, similarity: Optional[float], perms: List[str],
+                          tokens: Dict[str, str]) -> Dict[str, Any]:
+    """Cuerpo de /visitor/login/ cuando hay coincidencia y el usuario es visitante."""
+    role_name = getattr(getattr(user, "role", None), "name", None)
+    return {
+        "ok": True,
+        "user_id": user.id,
+        "session_id": session_id,
+        "similarity": similarity,
+        "access": tokens["access"],
+        "refresh": tokens["refresh"],
+        "role": role_name,
+        "permissions": perms,
+        "user": user_summary(user, role_name),
+    }
@@ -0,0 +1,113 @@
+# ai/services/match_cache.py
+"""
+Cache corto (segundos) de resultados de search_by_image.
+
+Los kioscos reintentan el login con cuadros casi idénticos; la clave es el
+ámbito (prefijo S3 + colecciones) y un hash perceptual (dHash 256 bits) de la
+imagen normalizada.
+
+Desactivado por defecto (FACE_MATCH_CACHE_TTL=0): un acierto devuelve el
+external_id de otra búsqueda sin mirar el rostro, así que dentro del TTL otra
+persona encuadrada igual en el mismo kiosco podría entrar como la anterior.
+Por eso, al activarlo, por defecto solo vale el hash exacto; aceptar hashes
+a distancia de Hamming <= FACE_MATCH_CACHE_MAX_DISTANCE es una decisión
+explícita del despliegue.
+"""
+from __future__ import annotations
+import io, os, time, threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+FACE_MATCH_CACHE_TTL          = float(os.getenv("FACE_MATCH_CACHE_TTL", "0"))     # 0 = desactivado
+FACE_MATCH_CACHE_SIZE         = int(os.getenv("FACE_MATCH_CACHE_SIZE", "256"))
+FACE_MATCH_CACHE_MAX_DISTANCE = int(os.getenv("FACE_MATCH_CACHE_MAX_DISTANCE", "0"))  # bits de 256; 0 = hash exacto
+HASH_SIDE = 16
+
+# valor = (external_id, similarity, s3_key)
+Result = Tuple[Optional[str], Optional[float], str]
+
+
+def perceptual_hash(data: bytes) -> Optional[int]:
+    """
+    dHash de 256 bits: gris 17x16, compara cada píxel con su vecino derecho.
+    (Con 64 bits un reintento y otra cara con el mismo fondo quedan a la misma distancia.)
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            small = img.convert("L").resize((HASH_SIDE + 1, HASH_SIDE), Image.BILINEAR)
+    except Exception:
+        return None
+    px = small.load()
+    h = 0
+    for y in range(HASH_SIDE):
+        for x in range(HASH_SIDE):
+            h = (h << 1) | (1 if px[x, y] > px[x + 1, y] else 0)
+    return h
+
+
+class MatchCache:
+    """LRU acotado con TTL; thread-safe."""
+
+    def __init__(self, ttl: float, max_size: int, max_distance: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self._data: "OrderedDict[Tuple[str, int], Tuple[float, Result]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, scope: str, phash: int) -> Optional[Result]:
+        now = time.monotonic()
+        with self._lock:
+            found = None
+            if self.max_distance <= 0:
+                # hash exacto: lookup directo
+                k = (scope, phash)
+                item = self._data.get(k)
+                if item is not None and item[0] <= now:
+                    del self._data[k]
+                    self._stats["expired"] += 1
+                elif item is not None:
+                    found = (k, item[1])
+            else:
+                for k in list(self._data.keys()):
+                    exp, val = self._data[k]
+                    if exp <= now:
+                        del self._data[k]
+                        self._stats["expired"] += 1
+                        continue
+                    if found is None and k[0] == scope and bin(k[1] ^ phash).count("1") <= self.max_distance:
+                        found = (k, val)
+            if found is None:
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(found[0])
+            self._stats["hits"] += 1
+            return found[1]
+
+    def put(self, scope: str, phash: int, value: Result) -> None:
+        with self._lock:
+            k = (scope, phash)
+            self._data[k] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(k)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, size=len(self._data), ttl=self.ttl, max_size=self.max_size)
+
+
+match_cache = MatchCache(FACE_MATCH_CACHE_TTL, FACE_MATCH_CACHE_SIZE, FACE_MATCH_CACHE_MAX_DISTANCE)
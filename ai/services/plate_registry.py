@@ -0,0 +1,278 @@
+# ai/services/plate_registry.py
+"""
+Registro de placas en memoria (por proceso) para verificar en el portón
+sin consultar ai_plate en cada auto.
+
+- `owners`: placa normalizada -> tupla de user_ids (las llaves son el set
+  de placas registradas). Se reemplaza entero en cada cambio
+  (copy-on-write), así las lecturas no necesitan lock.
+- Se carga desde `Plate` al arrancar (backend/asgi.py, wsgi.py) o en la
+  primera consulta.
+- Cambios en este proceso: las señales post_save/post_delete de Plate
+  (ai/models/plate.py) actualizan la copia local al hacer commit e
+  incrementan el sello `RegistryVersion("plates")`.
+- Cambios en otros workers: cada PLATE_REGISTRY_CHECK_S segundos se lee el
+  sello (una fila) y si cambió se recarga. Esa es la única consulta a BD
+  del camino de verificación, y no depende del tráfico.
+
+Escrituras masivas (queryset.update/delete, bulk_create) no disparan
+señales: después de hacerlas hay que llamar a `bump_version()`.
+
+Búsqueda tolerante a errores de OCR (`match`), precalculada en cada carga:
+- llave canónica: cada carácter confundible se lleva a su grupo
+  (O/Q/D->0, I/L->1, Z->2, S->5, G->6, B->8), así "AB0123" y "ABO123"
+  comparten llave;
+- vecindario de borrados sobre la llave canónica (estilo SymSpell): cada
+  llave se indexa también con cada variante sin un carácter, y la consulta
+  solo cruza sus propias variantes. Encuentra distancia de edición 1
+  (sustitución, inserción o borrado) sin recorrer todas las placas.
+
+Una lectura a distancia 1 puede ser otra placa (ABC124 no es ABC123): esas
+candidatas son solo sugerencias (`match(..., suggestions=True)`) y no
+cuentan como placa registrada.
+"""
+from __future__ import annotations
+import os, re, logging, threading, time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import F
+
+from ai.models import Plate, RegistryVersion
+
+log = logging.getLogger(__name__)
+
+PLATE_REGISTRY_CHECK_S     = float(os.getenv("PLATE_REGISTRY_CHECK_S", "5"))
+PLATE_MATCH_MIN_CONFIDENCE = float(os.getenv("PLATE_MATCH_MIN_CONFIDENCE", "0.75"))   # > CONF_EDIT
+PLATE_MATCH_MAX_CONFUSED   = int(os.getenv("PLATE_MATCH_MAX_CONFUSED", "2"))   # más = otra placa, no un error de OCR
+REGISTRY_NAME = "plates"
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]")
+
+# Confusiones típicas del OCR en placas: todo el grupo se lleva a su primer carácter
+_CONFUSION_GROUPS = ("0OQD", "1IL", "2Z", "5S", "6G", "8B")
+_CANON = str.maketrans({c: g[0] for g in _CONFUSION_GROUPS for c in g})
+
+# Confianza por tipo de coincidencia
+CONF_EXACT     = 1.0
+CONF_CONFUSION = 0.9    # menos 0.05 por cada carácter confundido extra
+CONF_EDIT      = 0.7    # distancia 1 sobre la llave canónica (solo sugerencias)
+
+
+def normalize_plate(number: Optional[str]) -> Optional[str]:
+    """' abc-123 ' -> 'ABC123' (mayúsculas, sin espacios ni guiones). None/'' -> None."""
+    if not number:
+        return None
+    return _NON_ALNUM.sub("", str(number).upper()) or None
+
+
+def canonical(key: str) -> str:
+    return key.translate(_CANON)
+
+
+def _deletes(key: str) -> Set[str]:
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Levenshtein(a, b) <= 1 sin armar la matriz."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        return sum(x != y for x, y in zip(a, b)) == 1
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+@dataclass(frozen=True)
+class PlateCandidate:
+    number: str                  # placa registrada (normalizada)
+    owner_ids: Tuple[int, ...]
+    confidence: float            # 0..1
+    kind: str                    # exact | confusion | edit1
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"number": self.number, "owner_ids": list(self.owner_ids),
+                "confidence": self.confidence, "kind": self.kind}
+
+
+class _Snapshot:
+    """Placas + índices derivados; no se modifica una vez construido."""
+
+    def __init__(self, owners: Dict[str, Tuple[int, ...]]):
+        self.owners = owners
+        canon: Dict[str, Set[str]] = {}
+        dels: Dict[str, Set[str]] = {}
+        for number in owners:
+            c = canonical(number)
+            canon.setdefault(c, set()).add(number)
+            for v in _deletes(c) | {c}:
+                dels.setdefault(v, set()).add(c)
+        self.canon: Dict[str, FrozenSet[str]] = {k: frozenset(v) for k, v in canon.items()}
+        self.dels: Dict[str, FrozenSet[str]] = {k: frozenset(v) for k, v in dels.items()}
+
+
+def current_version() -> int:
+    return RegistryVersion.objects.filter(name=REGISTRY_NAME).values_list("version", flat=True).first() or 0
+
+
+def bump_version() -> int:
+    """Incrementa el sello para que los demás workers recarguen. Retorna la versión nueva."""
+    stamp = RegistryVersion.objects.filter(name=REGISTRY_NAME)
+    if not stamp.update(version=F("version") + 1):
+        _, created = RegistryVersion.objects.get_or_create(name=REGISTRY_NAME, defaults={"version": 1})
+        if not created:   # otro proceso creó la fila en el medio
+            stamp.update(version=F("version") + 1)
+    return current_version()
+
+
+class PlateRegistry:
+    def __init__(self):
+        self._snap = _Snapshot({})
+        self._version: Optional[int] = None     # None = nunca cargado
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ----- carga / sincronización -----
+    def load(self) -> int:
+        """Carga completa desde ai_plate. Retorna la cantidad de placas."""
+        version = current_version()   # antes de leer: un cambio concurrente fuerza otra recarga
+        rows = Plate.objects.values_list("number", "user_id").iterator()
+        return self.load_rows(rows, version=version)
+
+    def load_rows(self, rows: Iterable[Tuple[str, int]], *, version: int = 0) -> int:
+        """Reemplaza el contenido con filas (número, user_id). También lo usan los benchmarks."""
+        owners: Dict[str, Set[int]] = {}
+        for number, user_id in rows:
+            key = normalize_plate(number)
+            if key:
+                owners.setdefault(key, set()).add(user_id)
+        snap = _Snapshot({k: tuple(sorted(v)) for k, v in owners.items()})
+        with self._lock:
+            self._snap = snap
+            self._version = version
+            self._checked_at = time.monotonic()
+        return len(snap.owners)
+
+    def _maybe_refresh(self) -> None:
+        if self._version is None:
+            self.load()
+            return
+        if time.monotonic() - self._checked_at < PLATE_REGISTRY_CHECK_S:
+            return
+        self._checked_at = time.monotonic()
+        if current_version() != self._version:
+            self.load()
+
+    # ----- cambios locales (señales) -----
+    def apply(self, number: str, user_id: int, present: bool, *, version: Optional[int] = None) -> None:
+        """
+        Aplica un cambio hecho en este proceso. `version` es la que devolvió
+        bump_version(): si es la siguiente a la cargada se adopta, así el
+        cambio propio no dispara una recarga completa; si no (otro worker
+        escribió en el medio) se deja la anterior y _maybe_refresh recarga.
+        """
+        key = normalize_plate(number)
+        if not key or self._version is None:
+            return
+        with self._lock:
+            if version is not None and version == self._version + 1:
+                self._version = version
+            owners = dict(self._snap.owners)
+            ids = set(owners.get(key, ()))
+            (ids.add if present else ids.discard)(user_id)
+            if ids:
+                owners[key] = tuple(sorted(ids))
+            else:
+                owners.pop(key, None)
+            self._snap = _Snapshot(owners)
+
+    # ----- lecturas -----
+    def owners(self, number: Optional[str]) -> Tuple[int, ...]:
+        """Dueños por coincidencia exacta (normalizada)."""
+        self._maybe_refresh()
+        key = normalize_plate(number)
+        return self._snap.owners.get(key, ()) if key else ()
+
+    def exists(self, number: Optional[str]) -> bool:
+        return bool(self.owners(number))
+
+    def match(self, number: Optional[str], min_confidence: float | None = None, *,
+              suggestions: bool = False) -> List[PlateCandidate]:
+        """
+        Candidatos para una lectura de OCR, de mayor a menor confianza.
+        Si hay coincidencia exacta se retorna solo esa; si no, las de confusión
+        (hasta PLATE_MATCH_MAX_CONFUSED caracteres confundidos) con confianza
+        >= min_confidence (PLATE_MATCH_MIN_CONFIDENCE por defecto).
+        suggestions=True: si no hubo ninguna, agrega las de distancia 1
+        (kind "edit1"), que no prueban que la placa esté registrada.
+        """
+        self._maybe_refresh()
+        key = normalize_plate(number)
+        if not key:
+            return []
+        snap = self._snap
+        if key in snap.owners:
+            return [PlateCandidate(key, snap.owners[key], CONF_EXACT, "exact")]
+
+        floor = PLATE_MATCH_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        c = canonical(key)
+        out: List[PlateCandidate] = []
+        for n in snap.canon.get(c, ()):
+            confused = sum(x != y for x, y in zip(n, key))
+            if confused > PLATE_MATCH_MAX_CONFUSED:
+                continue
+            conf = CONF_CONFUSION - 0.05 * (confused - 1)
+            out.append(PlateCandidate(n, snap.owners[n], round(conf, 2), "confusion"))
+        out = [x for x in out if x.confidence >= floor]
+        if not out and suggestions:
+            near: Set[str] = set()
+            for v in _deletes(c) | {c}:
+                near |= snap.dels.get(v, frozenset())
+            for k in near:
+                if k != c and _within_one_edit(k, c):
+                    out.extend(PlateCandidate(n, snap.owners[n], CONF_EDIT, "edit1") for n in snap.canon[k])
+        out.sort(key=lambda x: (-x.confidence, x.number))
+        return out
+
+    def numbers(self) -> Iterable[str]:
+        self._maybe_refresh()
+        return self._snap.owners.keys()
+
+    def stats(self) -> Dict[str, object]:
+        return {"plates": len(self._snap.owners), "canonical_keys": len(self._snap.canon),
+                "version": self._version,
+                "checked_s_ago": round(time.monotonic() - self._checked_at, 1) if self._checked_at else None}
+
+
+plate_registry = PlateRegistry()
+
+
+def on_plate_changed(number: str, user_id: int, present: bool, *, reload: bool = False) -> None:
+    """
+    Llamado desde las señales de Plate: al confirmar la transacción sella la
+    versión y actualiza la copia local. reload=True (edición de una placa
+    existente, no se conoce el valor anterior) recarga completo.
+    """
+    def _commit():
+        version = bump_version()
+        if reload:
+            plate_registry.load()
+        else:
+            plate_registry.apply(number, user_id, present, version=version)
+    transaction.on_commit(_commit)
+
+
+def warm() -> None:
+    """Carga inicial al arrancar el proceso; si la BD no está lista se carga en la primera consulta."""
+    try:
+        plate_registry.load()
+    except Exception as e:
+        log.warning("No se pudo precargar el registro de placas (se carga en la primera consulta): %s", e)
@@ -1,58 +1,229 @@
-import os, uuid, boto3, re
+import os, uuid, re, json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from botocore.exceptions import ClientError
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
 from ai.models.plate import Plate
+from ai.services.aws_clients import get_client
+from ai.services.image_prep import Roi, normalize_image, parse_roi
+from ai.services.s3_archive import archive_bytes
+from ai.services.timing import stage
 
-AWS_ACCESS_KEY_ID     = os.getenv("AWS_ACCESS_KEY_ID", "")
-AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
-AWS_REGION            = os.getenv("AWS_REGION", "us-east-1")
-BUCKET                = os.getenv("AWS_STORAGE_BUCKET_NAME", "")
+BUCKET = os.getenv("AWS_STORAGE_BUCKET_NAME", "")
+# Región de interés de la cámara de placas (fracciones "l,t,r,b"; vacío = cuadro completo)
+PLATE_ROI = parse_roi(os.getenv("PLATE_ROI", "").strip())
+# Varios cuadros del mismo vehículo (detect_plate_multi)
+PLATE_MAX_FRAMES  = int(os.getenv("PLATE_MAX_FRAMES", "8"))
+PLATE_OCR_WORKERS = int(os.getenv("PLATE_OCR_WORKERS", "4"))   # llamadas simultáneas a Rekognition
+# Mandar los bytes a detect_text (la copia en S3 se archiva en segundo plano) en vez de subir y leer de S3
+PLATE_INLINE_BYTES = os.getenv("PLATE_INLINE_BYTES", "1").strip() not in ("0", "false", "False", "")
+REKOGNITION_MAX_BYTES = 5 * 1024 * 1024  # límite de Image.Bytes en Rekognition
+REKOGNITION_MAX_REGIONS = 10             # límite de Filters.RegionsOfInterest
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
-)
-rekognition = boto3.client(
-    "rekognition",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
+_IGNORED_WORDS = {"BOLIVIA", "L"}
+_PLATE_RE = re.compile(r"^[A-Z0-9]{4,10}$")   # letras y números juntos
+
+# ---------------------------
+# Config de OCR por cámara
+# ---------------------------
+def _parse_regions(value) -> Tuple[Roi, ...]:
+    """ "l,t,r,b;l,t,r,b" o lista de ROIs -> tupla (máximo REKOGNITION_MAX_REGIONS)."""
+    if not value:
+        return ()
+    items = value.split(";") if isinstance(value, str) else value
+    regions = tuple(r for r in (parse_roi(v) for v in items if v) if r)
+    if len(regions) > REKOGNITION_MAX_REGIONS:
+        raise ValueError(f"Máximo {REKOGNITION_MAX_REGIONS} regiones por cámara: {value!r}")
+    return regions
+
+@dataclass(frozen=True)
+class PlateCamera:
+    """
+    Cómo leer placas de una cámara.
+    - roi: recorte local antes de enviar (menos bytes y menos texto).
+    - regions: regiones donde Rekognition busca texto, relativas a la imagen ya recortada.
+    - min_confidence / min_box_height / min_box_width: WordFilter de Rekognition
+      (confianza 0..100; alto/ancho mínimo de la palabra como fracción de la imagen).
+      En 0 no se filtra (como antes); cada cámara lo activa si le sirve.
+    """
+    roi: Optional[Roi] = None
+    regions: Tuple[Roi, ...] = ()
+    min_confidence: float = 0.0
+    min_box_height: float = 0.0
+    min_box_width: float = 0.0
+
+    def filters(self) -> Dict[str, Any]:
+        """Parámetro Filters de detect_text ({} = sin filtros)."""
+        word = {}
+        if self.min_confidence > 0:
+            word["MinConfidence"] = self.min_confidence
+        if self.min_box_height > 0:
+            word["MinBoundingBoxHeight"] = self.min_box_height
+        if self.min_box_width > 0:
+            word["MinBoundingBoxWidth"] = self.min_box_width
+        out: Dict[str, Any] = {}
+        if word:
+            out["WordFilter"] = word
+        if self.regions:
+            out["RegionsOfInterest"] = [
+                {"BoundingBox": {"Left": l, "Top": t, "Width": round(r - l, 4), "Height": round(b - t, 4)}}
+                for l, t, r, b in self.regions
+            ]
+        return out
+
+    def with_overrides(self, cfg: Dict[str, Any]) -> "PlateCamera":
+        return PlateCamera(
+            roi=parse_roi(cfg["roi"]) if "roi" in cfg else self.roi,
+            regions=_parse_regions(cfg["regions"]) if "regions" in cfg else self.regions,
+            min_confidence=float(cfg.get("min_confidence", self.min_confidence)),
+            min_box_height=float(cfg.get("min_box_height", self.min_box_height)),
+            min_box_width=float(cfg.get("min_box_width", self.min_box_width)),
+        )
+
+# Valores por defecto (env) y overrides por cámara:
+# PLATE_CAMERAS='{"gate1": {"roi": "0,0.4,1,1", "regions": ["0.2,0.3,0.8,0.9"], "min_box_height": 0.04}}'
+PLATE_DEFAULT_CAMERA = PlateCamera(
+    roi=PLATE_ROI,
+    regions=_parse_regions(os.getenv("PLATE_TEXT_REGIONS", "").strip()),
+    min_confidence=float(os.getenv("PLATE_MIN_CONFIDENCE", "0")),
+    min_box_height=float(os.getenv("PLATE_MIN_BOX_HEIGHT", "0")),
+    min_box_width=float(os.getenv("PLATE_MIN_BOX_WIDTH", "0")),
 )
+PLATE_CAMERAS: Dict[str, PlateCamera] = {
+    str(cam_id): PLATE_DEFAULT_CAMERA.with_overrides(cfg or {})
+    for cam_id, cfg in json.loads(os.getenv("PLATE_CAMERAS", "").strip() or "{}").items()
+}
+
+def plate_camera(camera_id: Optional[str] = None) -> PlateCamera:
+    """Config de la cámara (o la por defecto si no se conoce / no se indica)."""
+    return PLATE_CAMERAS.get(str(camera_id), PLATE_DEFAULT_CAMERA) if camera_id else PLATE_DEFAULT_CAMERA
+
+def _s3():
+    return get_client("s3")
+
+def _rek():
+    return get_client("rekognition")
 
 def _upload_blob_to_s3(file_obj, key: str):
     extra = {"ContentType": "image/jpeg"}
-    if isinstance(file_obj, (InMemoryUploadedFile, TemporaryUploadedFile)):
-        file_obj.seek(0)
-        s3.upload_fileobj(file_obj, BUCKET, key, ExtraArgs=extra)
-    else:
-        s3.upload_file(file_obj, BUCKET, key, ExtraArgs=extra)
+    with stage("s3.upload"):
+        if isinstance(file_obj, (bytes, bytearray)):
+            _s3().put_object(Bucket=BUCKET, Key=key, Body=bytes(file_obj), **extra)
+        elif isinstance(file_obj, (InMemoryUploadedFile, TemporaryUploadedFile)):
+            file_obj.seek(0)
+            _s3().upload_fileobj(file_obj, BUCKET, key, ExtraArgs=extra)
+        else:
+            _s3().upload_file(file_obj, BUCKET, key, ExtraArgs=extra)
 
-def detect_plate(file_obj):
-    key = f"plates/{uuid.uuid4()}.jpg"
-    _upload_blob_to_s3(file_obj, key)
-
-    # Llamamos a Rekognition
-    resp = rekognition.detect_text(Image={"S3Object": {"Bucket": BUCKET, "Name": key}})
+def _image_ref(data: bytes, key: str) -> Dict[str, Any]:
+    """Bytes directo a detect_text (copia en S3 en segundo plano) o, si no aplica, subir y usar S3Object."""
+    if PLATE_INLINE_BYTES and len(data) <= REKOGNITION_MAX_BYTES:
+        archive_bytes(BUCKET, key, data)
+        return {"Bytes": data}
+    _upload_blob_to_s3(data, key)
+    return {"S3Object": {"Bucket": BUCKET, "Name": key}}
 
-    # Ordenar por confianza, de mayor a menor
+def _plate_words(resp) -> List[Tuple[str, float]]:
+    """
+    Palabras con forma de placa, de mayor a menor confianza: [(texto, confianza 0..100)].
+    La confianza mínima de la cámara ya la aplicó el WordFilter de detect_text.
+    """
     detections = sorted(resp["TextDetections"], key=lambda d: d["Confidence"], reverse=True)
-
-    candidate_plates = []
+    words = []
     for d in detections:
-        if d["Type"] == "WORD":
-            text = d["DetectedText"].strip().upper()
+        if d["Type"] != "WORD":
+            continue
+        text = d["DetectedText"].strip().upper()
+        if text in _IGNORED_WORDS:   # palabras comunes del marco de la placa
+            continue
+        if _PLATE_RE.match(text):
+            words.append((text, float(d["Confidence"])))
+    return words
 
-            # Ignorar palabras comunes
-            if text in ["BOLIVIA", "L"]:
-                continue
+def _read_frame(file_obj, camera: PlateCamera = PLATE_DEFAULT_CAMERA) -> Tuple[Optional[str], float, str]:
+    """Un cuadro: normaliza, envía a detect_text con los filtros de la cámara. Retorna (placa | None, confianza, s3_key)."""
+    key = f"plates/{uuid.uuid4()}.jpg"
+    with stage("plate.prep"):
+        data = normalize_image(file_obj, roi=camera.roi)
 
-            # Filtrar por patrón: letras y números juntos
-            if re.match(r"^[A-Z0-9]{4,10}$", text):
-                candidate_plates.append(text)
+    # Llamamos a Rekognition (los filtros recortan el texto detectado y la respuesta)
+    params: Dict[str, Any] = {"Image": _image_ref(data, key)}
+    filters = camera.filters()
+    if filters:
+        params["Filters"] = filters
+    with stage("rekognition.detect_text"):
+        resp = _rek().detect_text(**params)
 
     # Tomamos la primera coincidencia válida
-    plate_number = candidate_plates[0] if candidate_plates else None
+    words = _plate_words(resp)
+    text, conf = words[0] if words else (None, 0.0)
+    return text, conf, key
 
+def detect_plate(file_obj, camera_id: Optional[str] = None):
+    plate_number, _, key = _read_frame(file_obj, plate_camera(camera_id))
     return plate_number, key
+
+def vote_plate(reads: Sequence[Tuple[Optional[str], float]]) -> Tuple[Optional[str], float]:
+    """
+    Consenso entre lecturas del mismo vehículo [(texto | None, confianza 0..100)].
+    1) largo: el de mayor peso acumulado (peso = confianza del OCR);
+    2) por posición, entre las lecturas de ese largo, gana el carácter de mayor peso.
+    Confianza (0..1): acuerdo medio por posición * fracción de cuadros que votaron.
+    """
+    valid = [(t, max(c, 1.0) / 100.0) for t, c in reads if t]
+    if not valid:
+        return None, 0.0
+    by_len: Dict[int, float] = defaultdict(float)
+    for t, w in valid:
+        by_len[len(t)] += w
+    length = max(by_len, key=lambda n: (by_len[n], n))
+    aligned = [(t, w) for t, w in valid if len(t) == length]
+
+    chars, agreement = [], 0.0
+    for pos in range(length):
+        votes: Dict[str, float] = defaultdict(float)
+        for t, w in aligned:
+            votes[t[pos]] += w
+        ch = max(sorted(votes), key=votes.__getitem__)
+        chars.append(ch)
+        agreement += votes[ch] / sum(votes.values())
+    confidence = (agreement / length) * (len(aligned) / len(reads))
+    return "".join(chars), round(confidence, 3)
+
+def detect_plate_multi(frames, camera_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Varios cuadros del mismo vehículo: subida + detect_text en paralelo
+    (hasta PLATE_OCR_WORKERS a la vez) y voto por posición (ver vote_plate).
+    La latencia es la del cuadro más lento, no la suma. Un cuadro que falla
+    cuenta como "sin lectura"; si fallan todos se propaga el primer error.
+    Respuesta: {plate, confidence, frames, reads: [{index, text, confidence, s3_key, error}]}
+    """
+    frames = list(frames)[:PLATE_MAX_FRAMES]
+    if not frames:
+        raise ValueError("Se requiere al menos un cuadro")
+
+    camera = plate_camera(camera_id)
+    results: List[Optional[Tuple[Optional[str], float, str]]] = [None] * len(frames)
+    errors: Dict[int, Exception] = {}
+    with stage("plate.multi"):
+        workers = max(1, min(PLATE_OCR_WORKERS, len(frames)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plate-ocr") as pool:
+            futures = {pool.submit(_read_frame, f, camera): i for i, f in enumerate(frames)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    results[i] = fut.result()
+                except Exception as e:
+                    errors[i] = e
+    if len(errors) == len(frames):
+        raise errors[min(errors)]
+
+    reads = []
+    for i, r in enumerate(results):
+        text, conf, key = r if r else (None, 0.0, None)
+        reads.append({"index": i, "text": text, "confidence": round(conf, 1), "s3_key": key,
+                      "error": str(errors[i]) if i in errors else None})
+    plate_number, confidence = vote_plate([(r["text"], r["confidence"]) for r in reads])
+    return {"plate": plate_number, "confidence": confidence, "frames": len(frames), "reads": reads}
@@ -1,9 +1,4 @@
-import os, boto3
+from ai.services.aws_clients import rekognition as _shared_rekognition
 
 def rekognition():
-    return boto3.client(
-        "rekognition",
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-    )
+    return _shared_rekognition()
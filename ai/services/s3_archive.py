@@ -0,0 +1,78 @@
+# ai/services/s3_archive.py
+from __future__ import annotations
+import os, logging, threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Optional
+
+from ai.services.aws_clients import get_client
+
+log = logging.getLogger(__name__)
+
+# ---------------------------
+# Config
+# ---------------------------
+ARCHIVE_WORKERS     = int(os.getenv("S3_ARCHIVE_WORKERS", "4"))
+ARCHIVE_MAX_PENDING = int(os.getenv("S3_ARCHIVE_MAX_PENDING", "256"))   # subidas en cola + en curso
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, ARCHIVE_MAX_PENDING))
+_stats_lock = threading.Lock()
+_dropped = 0
+_failed = 0
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """Pool de hilos compartido y perezoso para las copias de archivo en S3."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS, thread_name_prefix="s3-archive")
+    return _pool
+
+
+def put_bytes(bucket: str, key: str, data: bytes, *, content_type: str = "image/jpeg") -> None:
+    """Sube `data` a s3://bucket/key de forma síncrona (propaga el error)."""
+    get_client("s3").put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
+
+
+def _put_background(bucket: str, key: str, data: bytes, content_type: str) -> None:
+    global _failed
+    try:
+        put_bytes(bucket, key, data, content_type=content_type)
+    except Exception:
+        # Nadie lee el Future: la copia de archivo no debe romper el login; solo se registra.
+        with _stats_lock:
+            _failed += 1
+        log.exception("No se pudo archivar s3://%s/%s", bucket, key)
+    finally:
+        _slots.release()
+
+
+def archive_bytes(bucket: str, key: str, data: bytes, *, content_type: str = "image/jpeg") -> Optional[Future]:
+    """
+    Encola la subida de `data` a s3://bucket/key en segundo plano (best effort).
+    Si ya hay S3_ARCHIVE_MAX_PENDING subidas pendientes la copia se descarta
+    (se cuenta en stats()) y retorna None; si no, retorna el Future.
+    Para copias que luego se referencian en BD (enrolamiento) usar put_bytes.
+    """
+    global _dropped
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _dropped += 1
+            dropped = _dropped
+        log.warning("Cola de archivo S3 llena (%d); se descarta s3://%s/%s (descartadas: %d)",
+                    ARCHIVE_MAX_PENDING, bucket, key, dropped)
+        return None
+    try:
+        return _get_pool().submit(_put_background, bucket, key, data, content_type)
+    except Exception:
+        _slots.release()
+        raise
+
+
+def stats() -> Dict[str, int]:
+    """Contadores del archivo en segundo plano desde que arrancó el proceso."""
+    with _stats_lock:
+        return {"dropped": _dropped, "failed": _failed}
@@ -1,12 +1,8 @@
-import os, boto3
+import os
+from ai.services.aws_clients import s3 as _shared_s3
 
 def s3():
-    return boto3.client(
-        "s3",
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-    )
+    return _shared_s3()
 
 def bucket_name():
     return os.getenv("AWS_STORAGE_BUCKET_NAME")
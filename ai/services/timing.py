@@ -0,0 +1,142 @@
+# ai/services/timing.py
+"""
+Tiempos por etapa del camino caliente (login facial, enrolamiento, placas).
+
+    with stage("rekognition.search"):
+        ...
+
+Cada etapa:
+- se acumula en un histograma en memoria del proceso (ver `snapshot`,
+  expuesto en /ai/metrics/),
+- y, si hay un request en curso (ServerTimingMiddleware), se agrega a su
+  lista para el header `Server-Timing`.
+
+La lista del request vive en un ContextVar: sync_to_async/async_to_sync
+copian el contexto, así que las etapas medidas en hilos de asgiref llegan
+al mismo request. Los pools propios (ThreadPoolExecutor) no lo copian; ahí
+solo se alimenta el histograma.
+"""
+from __future__ import annotations
+import bisect, contextvars, os, threading, time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+TIMING_ENABLED = os.getenv("TIMING_ENABLED", "1").strip() not in ("0", "false", "False", "")
+
+# límites superiores de los buckets, en ms (el último bucket es +inf)
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class Histogram:
+    """Histograma de latencias con buckets fijos (thread-safe)."""
+
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        i = bisect.bisect_left(self.buckets, ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Cota superior del bucket que contiene el percentil p (0..1), sin pasar del máximo visto."""
+        with self._lock:
+            counts, n, mx = list(self.counts), self.count, self.max_ms
+        if not n:
+            return None
+        rank, acc = p * n, 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= rank:
+                return min(float(self.buckets[i]), round(mx, 1)) if i < len(self.buckets) else round(mx, 1)
+        return round(mx, 1)
+
+    def as_dict(self) -> Dict[str, object]:
+        with self._lock:
+            counts, n, total, mx = list(self.counts), self.count, self.total_ms, self.max_ms
+        labels = [f"le_{b}" for b in self.buckets] + ["le_inf"]
+        return {
+            "count": n,
+            "avg_ms": round(total / n, 1) if n else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(mx, 1),
+            "buckets": dict(zip(labels, counts)),
+        }
+
+
+_histograms: Dict[str, Histogram] = {}
+_reg_lock = threading.Lock()
+
+
+def observe(name: str, ms: float) -> None:
+    """Registra una medición en el histograma y en el request en curso."""
+    if not TIMING_ENABLED:
+        return
+    h = _histograms.get(name)
+    if h is None:
+        with _reg_lock:
+            h = _histograms.setdefault(name, Histogram())
+    h.observe(ms)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, ms))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mide el bloque (también si levanta excepción)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - t0) * 1000.0)
+
+
+def snapshot() -> Dict[str, Dict[str, object]]:
+    with _reg_lock:
+        items = sorted(_histograms.items())
+    return {name: h.as_dict() for name, h in items}
+
+
+def reset() -> None:
+    with _reg_lock:
+        _histograms.clear()
+
+
+# ---------------------------
+# Por request (Server-Timing)
+# ---------------------------
+def begin_request() -> contextvars.Token:
+    return _request_timings.set([])
+
+
+def end_request(token: contextvars.Token) -> List[Tuple[str, float]]:
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total_ms: Optional[float] = None) -> str:
+    """[("s3.upload", 12.3)] -> 's3.upload;dur=12.3'. Etapas repetidas se suman."""
+    merged: Dict[str, float] = {}
+    for name, ms in timings:
+        merged[name] = merged.get(name, 0.0) + ms
+    parts = [f"{name};dur={ms:.1f}" for name, ms in merged.items()]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
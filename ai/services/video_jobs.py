@@ -0,0 +1,209 @@
+# ai/services/video_jobs.py
+"""
+Cola de análisis de video respaldada en BD (`VideoJob`).
+
+- `enqueue_video`: sube el video a S3 y crea el job en cola; el request
+  retorna de inmediato con el id (ver VideoJobStatusView).
+- Tomar un job es un UPDATE condicional (status queued -> running): si
+  varios procesos compiten, solo uno gana, sin locks de fila.
+- `run_claimed`: corre Rekognition y guarda las Alert + el estado final en
+  una sola transacción (un job nunca queda con alertas a medias).
+- Quién procesa:
+  * `python manage.py run_video_worker` (proceso aparte, paralelismo acotado),
+  * y/o, con VIDEO_JOB_INLINE=1, un pool acotado dentro del proceso web
+    (para despliegues con un solo servicio). Ambos usan el mismo claim.
+    Apagado por defecto: el Procfile corre el worker. railway.json solo
+    levanta el proceso web, así que ahí se enciende en el startCommand.
+- Un job "running" por más de VIDEO_JOB_STALE_S (worker caído) se vuelve a
+  encolar hasta VIDEO_JOB_MAX_ATTEMPTS intentos (ver `requeue_stale`). Lo
+  hace el worker y, con VIDEO_JOB_INLINE, un hilo de fondo del proceso web
+  (`start_inline_sweeper`, arrancado en backend/asgi.py) que además
+  despacha los jobs que quedaron en cola sin nadie que los tome.
+"""
+from __future__ import annotations
+import logging, os, socket, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ai.models import Alert, VideoJob
+from ai.services.aws_clients import get_client
+from ai.services.video_service import INPUT_BUCKET, process_video_and_return_events
+
+log = logging.getLogger(__name__)
+
+VIDEO_JOB_CONCURRENCY  = int(os.getenv("VIDEO_JOB_CONCURRENCY", "4"))
+VIDEO_JOB_MAX_ATTEMPTS = int(os.getenv("VIDEO_JOB_MAX_ATTEMPTS", "2"))
+VIDEO_JOB_STALE_S      = int(os.getenv("VIDEO_JOB_STALE_S", "1800"))
+VIDEO_JOB_INLINE       = os.getenv("VIDEO_JOB_INLINE", "0").strip() not in ("0", "false", "False", "")
+VIDEO_JOB_SWEEP_S      = float(os.getenv("VIDEO_JOB_SWEEP_S", "60"))   # barrido del pool en proceso; 0 = no
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ---------------------------
+# Encolar
+# ---------------------------
+def enqueue_video(file_obj, camera_id: Optional[str] = None) -> VideoJob:
+    ext = os.path.splitext(getattr(file_obj, "name", "") or "")[1] or ".mp4"
+    s3_key = f"videos/{uuid.uuid4().hex}{ext}"
+    get_client("s3").upload_fileobj(file_obj, INPUT_BUCKET, s3_key, ExtraArgs={"ContentType": "video/mp4"})
+    job = VideoJob.objects.create(s3_video_key=s3_key, camera_id=camera_id)
+    if VIDEO_JOB_INLINE:
+        transaction.on_commit(lambda: dispatch_inline(job.pk))
+    return job
+
+
+# ---------------------------
+# Tomar / recuperar
+# ---------------------------
+def claim(job_id: int, worker: str = WORKER_ID) -> bool:
+    """queued -> running si nadie lo tomó antes. True si lo tomó este worker."""
+    return bool(VideoJob.objects.filter(pk=job_id, status=VideoJob.QUEUED).update(
+        status=VideoJob.RUNNING, worker=worker, started_at=timezone.now(),
+        attempts=F("attempts") + 1, error="",
+    ))
+
+
+def claim_next(worker: str = WORKER_ID) -> Optional[int]:
+    """El job en cola más antiguo que se pueda tomar, o None."""
+    pending = (VideoJob.objects.filter(status=VideoJob.QUEUED)
+               .order_by("created_at", "id").values_list("pk", flat=True)[:10])
+    for pk in pending:
+        if claim(pk, worker):
+            return pk
+    return None
+
+
+def requeue_stale() -> int:
+    """Jobs 'running' abandonados: se re-encolan o, sin intentos restantes, se marcan fallidos."""
+    now = timezone.now()
+    stale = VideoJob.objects.filter(status=VideoJob.RUNNING,
+                                    started_at__lt=now - timedelta(seconds=VIDEO_JOB_STALE_S))
+    stale.filter(attempts__gte=VIDEO_JOB_MAX_ATTEMPTS).update(
+        status=VideoJob.FAILED, finished_at=now, error="worker sin respuesta")
+    return stale.update(status=VideoJob.QUEUED, worker="")
+
+
+# ---------------------------
+# Procesar
+# ---------------------------
+def run_job(job_id: int) -> str:
+    """Procesa un job ya tomado. Retorna el estado final (queued si se reintentará)."""
+    job = VideoJob.objects.get(pk=job_id)
+
+    def _started(rek_job_id: str) -> None:
+        VideoJob.objects.filter(pk=job.pk).update(rekognition_job_id=rek_job_id)
+
+    try:
+        events = process_video_and_return_events(job.s3_video_key, camera_id=job.camera_id, on_started=_started)
+    except Exception as e:
+        log.exception("VideoJob %s falló (intento %s)", job.pk, job.attempts)
+        retry = job.attempts < VIDEO_JOB_MAX_ATTEMPTS
+        status = VideoJob.QUEUED if retry else VideoJob.FAILED
+        VideoJob.objects.filter(pk=job.pk).update(
+            status=status, error=str(e)[:2000], worker="",
+            finished_at=None if retry else timezone.now(),
+        )
+        return status
+
+    alerts = [
+        Alert(
+            job=job,
+            type=ev["type"],
+            camera_id=job.camera_id,
+            s3_video_key=ev["s3_video_key"],
+            s3_image_key=ev.get("s3_image_key"),
+            timestamp_ms=ev["timestamp_ms"],
+            confidence=ev.get("confidence", 0.0),
+            extra=ev.get("extra", {}),
+        )
+        for ev in events
+    ]
+    with transaction.atomic():
+        Alert.objects.bulk_create(alerts)
+        VideoJob.objects.filter(pk=job.pk).update(status=VideoJob.SUCCEEDED, finished_at=timezone.now(), error="")
+    return VideoJob.SUCCEEDED
+
+
+def run_claimed(job_id: int) -> str:
+    """run_job para hilos de pool: cierra la conexión del hilo al terminar."""
+    try:
+        return run_job(job_id)
+    finally:
+        connection.close()
+
+
+# ---------------------------
+# Pool dentro del proceso web (VIDEO_JOB_INLINE)
+# ---------------------------
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=VIDEO_JOB_CONCURRENCY, thread_name_prefix="video-job")
+    return _pool
+
+
+def _claim_and_run(job_id: int) -> None:
+    try:
+        if claim(job_id):
+            if run_job(job_id) == VideoJob.QUEUED:
+                dispatch_inline(job_id)   # reintento
+    except Exception:
+        log.exception("VideoJob %s: error en el pool en proceso", job_id)
+    finally:
+        connection.close()
+
+
+def dispatch_inline(job_id: int) -> None:
+    """Encola en el pool del proceso. Si otro worker lo toma antes, el claim falla y no se hace nada."""
+    _get_pool().submit(_claim_and_run, job_id)
+
+
+def sweep() -> int:
+    """
+    Recupera lo que quedó sin dueño en el pool en proceso: re-encola los
+    'running' abandonados y despacha los que siguen en cola (reintentos, o
+    un proceso que se cayó antes de tomarlos). Retorna cuántos despachó.
+    """
+    requeue_stale()
+    pending = list(VideoJob.objects.filter(status=VideoJob.QUEUED)
+                   .order_by("created_at", "id").values_list("pk", flat=True)[:VIDEO_JOB_CONCURRENCY * 4])
+    for pk in pending:
+        dispatch_inline(pk)
+    return len(pending)
+
+
+_sweeper: Optional[threading.Thread] = None
+
+
+def _sweep_loop() -> None:
+    while True:
+        try:
+            sweep()
+        except Exception:
+            log.exception("Barrido de VideoJob falló")
+        finally:
+            connection.close()
+        time.sleep(VIDEO_JOB_SWEEP_S)
+
+
+def start_inline_sweeper() -> None:
+    """Con VIDEO_JOB_INLINE, corre `sweep` cada VIDEO_JOB_SWEEP_S en un hilo de fondo (una vez por proceso)."""
+    global _sweeper
+    if not VIDEO_JOB_INLINE or VIDEO_JOB_SWEEP_S <= 0:
+        return
+    with _pool_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_loop, name="video-job-sweeper", daemon=True)
+            _sweeper.start()
@@ -0,0 +1,199 @@
+# ai/services/video_notifications.py
+"""
+Aviso de fin de los jobs de video de Rekognition (StartLabelDetection).
+
+Rekognition publica el fin del job en un tópico SNS (NotificationChannel);
+el tópico entrega a una cola SQS y aquí un hilo por proceso la lee con long
+polling y despierta al hilo que espera ese JobId. Así no se llama a
+get_label_detection hasta que hay resultados.
+
+Canales (VIDEO_NOTIFY):
+- "sqs":   VIDEO_SNS_TOPIC_ARN + VIDEO_SNS_ROLE_ARN (para Rekognition) y
+           VIDEO_SQS_QUEUE_URL (suscrita al tópico).
+- "local": cola en memoria; alguien llama `publish(job_id, status)` (tests,
+           simuladores de Rekognition).
+- vacío:   sin canal; video_service espera con backoff adaptativo.
+
+Con varios procesos leyendo la misma cola, un aviso de un job ajeno se
+devuelve a la cola (visibilidad VIDEO_SQS_RELEASE_S) para que lo tome su
+dueño; tras VIDEO_SQS_MAX_RECEIVES entregas se descarta.
+"""
+from __future__ import annotations
+import json, logging, os, queue, threading, time
+from typing import Any, Dict, Optional
+
+from ai.services.aws_clients import get_client
+
+log = logging.getLogger(__name__)
+
+def _getenv(name: str, default: str = "") -> str:
+    return os.getenv(name, default).strip()
+
+VIDEO_NOTIFY          = _getenv("VIDEO_NOTIFY", "").lower()   # sqs | local | ""
+VIDEO_SNS_TOPIC_ARN   = _getenv("VIDEO_SNS_TOPIC_ARN")
+VIDEO_SNS_ROLE_ARN    = _getenv("VIDEO_SNS_ROLE_ARN")
+VIDEO_SQS_QUEUE_URL   = _getenv("VIDEO_SQS_QUEUE_URL")
+VIDEO_SQS_RELEASE_S   = int(_getenv("VIDEO_SQS_RELEASE_S", "5"))
+VIDEO_SQS_MAX_RECEIVES = int(_getenv("VIDEO_SQS_MAX_RECEIVES", "20"))
+
+DONE_TTL_S = 900   # avisos que llegaron antes de que alguien esperara el job
+
+TERMINAL = ("SUCCEEDED", "FAILED", "ERROR")
+
+
+class CompletionChannel:
+    """Registro de avisos por JobId + espera con timeout (común a todos los canales)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[str, threading.Event] = {}
+        self._done: Dict[str, tuple] = {}   # job_id -> (status, monotonic)
+
+    def notification_channel(self) -> Optional[Dict[str, str]]:
+        """Parámetro NotificationChannel para start_label_detection (None = no mandar)."""
+        return None
+
+    def _start(self) -> None:
+        pass
+
+    def _deliver(self, job_id: str, status: str) -> bool:
+        """Registra el aviso. True si hay alguien en este proceso esperando el job."""
+        now = time.monotonic()
+        with self._lock:
+            self._done[job_id] = (status, now)
+            for k in [k for k, (_, t) in self._done.items() if now - t > DONE_TTL_S]:
+                del self._done[k]
+            ev = self._events.get(job_id)
+        if ev is not None:
+            ev.set()
+        return ev is not None
+
+    def expect(self, job_id: str) -> None:
+        """Registrar interés en el job (antes de esperar, para no perder un aviso temprano)."""
+        self._start()
+        with self._lock:
+            ev = self._events.setdefault(job_id, threading.Event())
+            if job_id in self._done:
+                ev.set()
+
+    def wait(self, job_id: str, timeout: float) -> Optional[str]:
+        """Estado final del job si llega el aviso dentro de `timeout`; None si no."""
+        self.expect(job_id)
+        with self._lock:
+            ev = self._events[job_id]
+        if not ev.wait(timeout):
+            return None
+        with self._lock:
+            status = self._done.get(job_id, (None, 0))[0]
+        return status
+
+    def forget(self, job_id: str) -> None:
+        with self._lock:
+            self._events.pop(job_id, None)
+            self._done.pop(job_id, None)
+
+
+class LocalCompletionChannel(CompletionChannel):
+    """Cola en memoria con la misma forma que SQS: publish() encola, un hilo entrega."""
+
+    def __init__(self):
+        super().__init__()
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, job_id: str, status: str = "SUCCEEDED") -> None:
+        self._start()
+        self.queue.put({"JobId": job_id, "Status": status, "API": "StartLabelDetection"})
+
+    def _start(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="video-notify-local", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            msg = self.queue.get()
+            self._deliver(msg["JobId"], msg["Status"])
+
+
+class SqsCompletionChannel(CompletionChannel):
+    """SNS (Rekognition) -> SQS -> hilo con long polling."""
+
+    def __init__(self, queue_url: str, topic_arn: str, role_arn: str):
+        super().__init__()
+        self.queue_url, self.topic_arn, self.role_arn = queue_url, topic_arn, role_arn
+        self._thread: Optional[threading.Thread] = None
+
+    def notification_channel(self) -> Optional[Dict[str, str]]:
+        return {"SNSTopicArn": self.topic_arn, "RoleArn": self.role_arn}
+
+    def _start(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="video-notify-sqs", daemon=True)
+                    self._thread.start()
+
+    @staticmethod
+    def parse(body: str) -> Optional[Dict[str, Any]]:
+        """Cuerpo SQS (sobre de SNS o entrega 'raw') -> {"JobId", "Status", "API", ...}."""
+        try:
+            msg = json.loads(body)
+            if "Message" in msg and "JobId" not in msg:   # sobre de SNS
+                msg = json.loads(msg["Message"])
+            return msg if "JobId" in msg else None
+        except (TypeError, ValueError):
+            return None
+
+    def _run(self) -> None:
+        sqs = get_client("sqs")
+        while True:
+            try:
+                resp = sqs.receive_message(
+                    QueueUrl=self.queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=20,
+                    AttributeNames=["ApproximateReceiveCount"],
+                )
+            except Exception:
+                log.exception("No se pudo leer %s", self.queue_url)
+                time.sleep(5)
+                continue
+            for m in resp.get("Messages", []):
+                self._handle(sqs, m)
+
+    def _handle(self, sqs, m: Dict[str, Any]) -> None:
+        msg = self.parse(m.get("Body", ""))
+        receives = int(m.get("Attributes", {}).get("ApproximateReceiveCount", "1"))
+        try:
+            if msg is None:
+                sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=m["ReceiptHandle"])
+            elif self._deliver(str(msg["JobId"]), str(msg.get("Status", "")).upper()) \
+                    or receives >= VIDEO_SQS_MAX_RECEIVES:
+                sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=m["ReceiptHandle"])
+            else:   # probablemente de otro proceso: devolverlo a la cola
+                sqs.change_message_visibility(QueueUrl=self.queue_url, ReceiptHandle=m["ReceiptHandle"],
+                                              VisibilityTimeout=VIDEO_SQS_RELEASE_S)
+        except Exception:
+            log.exception("No se pudo confirmar el aviso SQS %s", m.get("MessageId"))
+
+
+_channel: Optional[CompletionChannel] = None
+_channel_lock = threading.Lock()
+
+
+def get_channel() -> Optional[CompletionChannel]:
+    """Canal configurado por env (uno por proceso) o None si se usa solo polling."""
+    global _channel
+    if _channel is None and VIDEO_NOTIFY:
+        with _channel_lock:
+            if _channel is None:
+                if VIDEO_NOTIFY == "local":
+                    _channel = LocalCompletionChannel()
+                elif VIDEO_NOTIFY == "sqs":
+                    if not (VIDEO_SQS_QUEUE_URL and VIDEO_SNS_TOPIC_ARN and VIDEO_SNS_ROLE_ARN):
+                        raise RuntimeError("VIDEO_NOTIFY=sqs requiere VIDEO_SQS_QUEUE_URL, VIDEO_SNS_TOPIC_ARN y VIDEO_SNS_ROLE_ARN")
+                    _channel = SqsCompletionChannel(VIDEO_SQS_QUEUE_URL, VIDEO_SNS_TOPIC_ARN, VIDEO_SNS_ROLE_ARN)
+                else:
+                    raise RuntimeError(f"VIDEO_NOTIFY desconocido: {VIDEO_NOTIFY!r}")
+    return _channel
@@ -0,0 +1,295 @@
+# ai/services/video_rules.py
+"""
+Reglas declarativas de alertas de video (sobre las labels de Rekognition).
+
+Una regla (`AlertRule`, o su forma dict/JSON) dice, para un timestamp:
+- "all":    labels que tienen que estar todas en ese instante,
+- "any":    labels de las que basta una,
+- "near":   {label: ms} que tiene que aparecer a <= ms (antes o después),
+- "absent": {label: ms} que NO puede aparecer a <= ms,
+- "min_label_confidence": umbral de las labels de la regla (además de MIN_CONFIDENCE),
+- "confidence": confianza del evento generado,
+- "dedup_ms": un evento del mismo tipo cada tantos ms.
+
+    {"type": "dog_loose", "all": ["Dog"], "absent": {"Person": 2000}, "confidence": 90}
+
+`RuleSet` compila un conjunto de reglas a una sola pasada por la línea de
+tiempo ordenada: un índice label -> reglas decide qué reglas mirar en cada
+instante, las labels con ventana se van anotando en listas ordenadas, y
+las candidatas con ventana esperan en una cola por regla hasta que su
+ventana ya pasó (ahí se resuelven con bisect). Agregar reglas no agrega
+pasadas.
+
+Reglas por cámara: tabla `VideoAlertRule` (ver `rules_for_camera`). Una
+cámara con reglas propias usa solo esas; si no, las globales (camera_id
+vacío); si no hay ninguna, DEFAULT_RULES. Los tipos tienen que estar en
+Alert.TYPE_CHOICES. Las reglas se leen de una vez y se cachean (ya
+compiladas, junto con los tipos conocidos) por VIDEO_RULES_CACHE_S
+segundos; las señales de VideoAlertRule invalidan la copia del proceso.
+"""
+from __future__ import annotations
+import logging, os, threading, time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from ai.models import Alert, VideoAlertRule
+
+log = logging.getLogger(__name__)
+
+VIDEO_RULES_CACHE_S = float(os.getenv("VIDEO_RULES_CACHE_S", "60"))
+
+Timeline = List[Tuple[int, Dict[str, float]]]   # [(timestamp_ms, {label: confianza})] ordenada
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    type: str
+    all_of: FrozenSet[str] = frozenset()
+    any_of: FrozenSet[str] = frozenset()
+    near: Tuple[Tuple[str, int], ...] = ()
+    absent: Tuple[Tuple[str, int], ...] = ()
+    min_label_confidence: float = 0.0
+    confidence: float = 80.0
+    dedup_ms: int = 3000
+
+    @property
+    def window_ms(self) -> int:
+        return max((ms for _, ms in self.near + self.absent), default=0)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "AlertRule":
+        """Forma JSON -> regla. ValueError si no es válida."""
+        if not isinstance(d, dict) or not str(d.get("type") or "").strip():
+            raise ValueError("la regla necesita 'type'")
+
+        def _labels(key) -> FrozenSet[str]:
+            v = d.get(key) or []
+            if isinstance(v, str) or not all(isinstance(x, str) and x for x in v):
+                raise ValueError(f"'{key}' debe ser una lista de labels")
+            return frozenset(v)
+
+        def _windows(key) -> Tuple[Tuple[str, int], ...]:
+            v = d.get(key) or {}
+            if not isinstance(v, dict):
+                raise ValueError(f"'{key}' debe ser {{label: ms}}")
+            out = []
+            for lbl, ms in sorted(v.items()):
+                if int(ms) < 0:
+                    raise ValueError(f"ventana negativa en '{key}': {lbl}")
+                out.append((str(lbl), int(ms)))
+            return tuple(out)
+
+        rule = cls(
+            type=str(d["type"]).strip(),
+            all_of=_labels("all"),
+            any_of=_labels("any"),
+            near=_windows("near"),
+            absent=_windows("absent"),
+            min_label_confidence=float(d.get("min_label_confidence", 0.0)),
+            confidence=float(d.get("confidence", 80.0)),
+            dedup_ms=int(d.get("dedup_ms", 3000)),
+        )
+        if not rule.all_of and not rule.any_of:
+            raise ValueError("la regla necesita 'all' o 'any'")
+        return rule
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "type": self.type, "all": sorted(self.all_of), "any": sorted(self.any_of),
+            "near": dict(self.near), "absent": dict(self.absent),
+            "min_label_confidence": self.min_label_confidence,
+            "confidence": self.confidence, "dedup_ms": self.dedup_ms,
+        }
+
+
+# Lo que hacía detect_events a mano
+WASTE_LABELS = ["Poop", "Feces", "Excrement", "Animal Droppings", "Dung"]
+DEFAULT_RULES: Tuple[AlertRule, ...] = tuple(AlertRule.from_dict(d) for d in (
+    # Perro suelto: Dog sin Person cerca (+/-2s)
+    {"type": "dog_loose", "all": ["Dog"], "absent": {"Person": 2000}, "confidence": 90.0},
+    # Perro haciendo necesidades (heurística simple): Dog + etiqueta de desechos
+    {"type": "dog_waste", "all": ["Dog"], "any": WASTE_LABELS, "confidence": 85.0},
+    # Vehículo mal estacionado (por ahora, cualquier Car/Truck)
+    {"type": "bad_parking", "any": ["Car", "Truck"], "confidence": 80.0},
+))
+
+
+def _within(occurrences: List[int], ts: int, ms: int) -> bool:
+    i = bisect_left(occurrences, ts - ms)
+    return i < len(occurrences) and occurrences[i] <= ts + ms
+
+
+class RuleSet:
+    """Reglas compiladas para evaluarse en una pasada."""
+
+    def __init__(self, rules: Iterable[AlertRule]):
+        self.rules: Tuple[AlertRule, ...] = tuple(rules)
+        # label -> reglas que pueden dispararse si aparece (una label de "all" o cada una de "any")
+        self._trigger: Dict[str, List[int]] = {}
+        for i, r in enumerate(self.rules):
+            for lbl in ([min(r.all_of)] if r.all_of else sorted(r.any_of)):
+                self._trigger.setdefault(lbl, []).append(i)
+        # label -> umbrales con los que se la vigila en ventanas
+        self._watch: Dict[str, Set[float]] = {}
+        for r in self.rules:
+            for lbl, _ in r.near + r.absent:
+                self._watch.setdefault(lbl, set()).add(r.min_label_confidence)
+        # por tipo: el dedup es por tipo, así que todas las reglas de un tipo deben coincidir
+        self._dedup: Dict[str, int] = {}
+        for r in self.rules:
+            if self._dedup.setdefault(r.type, r.dedup_ms) != r.dedup_ms:
+                raise ValueError(f"reglas '{r.type}' con dedup_ms distintos "
+                                 f"({self._dedup[r.type]} y {r.dedup_ms}): el dedup es por tipo")
+
+        # forma "plana" de cada regla para el bucle caliente
+        self._flat = [
+            (r.type, tuple(r.all_of), tuple(r.any_of), r.min_label_confidence, r.window_ms, r.confidence)
+            for r in self.rules
+        ]
+
+    @property
+    def types(self) -> Set[str]:
+        return set(self._dedup)
+
+    def _resolve(self, r: AlertRule, ts: int, occ: Dict[Tuple[str, float], List[int]]) -> bool:
+        mc = r.min_label_confidence
+        return (all(_within(occ[(lbl, mc)], ts, ms) for lbl, ms in r.near)
+                and not any(_within(occ[(lbl, mc)], ts, ms) for lbl, ms in r.absent))
+
+    def evaluate(self, timeline: Timeline) -> List[Dict[str, Any]]:
+        """Eventos [{type, timestamp_ms, confidence}] ordenados por tipo y timestamp, con dedup por tipo."""
+        occ: Dict[Tuple[str, float], List[int]] = {(lbl, mc): [] for lbl, ths in self._watch.items() for mc in ths}
+        pending: Dict[int, deque] = {}   # regla con ventana -> candidatas esperando que pase la ventana
+        found: Dict[str, List[Tuple[int, float]]] = {t: [] for t in self._dedup}
+        watch, trigger, flat = self._watch, self._trigger, self._flat
+
+        def _flush(now: Optional[int]) -> float:
+            """Resuelve las candidatas cuya ventana ya pasó; retorna el próximo vencimiento."""
+            due = float("inf")
+            for i, q in pending.items():
+                r, window = self.rules[i], flat[i][4]
+                while q and (now is None or q[0] + window < now):
+                    ts = q.popleft()
+                    if self._resolve(r, ts, occ):
+                        found[r.type].append((ts, r.confidence))
+                if q:
+                    due = min(due, q[0] + window)
+            return due
+
+        due = float("inf")   # ninguna candidata vence antes de esto: no hace falta revisar las colas
+        for ts, names in timeline:
+            fired: Set[int] = set()
+            for lbl, conf in names.items():
+                for mc in watch.get(lbl, ()):
+                    if conf >= mc:
+                        occ[(lbl, mc)].append(ts)
+                fired.update(trigger.get(lbl, ()))
+            if ts > due:
+                due = _flush(ts)
+            for i in fired:
+                etype, all_of, any_of, mc, window, conf = flat[i]
+                if any(names.get(lbl, -1.0) < mc for lbl in all_of):
+                    continue
+                if any_of and not any(names.get(lbl, -1.0) >= mc for lbl in any_of):
+                    continue
+                if window:
+                    pending.setdefault(i, deque()).append(ts)
+                    due = min(due, ts + window)
+                else:
+                    found[etype].append((ts, conf))
+        _flush(None)
+
+        events = []
+        for etype in sorted(found):
+            last, dedup = None, self._dedup[etype]
+            for ts, conf in sorted(found[etype], key=lambda x: (x[0], -x[1])):
+                if last is None or abs(ts - last) > dedup:
+                    events.append({"type": etype, "timestamp_ms": ts, "confidence": conf})
+                    last = ts
+        return events
+
+
+DEFAULT_RULESET = RuleSet(DEFAULT_RULES)
+
+
+def build_timeline(labels: List[Dict[str, Any]], min_confidence: float = 0.0) -> Timeline:
+    """Labels de get_label_detection -> [(ts, {label: confianza máx})] ordenada, sin las de baja confianza."""
+    by_ts: Dict[int, Dict[str, float]] = {}
+    for it in labels:
+        conf = float(it["Label"].get("Confidence", 0))
+        if conf < min_confidence:
+            continue
+        names = by_ts.setdefault(int(it["Timestamp"]), {})
+        name = it["Label"]["Name"]
+        if conf > names.get(name, -1.0):
+            names[name] = conf
+    return sorted(by_ts.items())
+
+
+# ---------------------------
+# Reglas desde la BD (cacheadas)
+# ---------------------------
+class _Rules:
+    """Reglas activas compiladas por cámara ("" = globales) + tipos que pueden generarse."""
+
+    def __init__(self, by_camera: Dict[str, RuleSet]):
+        self.by_camera = by_camera
+        self.types: FrozenSet[str] = frozenset(DEFAULT_RULESET.types.union(*(r.types for r in by_camera.values())))
+
+
+_cache: Optional[Tuple[float, _Rules]] = None
+_cache_lock = threading.Lock()
+
+
+def _load_rules() -> _Rules:
+    per_camera: Dict[str, List[AlertRule]] = {}
+    known = dict(Alert.TYPE_CHOICES)
+    rows = VideoAlertRule.objects.filter(enabled=True).order_by("id").values_list("camera_id", "type", "spec")
+    for cam, rtype, spec in rows:
+        if rtype not in known:
+            log.warning("VideoAlertRule %s/%s: tipo fuera de Alert.TYPE_CHOICES, se ignora", cam, rtype)
+            continue
+        try:
+            rule = AlertRule.from_dict({**(spec or {}), "type": rtype})
+        except (TypeError, ValueError) as e:
+            log.warning("VideoAlertRule %s/%s inválida: %s", cam, rtype, e)
+            continue
+        rules = per_camera.setdefault(cam or "", [])
+        # clean() lo impide, pero un update() masivo no pasa por ahí: gana la primera regla del tipo
+        first = next((r for r in rules if r.type == rule.type), None)
+        if first is not None and first.dedup_ms != rule.dedup_ms:
+            log.warning("VideoAlertRule %s/%s: dedup_ms %s distinto de %s, se ignora",
+                        cam, rtype, rule.dedup_ms, first.dedup_ms)
+            continue
+        rules.append(rule)
+    return _Rules({cam: RuleSet(rules) for cam, rules in per_camera.items()})
+
+
+def _rules() -> _Rules:
+    global _cache
+    cached = _cache
+    if cached is not None and time.monotonic() - cached[0] < VIDEO_RULES_CACHE_S:
+        return cached[1]
+    with _cache_lock:
+        if _cache is None or time.monotonic() - _cache[0] >= VIDEO_RULES_CACHE_S:
+            _cache = (time.monotonic(), _load_rules())
+        return _cache[1]
+
+
+def invalidate_rules() -> None:
+    """Descarta la copia cacheada (señales de VideoAlertRule); la próxima consulta relee."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def rules_for_camera(camera_id: Optional[str]) -> RuleSet:
+    by_camera = _rules().by_camera
+    return by_camera.get(camera_id or "") or by_camera.get("") or DEFAULT_RULESET
+
+
+def known_alert_types() -> Set[str]:
+    """Tipos de alerta que pueden generarse (reglas por defecto + reglas activas en BD)."""
+    return set(_rules().types)
@@ -1,139 +1,221 @@
 from __future__ import annotations
-import os, io, time, uuid, tempfile, math, boto3
-from typing import List, Dict, Any
+import os, io, time, uuid, tempfile, math, logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Any, Iterable, Iterator, Optional
+
+from ai.services.aws_clients import get_client
+from ai.services.timing import stage
+from ai.services.video_notifications import TERMINAL, get_channel
+from ai.services.video_rules import DEFAULT_RULESET, RuleSet, build_timeline, rules_for_camera
 
 INPUT_BUCKET  = os.getenv("AWS_STORAGE_BUCKET_NAME", "").strip()
 OUTPUT_BUCKET = os.getenv("ALERTS_BUCKET", "condominio-alerts").strip()
 MIN_CONF      = float(os.getenv("MIN_CONFIDENCE", "70"))
 REGION        = os.getenv("AWS_REGION", "us-east-1").strip()
 
-rek = boto3.client("rekognition", region_name=REGION)
-s3  = boto3.client("s3", region_name=REGION)
+log = logging.getLogger(__name__)
+
+def _rek():
+    return get_client("rekognition", REGION)
+
+def _s3():
+    return get_client("s3", REGION)
 
 # =========================================
 # Rekognition: corre el job y recoge labels
 # =========================================
-def start_and_collect_labels(s3_bucket: str, s3_key: str) -> List[Dict[str,Any]]:
-    start = rek.start_label_detection(
+# Espera del fin del job: aviso SNS/SQS si hay canal (ver video_notifications);
+# si no llega (o no hay canal), consulta el estado con backoff adaptativo.
+VIDEO_JOB_MAX_WAIT_S   = float(os.getenv("VIDEO_JOB_MAX_WAIT_S", "720"))   # ~12 min máx
+VIDEO_POLL_INITIAL_S   = float(os.getenv("VIDEO_POLL_INITIAL_S", "5"))
+VIDEO_POLL_MAX_S       = float(os.getenv("VIDEO_POLL_MAX_S", "30"))
+VIDEO_POLL_BACKOFF     = float(os.getenv("VIDEO_POLL_BACKOFF", "1.6"))
+VIDEO_NOTIFY_SAFETY_S  = float(os.getenv("VIDEO_NOTIFY_SAFETY_S", "60"))    # con canal: chequeo por si se pierde el aviso
+LABELS_PAGE_SIZE       = 1000   # máximo de get_label_detection
+
+def _job_status(job_id: str) -> str:
+    """Solo el estado (página mínima), sin traer labels."""
+    with stage("rekognition.label_status"):
+        return _rek().get_label_detection(JobId=job_id, MaxResults=1).get("JobStatus", "")
+
+def wait_for_label_job(job_id: str, channel=None) -> str:
+    """Espera a que el job termine y retorna su estado final (SUCCEEDED/FAILED/ERROR)."""
+    deadline = time.monotonic() + VIDEO_JOB_MAX_WAIT_S
+    delay = VIDEO_NOTIFY_SAFETY_S if channel else VIDEO_POLL_INITIAL_S
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Rekognition no terminó el job {job_id} en {VIDEO_JOB_MAX_WAIT_S:.0f}s")
+            status = None
+            if channel:
+                status = channel.wait(job_id, min(delay, remaining))
+            else:
+                time.sleep(min(delay, remaining))
+            if status not in TERMINAL:
+                status = _job_status(job_id)
+            if status in TERMINAL:
+                return status
+            delay = min(delay * VIDEO_POLL_BACKOFF, max(VIDEO_POLL_MAX_S, delay))
+    finally:
+        if channel:
+            channel.forget(job_id)
+
+def collect_labels(job_id: str) -> List[Dict[str,Any]]:
+    """Todas las labels de un job terminado en un solo barrido paginado."""
+    labels, token = [], None
+    with stage("rekognition.collect_labels"):
+        while True:
+            kw = {"JobId": job_id, "SortBy": "TIMESTAMP", "MaxResults": LABELS_PAGE_SIZE}
+            if token: kw["NextToken"] = token
+            resp = _rek().get_label_detection(**kw)
+            labels += resp.get("Labels", [])
+            token = resp.get("NextToken")
+            if not token:
+                return labels
+
+def start_and_collect_labels(s3_bucket: str, s3_key: str,
+                             on_started: Optional[Callable[[str], None]] = None) -> List[Dict[str,Any]]:
+    channel = get_channel()
+    kw = {}
+    if channel and channel.notification_channel():
+        kw["NotificationChannel"] = channel.notification_channel()
+    start = _rek().start_label_detection(
         Video={"S3Object": {"Bucket": s3_bucket, "Name": s3_key}},
         MinConfidence=MIN_CONF,
+        **kw,
     )
     job_id = start["JobId"]
-    labels, token = [], None
-    for _ in range(240):  # ~12 min máx
-        time.sleep(3)
-        kw = {"JobId": job_id, "SortBy": "TIMESTAMP"}
-        if token: kw["NextToken"] = token
-        resp = rek.get_label_detection(**kw)
-        if "Labels" in resp:
-            labels += resp["Labels"]
-        token = resp.get("NextToken")
-        if resp.get("JobStatus") in ("SUCCEEDED","FAILED") and not token:
-            break
-    if resp.get("JobStatus") != "SUCCEEDED":
-        raise RuntimeError(f"Rekognition failed: {resp.get('JobStatus')}")
-    return labels
-
-# =============================
-# Normalización de labels/tiros
-# =============================
-def _group_by_ts(labels: List[Dict[str,Any]]) -> Dict[int,set]:
-    by_ts = {}
-    for it in labels:
-        ts = int(it["Timestamp"])
-        name = it["Label"]["Name"]
-        conf = float(it["Label"].get("Confidence", 0))
-        if conf < MIN_CONF:
-            continue
-        by_ts.setdefault(ts, set()).add(name)
-    return by_ts
+    if channel:
+        channel.expect(job_id)
+    if on_started:
+        on_started(job_id)   # p. ej. guardar el JobId en VideoJob
+
+    status = wait_for_label_job(job_id, channel)
+    if status != "SUCCEEDED":
+        raise RuntimeError(f"Rekognition failed: {status}")
+    return collect_labels(job_id)
 
 # ==================================================
-# SOLO generamos: dog_loose, dog_waste, bad_parking
+# Eventos: reglas declarativas (ai/services/video_rules.py)
 # ==================================================
-def detect_events(labels: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
-    by_ts = _group_by_ts(labels)
-    tss = sorted(by_ts.keys())
-    events = []
-
-    for ts in tss:
-        names = by_ts[ts]
-
-        # 1) Perro suelto: Dog sin Person cerca (+/-2s)
-        if "Dog" in names:
-            person_near = any("Person" in by_ts[t2] for t2 in tss if abs(t2-ts) <= 2000)
-            if not person_near:
-                events.append({"type": "dog_loose", "timestamp_ms": ts, "confidence": 90.0})
-
-        # 2) Perro haciendo necesidades (heurística simple):
-        #    Si aparecen etiquetas relacionadas con "Poop" / "Feces" / "Excrement" junto con Dog
-        WASTE_LABELS = {"Poop", "Feces", "Excrement", "Animal Droppings", "Dung"}
-        if "Dog" in names and any(lbl in names for lbl in WASTE_LABELS):
-            events.append({"type": "dog_waste", "timestamp_ms": ts, "confidence": 85.0})
-
-        # 3) Vehículo mal estacionado (por ahora, cualquier Car/Truck → bad_parking)
-        if "Car" in names or "Truck" in names:
-            events.append({"type": "bad_parking", "timestamp_ms": ts, "confidence": 80.0})
-
-    # dedup por tipo cada 3s
-    events.sort(key=lambda e: (e["type"], e["timestamp_ms"]))
-    dedup, last = [], {}
-    for e in events:
-        t = e["type"]
-        if t not in last or abs(e["timestamp_ms"] - last[t]) > 3000:
-            dedup.append(e)
-            last[t] = e["timestamp_ms"]
-    return dedup
+def detect_events(labels: List[Dict[str,Any]], rules: RuleSet | None = None) -> List[Dict[str,Any]]:
+    """Eventos [{type, timestamp_ms, confidence}] en una pasada; por defecto dog_loose, dog_waste, bad_parking."""
+    return (rules or DEFAULT_RULESET).evaluate(build_timeline(labels, MIN_CONF))
 
 # ==================================
 # Frame a thumb y subir a S3 (thumbs)
 # ==================================
-def _download_s3_to_tmp(bucket: str, key: str) -> str:
+# Todos los eventos de un video en una sola pasada:
+# - el video se baja una vez a un temporal (o se lee por HTTP con rangos,
+#   VIDEO_THUMB_SOURCE=stream, usando una URL prefirmada),
+# - los cuadros pedidos se leen en orden: grab() para avanzar sin
+#   decodificar a imagen y seek solo si el próximo está lejos,
+# - los JPEG se suben en paralelo,
+# - el temporal se borra siempre (también si algo falla).
+VIDEO_THUMB_SOURCE    = os.getenv("VIDEO_THUMB_SOURCE", "download").strip()   # download | stream
+THUMB_UPLOAD_WORKERS  = int(os.getenv("THUMB_UPLOAD_WORKERS", "4"))
+THUMB_SEEK_GAP_FRAMES = int(os.getenv("THUMB_SEEK_GAP_FRAMES", "30"))    # ~distancia entre keyframes; más lejos: seek
+THUMB_JPEG_QUALITY    = 85
+
+@contextmanager
+def _video_source(bucket: str, key: str) -> Iterator[str]:
+    """Ruta local (temporal, se borra al salir) o URL prefirmada del video."""
+    if VIDEO_THUMB_SOURCE == "stream":
+        yield _s3().generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=3600)
+        return
     fd, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1] or ".mp4")
     os.close(fd)
-    s3.download_file(bucket, key, path)
-    return path
+    try:
+        with stage("s3.download_video"):
+            _s3().download_file(bucket, key, path)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
-def extract_frame_and_upload(bucket_in: str, key_in: str, timestamp_ms: int) -> str | None:
+def extract_frames(source: str, timestamps_ms: Iterable[int]) -> Dict[int, bytes]:
+    """{timestamp_ms: JPEG} de los cuadros pedidos en una pasada ordenada. Sin cv2 -> {}."""
     try:
         import cv2  # import perezoso
     except ImportError:
-        return None
-
-    local_path = _download_s3_to_tmp(bucket_in, key_in)
-    cap = cv2.VideoCapture(local_path)
-    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
-    frame_idx = int(round((timestamp_ms / 1000.0) * fps))
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-    ok, frame = cap.read()
-    cap.release()
-    if not ok or frame is None:
-        return None
-
-    _, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-    img_key = f"thumbs/{uuid.uuid4().hex}.jpg"
-    s3.put_object(Bucket=OUTPUT_BUCKET, Key=img_key, Body=buf.tobytes(), ContentType="image/jpeg")
+        return {}
+
+    cap = cv2.VideoCapture(source)
     try:
-        os.remove(local_path)
-    except Exception:
-        pass
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        wanted: Dict[int, List[int]] = {}
+        for ts in timestamps_ms:
+            wanted.setdefault(int(round((ts / 1000.0) * fps)), []).append(ts)
+
+        out: Dict[int, bytes] = {}
+        pos = 0   # índice del próximo cuadro que entregaría read()
+        for idx in sorted(wanted):
+            if idx < pos or idx - pos > THUMB_SEEK_GAP_FRAMES:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+                pos = idx
+            while pos < idx and cap.grab():
+                pos += 1
+            ok, frame = cap.read()
+            if not ok or frame is None:
+                break   # fin del video: los siguientes tampoco existen
+            pos = idx + 1
+            _, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), THUMB_JPEG_QUALITY])
+            for ts in wanted[idx]:
+                out[ts] = buf.tobytes()
+        return out
+    finally:
+        cap.release()
+
+def _upload_thumb(data: bytes) -> str:
+    img_key = f"thumbs/{uuid.uuid4().hex}.jpg"
+    _s3().put_object(Bucket=OUTPUT_BUCKET, Key=img_key, Body=data, ContentType="image/jpeg")
     return img_key
 
+def extract_thumbnails(bucket_in: str, key_in: str, timestamps_ms: Iterable[int]) -> Dict[int, str | None]:
+    """{timestamp_ms: s3 key del thumb | None} para todos los eventos de un video."""
+    timestamps = list(timestamps_ms)
+    result: Dict[int, str | None] = {ts: None for ts in timestamps}
+    if not timestamps:
+        return result
+    try:
+        import cv2  # noqa: F401  (sin cv2 no tiene sentido bajar el video)
+    except ImportError:
+        return result
+    with _video_source(bucket_in, key_in) as source:
+        with stage("video.extract_frames"):
+            frames = extract_frames(source, timestamps)
+    if not frames:
+        return result
+
+    with stage("s3.upload_thumbs"):
+        workers = max(1, min(THUMB_UPLOAD_WORKERS, len(frames)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb-upload") as pool:
+            futures = {pool.submit(_upload_thumb, data): ts for ts, data in frames.items()}
+            for fut, ts in futures.items():
+                try:
+                    result[ts] = fut.result()
+                except Exception:
+                    log.exception("No se pudo subir el thumb de %s @ %sms", key_in, ts)
+    return result
+
+def extract_frame_and_upload(bucket_in: str, key_in: str, timestamp_ms: int) -> str | None:
+    return extract_thumbnails(bucket_in, key_in, [timestamp_ms])[timestamp_ms]
+
 # ===========================================
 # Pipeline principal para un video en S3
 # ===========================================
-def process_video_and_return_events(s3_key_video: str, camera_id: str | None = None) -> List[Dict[str,Any]]:
-    labels = start_and_collect_labels(INPUT_BUCKET, s3_key_video)
-    events = detect_events(labels)
+def process_video_and_return_events(s3_key_video: str, camera_id: str | None = None,
+                                    on_started: Optional[Callable[[str], None]] = None) -> List[Dict[str,Any]]:
+    labels = start_and_collect_labels(INPUT_BUCKET, s3_key_video, on_started=on_started)
+    out = detect_events(labels, rules_for_camera(camera_id))
     # agrega snapshot a cada evento
-    ALLOWED = {"dog_loose", "dog_waste", "bad_parking"}
-    out = []
-    for e in events:
-        if e["type"] not in ALLOWED:
-            continue
-        img_key = extract_frame_and_upload(INPUT_BUCKET, s3_key_video, e["timestamp_ms"])
-        e["s3_image_key"] = img_key
+    thumbs = extract_thumbnails(INPUT_BUCKET, s3_key_video, {e["timestamp_ms"] for e in out})
+    for e in out:
+        e["s3_image_key"] = thumbs.get(e["timestamp_ms"])
         e["s3_video_key"] = s3_key_video
         e["camera_id"] = camera_id
-        out.append(e)
     return out
@@ -0,0 +1,110 @@
+# ai/services/visitor_service.py
+"""
+Registro de visitantes en dos fases, para no tener una transacción (y su
+conexión) abierta mientras se espera a S3/Rekognition:
+
+1) Transacción corta: crea el usuario y su fila ai_userface en "pending"; commit.
+2) Fuera de la transacción: enroll_face (S3 + index_faces) y la fila pasa a
+   "registered".
+
+Si la fase 2 falla (error de AWS, o no se detecta rostro) se compensa
+borrando el usuario (y en cascada su fila pending). enroll_face ya borra de
+la colección la cara que alcanzó a indexar si no pudo guardar la fila.
+Lo que no se pudo compensar (p. ej. se cayó el proceso) queda en "pending"
+y lo limpia `purge_pending_visitors`.
+"""
+from __future__ import annotations
+import logging
+from datetime import timedelta
+from typing import Any, Dict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from ai.models import UserFace
+from ai.services.face_service import VISITOR_COLLECTION, enroll_face
+from ai.services.timing import stage
+
+log = logging.getLogger(__name__)
+
+User = get_user_model()
+
+PENDING = "pending"
+
+
+class VisitorRegistrationError(Exception):
+    """La fase 2 no dejó un rostro utilizable; el usuario ya fue eliminado."""
+
+    def __init__(self, code: str, detail: str):
+        super().__init__(detail)
+        self.code = code
+        self.detail = detail
+
+    def as_response(self) -> Dict[str, Any]:
+        return {"ok": False, "code": self.code, "detail": self.detail}
+
+
+def _create_pending(*, email: str, first_name: str, last_name: str, role):
+    """Fase 1: solo escrituras locales dentro de la transacción."""
+    with stage("db.tx"), transaction.atomic():
+        user = User.objects.create_user(
+            email=email,
+            password=None,
+            first_name=first_name,
+            last_name=last_name,
+            role=role,
+        )
+        UserFace.objects.create(
+            user=user,
+            collection_id=VISITOR_COLLECTION,
+            external_image_id=str(user.id),
+            status=PENDING,
+        )
+    return user
+
+
+def _compensate(user_id: int) -> None:
+    try:
+        with stage("db.compensate"):
+            User.objects.filter(id=user_id).delete()
+    except Exception:
+        log.exception("No se pudo compensar el visitante %s (queda pending)", user_id)
+
+
+def register_visitor(*, email: str, first_name: str, last_name: str, role, file_obj,
+                     key_prefix: str | None = None) -> Dict[str, Any]:
+    """Crea el visitante y enrola su rostro. Retorna el resultado de enroll_face."""
+    user = _create_pending(email=email, first_name=first_name, last_name=last_name, role=role)
+    try:
+        result = enroll_face(user.id, file_obj, key_prefix=key_prefix, is_visitor=True)
+    except Exception:
+        _compensate(user.id)
+        raise
+    if not result.get("face_id"):
+        _compensate(user.id)
+        raise VisitorRegistrationError("NO_FACE", "No se detectó un rostro en la imagen")
+    return result
+
+
+def purge_pending_visitors(older_than: timedelta, *, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Borra visitantes que quedaron en "pending" más de `older_than` (compensación fallida).
+    Solo los que nunca llegaron a tener rostro ni sesiones: un re-enrolamiento fallido
+    de un visitante real también deja la fila en "pending" y no se toca.
+    """
+    cutoff = timezone.now() - older_than
+    pending_ids = (UserFace.objects
+                   .filter(collection_id=VISITOR_COLLECTION, status=PENDING, face_id__isnull=True,
+                           s3_key__isnull=True, created_at__lt=cutoff)
+                   .values_list("user_id", flat=True))
+    user_ids = list(
+        User.objects
+        .filter(id__in=pending_ids, visitor_sessions__isnull=True)
+        .exclude(faces__status="registered")
+        .values_list("id", flat=True)
+    )
+    if user_ids and not dry_run:
+        User.objects.filter(id__in=user_ids).delete()
+    return {"pending": len(user_ids), "deleted": 0 if dry_run else len(user_ids),
+            "user_ids": user_ids[:50], "dry_run": dry_run}
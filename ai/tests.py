@@ -1,3 +1,631 @@
-from django.test import TestCase
+import importlib.util, io, json, os, random, tempfile, unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image, ImageFilter
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ai.management.commands.bench_video_events import detect_events_reference, synthetic_labels
+from ai.models import UserFace, VideoAlertRule, VideoJob
+from ai.services import face_sync, s3_archive, video_jobs, video_rules
+from ai.services.face_quality import FaceQualityError, check_face_quality, select_best_frame
+from ai.services.match_cache import MatchCache
+from ai.services import plate_registry as plate_registry_module
+from ai.services.plate_registry import PlateRegistry, _within_one_edit, bump_version, current_version, on_plate_changed
+from ai.services.plate_service import PlateCamera, _plate_words, vote_plate
+from ai.services.video_notifications import LocalCompletionChannel, SqsCompletionChannel
+from ai.services.video_rules import DEFAULT_RULES, AlertRule, RuleSet, build_timeline
+from ai.services.video_service import MIN_CONF, detect_events, extract_frames
+
+
+def _jpeg(size=(480, 480), level=None, blur=0, seed=0) -> bytes:
+    """Ruido gris (nítido y bien expuesto); `level` = color plano, `blur` = radio gaussiano."""
+    if level is not None:
+        img = Image.new("L", size, level)
+    else:
+        rnd = random.Random(seed)
+        img = Image.new("L", size)
+        img.putdata([rnd.randint(60, 200) for _ in range(size[0] * size[1])])
+    if blur:
+        img = img.filter(ImageFilter.GaussianBlur(blur))
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+# ---------------------------
+# match_cache
+# ---------------------------
+class MatchCacheTests(SimpleTestCase):
+    def test_exact_hash_by_default(self):
+        cache = MatchCache(ttl=5, max_size=8, max_distance=0)
+        cache.put("faces/login/|col", 0b1010, ("7", 99.0, "k1"))
+        self.assertEqual(cache.get("faces/login/|col", 0b1010), ("7", 99.0, "k1"))
+        self.assertIsNone(cache.get("faces/login/|col", 0b1011))
+
+    def test_scope_is_part_of_the_key(self):
+        cache = MatchCache(ttl=5, max_size=8, max_distance=4)
+        cache.put("faces/login/|col", 0b1010, ("7", 99.0, "k1"))
+        self.assertIsNone(cache.get("faces/visitors/login/|col", 0b1010))
+        self.assertIsNone(cache.get("faces/login/|col+col_visitors", 0b1010))
+
+    def test_hamming_distance_when_enabled(self):
+        cache = MatchCache(ttl=5, max_size=8, max_distance=2)
+        cache.put("s", 0b0000, ("7", 99.0, "k1"))
+        self.assertIsNotNone(cache.get("s", 0b0011))
+        self.assertIsNone(cache.get("s", 0b0111))
+
+    def test_ttl_expires_entries(self):
+        cache = MatchCache(ttl=5, max_size=8, max_distance=0)
+        with mock.patch("ai.services.match_cache.time.monotonic", return_value=100.0):
+            cache.put("s", 1, ("7", 99.0, "k1"))
+        with mock.patch("ai.services.match_cache.time.monotonic", return_value=104.9):
+            self.assertIsNotNone(cache.get("s", 1))
+        with mock.patch("ai.services.match_cache.time.monotonic", return_value=105.0):
+            self.assertIsNone(cache.get("s", 1))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_lru_eviction(self):
+        cache = MatchCache(ttl=5, max_size=2, max_distance=0)
+        cache.put("s", 1, ("1", 90.0, "a"))
+        cache.put("s", 2, ("2", 90.0, "b"))
+        cache.get("s", 1)                      # 1 pasa a ser el más reciente
+        cache.put("s", 3, ("3", 90.0, "c"))
+        self.assertIsNone(cache.get("s", 2))
+        self.assertIsNotNone(cache.get("s", 1))
+
+    def test_disabled_with_zero_ttl(self):
+        self.assertFalse(MatchCache(ttl=0, max_size=8, max_distance=0).enabled)
+
+
+# ---------------------------
+# face_quality (sin detección de rostro: depende de cv2)
+# ---------------------------
+@mock.patch("ai.services.face_quality.FACE_QC_DETECT_FACE", False)
+class S3ArchiveTests(SimpleTestCase):
+    def test_full_queue_drops_instead_of_growing(self):
+        import threading
+        gate = threading.Event()
+        client = mock.Mock()
+        client.put_object.side_effect = lambda **kw: gate.wait(5)
+        with mock.patch.object(s3_archive, "_slots", threading.BoundedSemaphore(1)), \
+             mock.patch.object(s3_archive, "get_client", return_value=client):
+            before = s3_archive.stats()["dropped"]
+            first = s3_archive.archive_bytes("b", "k1", b"x")
+            self.assertIsNotNone(first)
+            with self.assertLogs("ai.services.s3_archive", "WARNING"):
+                self.assertIsNone(s3_archive.archive_bytes("b", "k2", b"x"))
+            self.assertEqual(s3_archive.stats()["dropped"], before + 1)
+            gate.set()
+            first.result(5)
+        self.assertEqual(client.put_object.call_count, 1)
+
+    def test_background_failure_is_counted_not_raised(self):
+        client = mock.Mock()
+        client.put_object.side_effect = RuntimeError("s3 caído")
+        with mock.patch.object(s3_archive, "get_client", return_value=client), \
+             self.assertLogs("ai.services.s3_archive", "ERROR"):
+            before = s3_archive.stats()["failed"]
+            s3_archive.archive_bytes("b", "k", b"x").result(5)
+        self.assertEqual(s3_archive.stats()["failed"], before + 1)
+
+
+class ReleasingConnectionsTests(SimpleTestCase):
+    def test_closes_connections_around_call_even_on_error(self):
+        from ai.views import async_login_views
+        calls = []
+        with mock.patch.object(async_login_views, "close_old_connections", side_effect=lambda: calls.append("close")):
+            wrapped = async_login_views.releasing_connections(lambda x: calls.append(x) or x * 2)
+            self.assertEqual(wrapped(3), 6)
+            self.assertEqual(calls, ["close", 3, "close"])
+            calls.clear()
+            with self.assertRaises(ZeroDivisionError):
+                async_login_views.releasing_connections(lambda: 1 / 0)()
+            self.assertEqual(calls, ["close", "close"])
+
+
+@mock.patch("ai.services.face_quality.FACE_QC_DETECT_FACE", False)   # ruido sintético: sin rostro
+class FaceQualityTests(SimpleTestCase):
+    def _reason(self, data):
+        with self.assertRaises(FaceQualityError) as cm:
+            check_face_quality(data)
+        return cm.exception.reason
+
+    def test_accepts_sharp_well_exposed_frame(self):
+        m = check_face_quality(_jpeg())
+        self.assertEqual((m["width"], m["height"]), (480, 480))
+
+    def test_rejections(self):
+        self.assertEqual(self._reason(_jpeg(size=(200, 200))), "low_resolution")
+        self.assertEqual(self._reason(_jpeg(level=10)), "too_dark")
+        self.assertEqual(self._reason(_jpeg(level=240)), "too_bright")
+        self.assertEqual(self._reason(_jpeg(blur=4)), "blurry")
+        self.assertEqual(self._reason(b"no es una imagen"), "unreadable")
+
+    def test_no_face_only_when_opencv_is_usable(self):
+        with mock.patch("ai.services.face_quality.FACE_QC_DETECT_FACE", True), \
+             mock.patch("ai.services.face_quality._face_fraction", return_value=0.0):
+            self.assertEqual(self._reason(_jpeg()), "no_face")
+        with mock.patch("ai.services.face_quality.FACE_QC_DETECT_FACE", True), \
+             mock.patch("ai.services.face_quality._face_fraction", return_value=None):
+            self.assertNotIn("face", check_face_quality(_jpeg()))
+
+    def test_error_response_shape(self):
+        with self.assertRaises(FaceQualityError) as cm:
+            check_face_quality(_jpeg(level=10))
+        body = cm.exception.as_response()
+        self.assertEqual((body["code"], body["reason"], body["recognized"]), ("LOW_QUALITY", "too_dark", False))
+
+
+@mock.patch("ai.services.face_quality.FACE_QC_DETECT_FACE", False)
+class SelectBestFrameTests(SimpleTestCase):
+    def test_picks_sharpest_passing_frame(self):
+        frames = [_jpeg(blur=0.6), _jpeg(), _jpeg(level=10), b"basura"]
+        i, m, summary = select_best_frame(frames)
+        self.assertEqual(i, 1)
+        self.assertEqual([s.get("reason") for s in summary], [None, None, "too_dark", "unreadable"])
+        self.assertGreater(m["sharpness"], summary[0]["sharpness"])
+
+    def test_all_rejected_reports_sharpest_reason(self):
+        with self.assertRaises(FaceQualityError) as cm:
+            select_best_frame([_jpeg(level=10), _jpeg(blur=4)])
+        self.assertEqual(cm.exception.reason, "blurry")
+        self.assertEqual(len(cm.exception.metrics["frames"]), 2)
+
+    def test_no_frames(self):
+        with self.assertRaises(FaceQualityError) as cm:
+            select_best_frame([])
+        self.assertEqual(cm.exception.reason, "no_frames")
+
+
+# ---------------------------
+# face_sync
+# ---------------------------
+class ClassifyFacesTests(TestCase):
+    COL = "col-test"
+
+    def setUp(self):
+        User = get_user_model()
+        self.u1, self.u2, self.u3, self.u4 = (User.objects.create_user(f"u{i}@x.com") for i in range(1, 5))
+
+    def _row(self, user, face_id, status="registered"):
+        return UserFace.objects.create(user=user, collection_id=self.COL, external_image_id=str(user.id),
+                                       face_id=face_id, status=status)
+
+    @staticmethod
+    def _face(fid, ext):
+        return {"FaceId": fid, "ExternalImageId": str(ext)}
+
+    def test_categories(self):
+        self._row(self.u1, "f1")
+        self._row(self.u2, "f2")
+        self._row(self.u3, "f3", status="revoked")
+        gone = self._row(self.u4, "f4-gone")
+        faces = [
+            self._face("f1", self.u1.id),        # al día
+            self._face("f1-old", self.u1.id),    # re-enrolamiento viejo
+            self._face("f3", self.u3.id),        # usuario revocado
+            self._face("fx", "no-es-id"),        # huérfana
+            self._face("fy", 999999),            # usuario inexistente
+        ]
+        c = face_sync.classify_faces(self.COL, faces)
+        self.assertEqual(c["in_sync"], ["f1"])
+        self.assertEqual(c["superseded"], ["f1-old"])
+        self.assertEqual(c["revoked"], ["f3"])
+        self.assertEqual(sorted(c["orphaned"]), ["fx", "fy"])
+        self.assertEqual(c["adopt"], {})
+        self.assertEqual(sorted(c["missing"]), sorted([UserFace.objects.get(user=self.u2).id, gone.id]))
+
+    def test_adopts_one_face_per_user_without_row(self):
+        c = face_sync.classify_faces(self.COL, [self._face("a", self.u1.id), self._face("b", self.u1.id)])
+        self.assertEqual(c["adopt"], {self.u1.id: "a"})
+        self.assertEqual(c["superseded"], ["b"])
+
+    def test_local_backend_rows_are_left_alone(self):
+        self._row(self.u1, "local-1234")
+        c = face_sync.classify_faces(self.COL, [self._face("rek-1", self.u1.id)])
+        self.assertEqual(c["missing"], [])
+        self.assertEqual(c["adopt"], {})
+        self.assertEqual(c["local"], ["rek-1"])
+        self.assertEqual(face_sync.classify_faces(self.COL, [])["missing"], [])
+
+    def test_sync_refuses_local_backend(self):
+        with mock.patch.object(face_sync, "FACE_MATCH_BACKEND", "local"):
+            with self.assertRaises(RuntimeError):
+                face_sync.sync_collection(self.COL)
+
+
+# ---------------------------
+# plate_registry
+# ---------------------------
+def _registry(rows) -> PlateRegistry:
+    reg = PlateRegistry()
+    reg.load_rows(rows)
+    reg._maybe_refresh = lambda: None   # sin sello en BD
+    return reg
+
+
+class WithinOneEditTests(SimpleTestCase):
+    def test_cases(self):
+        for a, b in [("ABC123", "ABC123"), ("ABC123", "ABC124"), ("ABC123", "ABC12"),
+                     ("ABC123", "XABC123"), ("ABC123", "AC123"), ("", "A")]:
+            self.assertTrue(_within_one_edit(a, b), (a, b))
+            self.assertTrue(_within_one_edit(b, a), (b, a))
+        for a, b in [("ABC123", "ABC214"), ("ABC123", "ABC1"), ("ABC123", "XABC12"), ("AB", "BA")]:
+            self.assertFalse(_within_one_edit(a, b), (a, b))
+
+
+class PlateRegistryMatchTests(SimpleTestCase):
+    def setUp(self):
+        self.reg = _registry([("ABC-123", 1), ("XYZ 789", 2), ("XYZ789", 3)])
+
+    def _kinds(self, number, **kw):
+        return [(c.number, c.kind) for c in self.reg.match(number, **kw)]
+
+    def test_exact_is_normalized_and_alone(self):
+        [c] = self.reg.match(" abc-123 ")
+        self.assertEqual((c.number, c.kind, c.confidence, c.owner_ids), ("ABC123", "exact", 1.0, (1,)))
+        self.assertEqual(self.reg.match("XYZ789")[0].owner_ids, (2, 3))
+
+    def test_ocr_confusions(self):
+        self.assertEqual(self._kinds("A8CI23"), [("ABC123", "confusion")])
+        self.assertEqual(self.reg.match("A8C123")[0].confidence, 0.9)
+        self.assertEqual(self.reg.match("A8CI2E"), [])   # E no es confusión de 3
+        self.assertEqual(self.reg.match("A8CI23")[0].confidence, 0.85)
+
+    def test_too_many_confusions_is_another_plate(self):
+        reg = _registry([("OOO000", 1)])
+        self.assertEqual([c.confidence for c in reg.match("OOOO00")], [0.9])
+        self.assertEqual([c.confidence for c in reg.match("OOOOO0")], [0.85])
+        self.assertEqual(reg.match("OOOOOO", min_confidence=0.0), [])   # 3 confundidos
+
+    def test_one_edit_only_as_suggestion(self):
+        for read in ("ABC124", "ABC12", "XABC123"):
+            self.assertEqual(self.reg.match(read), [], read)
+            self.assertEqual(self._kinds(read, suggestions=True), [("ABC123", "edit1")], read)
+
+    def test_unknown_and_empty(self):
+        self.assertEqual(self.reg.match("QQQ999", suggestions=True), [])
+        self.assertEqual(self.reg.match(""), [])
+        self.assertFalse(self.reg.exists("ABC124"))
+
+    def test_apply_updates_copy(self):
+        self.reg.apply("ABC124", 9, True)
+        self.assertEqual(self._kinds("ABC124"), [("ABC124", "exact")])
+        self.reg.apply("ABC124", 9, False)
+        self.assertEqual(self.reg.match("ABC124"), [])
+
+
+class PlateRegistryVersionTests(TestCase):
+    def setUp(self):
+        self.reg = PlateRegistry()
+        self.reg.load_rows([("ABC123", 1)], version=current_version())
+
+    def test_own_change_does_not_force_a_reload(self):
+        with mock.patch.object(plate_registry_module, "plate_registry", self.reg), \
+             self.captureOnCommitCallbacks(execute=True):
+            on_plate_changed("ABC124", 9, True)
+        self.assertEqual(self.reg._version, current_version())
+        self.reg._checked_at = 0.0
+        with mock.patch.object(self.reg, "load") as load:
+            self.assertEqual(self.reg.owners("ABC124"), (9,))
+        load.assert_not_called()
+
+    def test_concurrent_change_keeps_old_version(self):
+        old = self.reg._version
+        bump_version()                  # otro worker
+        self.reg.apply("ABC124", 9, True, version=bump_version())
+        self.assertEqual(self.reg._version, old)
+
+
+class PlateVerifyViewTests(SimpleTestCase):
+    def _post(self, number):
+        with mock.patch("ai.views.plate_views.plate_registry", _registry([("ABC123", 1)])):
+            return APIClient().post(reverse("ai-plate-verify"), {"number": number}, format="json").json()
+
+    def test_one_char_off_is_not_registered(self):
+        body = self._post("ABC124")
+        self.assertFalse(body["exists"])
+        self.assertIsNone(body["match"])
+        self.assertEqual([c["kind"] for c in body["candidates"]], ["edit1"])
+
+    def test_confusion_counts_as_registered(self):
+        body = self._post("A8C123")
+        self.assertTrue(body["exists"])
+        self.assertEqual(body["match"]["number"], "ABC123")
+
+
+# ---------------------------
+# plate_service
+# ---------------------------
+class VotePlateTests(SimpleTestCase):
+    def test_per_position_vote_weighted_by_confidence(self):
+        plate, conf = vote_plate([("ABC123", 90), ("A8C123", 60), ("ABC123", 80)])
+        self.assertEqual(plate, "ABC123")
+        self.assertAlmostEqual(conf, (5 + 170 / 230) / 6, places=3)
+
+    def test_each_position_independently(self):
+        # ninguna lectura está completa, el consenso sí
+        self.assertEqual(vote_plate([("XBC123", 70), ("AXC123", 70), ("ABX123", 70)])[0], "ABC123")
+        self.assertEqual(vote_plate([("ABC12X", 50), ("ABC123", 60), ("ABC123", 40)])[0], "ABC123")
+
+    def test_length_with_most_weight_wins(self):
+        plate, conf = vote_plate([("ABC123", 90), ("ABC1234", 50), ("ABC123", 50)])
+        self.assertEqual(plate, "ABC123")
+        self.assertAlmostEqual(conf, 2 / 3, places=3)
+
+    def test_missing_reads_lower_confidence(self):
+        self.assertEqual(vote_plate([("ABC123", 99), (None, 0.0)]), ("ABC123", 0.5))
+        self.assertEqual(vote_plate([(None, 0.0), (None, 0.0)]), (None, 0.0))
+
+    def test_ties_are_deterministic(self):
+        self.assertEqual(vote_plate([("AC", 50), ("AB", 50)])[0], "AB")
+
+
+class PlateCameraTests(SimpleTestCase):
+    def test_no_filters_by_default(self):
+        self.assertEqual(PlateCamera().filters(), {})
+
+    def test_overrides_build_word_filter_and_regions(self):
+        cam = PlateCamera().with_overrides({"min_confidence": 85, "min_box_height": 0.04,
+                                            "regions": "0.2,0.3,0.8,0.9"})
+        self.assertEqual(cam.filters(), {
+            "WordFilter": {"MinConfidence": 85.0, "MinBoundingBoxHeight": 0.04},
+            "RegionsOfInterest": [{"BoundingBox": {"Left": 0.2, "Top": 0.3, "Width": 0.6, "Height": 0.6}}],
+        })
+
+    def test_plate_words_keeps_low_confidence_reads(self):
+        resp = {"TextDetections": [
+            {"Type": "WORD", "DetectedText": "BOLIVIA", "Confidence": 99.0},
+            {"Type": "LINE", "DetectedText": "ABC123", "Confidence": 98.0},
+            {"Type": "WORD", "DetectedText": "abc123", "Confidence": 65.0},
+            {"Type": "WORD", "DetectedText": "XYZ-9", "Confidence": 90.0},
+        ]}
+        self.assertEqual(_plate_words(resp), [("ABC123", 65.0)])
+
+
+# ---------------------------
+# video_jobs
+# ---------------------------
+class VideoJobQueueTests(TestCase):
+    def _job(self, **kw):
+        return VideoJob.objects.create(s3_video_key="videos/x.mp4", **kw)
+
+    def test_claim_is_exclusive(self):
+        job = self._job()
+        self.assertTrue(video_jobs.claim(job.pk, "w1"))
+        self.assertFalse(video_jobs.claim(job.pk, "w2"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.attempts), (VideoJob.RUNNING, "w1", 1))
+        self.assertIsNotNone(job.started_at)
+
+    def test_claim_next_takes_oldest_queued(self):
+        first, second = self._job(), self._job()
+        self._job(status=VideoJob.SUCCEEDED)
+        self.assertEqual(video_jobs.claim_next("w"), first.pk)
+        self.assertEqual(video_jobs.claim_next("w"), second.pk)
+        self.assertIsNone(video_jobs.claim_next("w"))
+
+    def test_requeue_stale(self):
+        old = timezone.now() - timedelta(seconds=video_jobs.VIDEO_JOB_STALE_S + 60)
+        retry = self._job(status=VideoJob.RUNNING, started_at=old, attempts=1, worker="muerto")
+        spent = self._job(status=VideoJob.RUNNING, started_at=old, attempts=video_jobs.VIDEO_JOB_MAX_ATTEMPTS)
+        fresh = self._job(status=VideoJob.RUNNING, started_at=timezone.now(), attempts=1)
+
+        self.assertEqual(video_jobs.requeue_stale(), 1)
+        for j in (retry, spent, fresh):
+            j.refresh_from_db()
+        self.assertEqual((retry.status, retry.worker), (VideoJob.QUEUED, ""))
+        self.assertEqual(spent.status, VideoJob.FAILED)
+        self.assertIsNotNone(spent.finished_at)
+        self.assertEqual(fresh.status, VideoJob.RUNNING)
+
+    def test_sweep_requeues_and_dispatches_queued(self):
+        old = timezone.now() - timedelta(seconds=video_jobs.VIDEO_JOB_STALE_S + 60)
+        stale = self._job(status=VideoJob.RUNNING, started_at=old, attempts=1)
+        waiting = self._job()
+        self._job(status=VideoJob.RUNNING, started_at=timezone.now(), attempts=1)
+        with mock.patch.object(video_jobs, "dispatch_inline") as dispatch:
+            self.assertEqual(video_jobs.sweep(), 2)
+        self.assertEqual(sorted(c.args[0] for c in dispatch.call_args_list), sorted([stale.pk, waiting.pk]))
+
+
+# ---------------------------
+# video_notifications
+# ---------------------------
+class CompletionChannelTests(SimpleTestCase):
+    NOTICE = {"JobId": "j1", "Status": "SUCCEEDED", "API": "StartLabelDetection"}
+
+    def test_parse_sns_envelope_and_raw(self):
+        envelope = json.dumps({"Type": "Notification", "Message": json.dumps(self.NOTICE)})
+        self.assertEqual(SqsCompletionChannel.parse(envelope), self.NOTICE)
+        self.assertEqual(SqsCompletionChannel.parse(json.dumps(self.NOTICE)), self.NOTICE)
+
+    def test_parse_rejects_foreign_messages(self):
+        for body in ("no json", json.dumps({"Message": "texto"}), json.dumps({"otra": 1}), None):
+            self.assertIsNone(SqsCompletionChannel.parse(body), body)
+
+    def test_local_channel_delivers_early_and_late_notices(self):
+        ch = LocalCompletionChannel()
+        ch.publish("temprano", "FAILED")            # antes de que alguien espere
+        self.assertEqual(ch.wait("temprano", timeout=2), "FAILED")
+        ch.expect("tarde")
+        ch.publish("tarde")
+        self.assertEqual(ch.wait("tarde", timeout=2), "SUCCEEDED")
+        self.assertIsNone(ch.wait("nunca", timeout=0.05))
+
+
+# ---------------------------
+# video_service (thumbnails; requiere opencv, opcional)
+# ---------------------------
+@unittest.skipUnless(importlib.util.find_spec("cv2"), "requiere opencv (cv2)")
+class ExtractFramesTests(SimpleTestCase):
+    FPS, FRAMES = 10, 60
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import cv2
+        import numpy as np
+        fd, cls.path = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+        out = cv2.VideoWriter(cls.path, cv2.VideoWriter_fourcc(*"mp4v"), cls.FPS, (64, 48))
+        for i in range(cls.FRAMES):
+            out.write(np.full((48, 64, 3), 10 + i * 4, dtype=np.uint8))   # el brillo codifica el índice
+        out.release()
+        # brillo de cada cuadro leído en orden (referencia, el codec lo corre un poco)
+        cap, cls.levels = cv2.VideoCapture(cls.path), []
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            cls.levels.append(float(frame.mean()))
+        cap.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.path)
+        super().tearDownClass()
+
+    def _frame_of(self, jpeg):
+        mean = sum(Image.open(io.BytesIO(jpeg)).convert("L").getdata()) / (64 * 48)
+        return min(range(len(self.levels)), key=lambda i: abs(self.levels[i] - mean))
+
+    def test_each_timestamp_gets_its_own_frame_in_any_order(self):
+        # desordenados, repetidos, saltos largos (seek) y cortos (grab), y hacia atrás
+        timestamps = [5000, 200, 300, 300, 4100, 0, 5900, 1000]
+        frames = extract_frames(self.path, timestamps)
+        self.assertEqual(set(frames), set(timestamps))
+        for ts in timestamps:
+            self.assertEqual(self._frame_of(frames[ts]), round(ts / 1000 * self.FPS), ts)
+
+    def test_timestamps_past_the_end_are_skipped(self):
+        frames = extract_frames(self.path, [9000, 1500, 20000])
+        self.assertEqual(set(frames), {1500})
+
+
+# ---------------------------
+# video_rules
+# ---------------------------
+def _labels(*items):
+    """(ts, nombre[, confianza]) -> forma de get_label_detection."""
+    return [{"Timestamp": it[0], "Label": {"Name": it[1], "Confidence": it[2] if len(it) > 2 else 95.0}}
+            for it in items]
+
+
+class RuleSetTests(SimpleTestCase):
+    def test_matches_previous_detect_events(self):
+        for seed in range(3):
+            labels = synthetic_labels(hours=0.1, step_ms=200, seed=seed)
+            self.assertEqual(detect_events(labels), detect_events_reference(labels), seed)
+
+    def test_default_rules(self):
+        labels = _labels((0, "Dog"), (1000, "Person"),            # perro con persona cerca
+                         (10000, "Dog"), (10000, "Feces"),        # desechos; sin persona: suelto
+                         (20000, "Truck"), (21000, "Car"),        # dedup 3s
+                         (30000, "Car", MIN_CONF - 1))            # baja confianza
+        got = [(e["type"], e["timestamp_ms"]) for e in detect_events(labels)]
+        self.assertEqual(got, [("bad_parking", 20000), ("dog_loose", 10000), ("dog_waste", 10000)])
+
+    def test_near_absent_windows_and_min_confidence(self):
+        rules = RuleSet([AlertRule.from_dict({"type": "escort", "all": ["Dog"], "near": {"Person": 1000},
+                                              "min_label_confidence": 80, "dedup_ms": 0})])
+        timeline = build_timeline(_labels((0, "Dog"), (900, "Person"),
+                                          (5000, "Dog"), (6500, "Person"),
+                                          (9000, "Dog", 70), (9000, "Person")))
+        self.assertEqual([e["timestamp_ms"] for e in rules.evaluate(timeline)], [0])
+
+    def test_invalid_rules(self):
+        for d in ({"all": ["Dog"]}, {"type": "x"}, {"type": "x", "all": "Dog"},
+                  {"type": "x", "all": ["Dog"], "near": {"Person": -1}}):
+            with self.assertRaises(ValueError, msg=d):
+                AlertRule.from_dict(d)
+
+    def test_conflicting_dedup_for_a_type_is_rejected(self):
+        same = [AlertRule.from_dict({"type": "x", "all": ["Dog"]}), AlertRule.from_dict({"type": "x", "any": ["Cat"]})]
+        self.assertEqual(RuleSet(same).types, {"x"})
+        with self.assertRaises(ValueError):
+            RuleSet([same[0], AlertRule.from_dict({"type": "x", "any": ["Cat"], "dedup_ms": 0})])
+
+    def test_rules_round_trip(self):
+        for r in DEFAULT_RULES:
+            self.assertEqual(AlertRule.from_dict(r.as_dict()), r)
+
+
+class VisitorRegisterViewTests(TestCase):
+    def setUp(self):
+        from users.models import Role
+        Role.objects.create(name="Visitante")
+        self.client = APIClient()
+
+    def _post(self):
+        return self.client.post(reverse("ai-visitor-register"), {
+            "first_name": "Ana", "last_name": "Pérez",
+            "file": SimpleUploadedFile("f.jpg", _jpeg(), content_type="image/jpeg"),
+        }, format="multipart")
+
+    def test_no_face_is_422_and_leaves_no_user(self):
+        with mock.patch("ai.services.visitor_service.enroll_face", return_value={"face_id": None}):
+            resp = self._post()
+        self.assertEqual((resp.status_code, resp.json()["code"]), (422, "NO_FACE"))
+        self.assertFalse(get_user_model().objects.filter(first_name="Ana").exists())
+
+    def test_face_is_201(self):
+        def enroll(user_id, *a, **kw):
+            return {"face_id": "f1", "user_id": user_id}
+        with mock.patch("ai.services.visitor_service.enroll_face", side_effect=enroll):
+            resp = self._post()
+        self.assertEqual(resp.status_code, 201)
+        self.assertTrue(get_user_model().objects.filter(pk=resp.json()["user_id"]).exists())
+
+
+class VideoAlertRuleTests(TestCase):
+    def setUp(self):
+        video_rules.invalidate_rules()
+
+    def test_unknown_type_is_rejected_on_save(self):
+        with self.assertRaises(ValidationError):
+            VideoAlertRule.objects.create(type="no_existe", spec={"all": ["Dog"]})
+        with self.assertRaises(ValidationError):
+            VideoAlertRule.objects.create(type="dog_loose", spec={"all": "Dog"})
+
+    def test_conflicting_dedup_is_rejected_on_save(self):
+        VideoAlertRule.objects.create(type="dog_loose", spec={"all": ["Dog"]})
+        VideoAlertRule.objects.create(camera_id="cam1", type="dog_loose", spec={"all": ["Dog"], "dedup_ms": 0})
+        VideoAlertRule.objects.create(type="dog_loose", spec={"any": ["Cat"], "dedup_ms": 3000})
+        with self.assertRaises(ValidationError):
+            VideoAlertRule.objects.create(camera_id="", type="dog_loose", spec={"any": ["Cat"], "dedup_ms": 0})
+        VideoAlertRule.objects.create(type="dog_loose", spec={"any": ["Cat"], "dedup_ms": 0}, enabled=False)
+
+    def test_loader_skips_rules_with_conflicting_dedup(self):
+        VideoAlertRule.objects.create(type="dog_loose", spec={"all": ["Dog"]})
+        VideoAlertRule.objects.create(type="dog_loose", spec={"any": ["Cat"]})
+        VideoAlertRule.objects.filter(spec__any=["Cat"]).update(spec={"any": ["Cat"], "dedup_ms": 0})
+        with self.assertLogs("ai.services.video_rules", "WARNING"):
+            rules = video_rules.rules_for_camera(None)
+        self.assertEqual(len(rules.rules), 1)
+
+    def test_camera_rules_then_global_then_defaults(self):
+        self.assertIs(video_rules.rules_for_camera("cam1"), video_rules.DEFAULT_RULESET)
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoAlertRule.objects.create(type="bad_parking", spec={"any": ["Car"]})
+            VideoAlertRule.objects.create(camera_id="cam1", type="dog_loose", spec={"all": ["Dog"]})
+        self.assertEqual(video_rules.rules_for_camera("cam1").types, {"dog_loose"})
+        self.assertEqual(video_rules.rules_for_camera("cam2").types, {"bad_parking"})
+        self.assertEqual(video_rules.rules_for_camera(None).types, {"bad_parking"})
+
+    def test_rules_and_types_are_cached_until_a_rule_changes(self):
+        video_rules.known_alert_types()
+        with self.assertNumQueries(0):
+            video_rules.known_alert_types()
+            video_rules.rules_for_camera("cam1")
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoAlertRule.objects.create(camera_id="cam1", type="dog_waste", spec={"all": ["Dog"]})
+        with self.assertNumQueries(1):
+            self.assertEqual(video_rules.rules_for_camera("cam1").types, {"dog_waste"})
@@ -2,11 +2,16 @@
 from django.urls import path
 
 from .views.face_views import (
-    FaceDebugView, FaceEnrollView, FaceLoginView,
+    FaceDebugView, FaceEnrollView, FaceBulkEnrollView, FaceLoginView,
     FaceStatusView, FaceRevokeView,
 )
-from .views.plate_views import PlateDetectView, PlateAssignView, PlateVerifyView
-from .views.video_views import VideoUploadAndProcessView, AlertListView
+from .views.async_login_views import (
+    face_login_async, visitor_login_async, face_login_burst, visitor_login_burst,
+)
+from .views.gate_views import gate_check
+from .views.metrics_views import StageMetricsView
+from .views.plate_views import PlateDetectView, PlateDetectMultiView, PlateAssignView, PlateVerifyView
+from .views.video_views import VideoUploadAndProcessView, VideoJobStatusView, AlertListView
 
 from .views.visitor_auth_views import (
     VisitorRegisterView, VisitorLoginView,
@@ -19,21 +24,30 @@ from .views.visitor_session_views import (           # 👈 IMPORTA LAS NUEVAS
 urlpatterns = [
     # facial
     path("face/enroll/", FaceEnrollView.as_view(), name="ai-face-enroll"),
+    path("face/enroll/bulk/", FaceBulkEnrollView.as_view(), name="ai-face-enroll-bulk"),
     path("face/login/",  FaceLoginView.as_view(),  name="ai-face-login"),
+    path("face/login/async/", face_login_async, name="ai-face-login-async"),
+    path("face/login/burst/", face_login_burst, name="ai-face-login-burst"),
     path("face/status/<int:user_id>/", FaceStatusView.as_view(), name="ai-face-status"),
     path("face/revoke/", FaceRevokeView.as_view(), name="ai-face-revoke"),
     path("face/debug/",  FaceDebugView.as_view(),  name="ai-face-debug"),
+    path("metrics/",     StageMetricsView.as_view(), name="ai-metrics"),
 
     # placas
     path("plates/detect/",  PlateDetectView.as_view(), name="ai-plate-detect"),
+    path("plates/detect/multi/", PlateDetectMultiView.as_view(), name="ai-plate-detect-multi"),
     path("plates/assign/",  PlateAssignView.as_view(), name="ai-plate-assign"),
     path("plates/verify/",  PlateVerifyView.as_view(), name="ai-plate-verify"),
+    path("gate/check/",     gate_check,                name="ai-gate-check"),
     path("video/upload-and-process/", VideoUploadAndProcessView.as_view(), name="ai-video-upload-process"),
+    path("video/jobs/<int:job_id>/", VideoJobStatusView.as_view(), name="ai-video-job"),
     path("alerts/", AlertListView.as_view(), name="ai-alerts"),
 
     # visitantes: auth + estado
     path("visitor/register/",    VisitorRegisterView.as_view(),    name="ai-visitor-register"),
     path("visitor/login/",       VisitorLoginView.as_view(),       name="ai-visitor-login"),
+    path("visitor/login/async/", visitor_login_async,              name="ai-visitor-login-async"),
+    path("visitor/login/burst/", visitor_login_burst,              name="ai-visitor-login-burst"),
     path("visitor/logout/",      VisitorLogoutView.as_view(),      name="ai-visitor-logout"),
     path("visitor/last-status/<int:user_id>/", VisitorLastStatusView.as_view(), name="ai-visitor-last-status"),
 
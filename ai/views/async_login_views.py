@@ -0,0 +1,218 @@
+# ai/views/async_login_views.py
+"""
+Login facial (residentes y visitantes) como vistas async de Django, para
+servir bajo ASGI (backend.asgi + uvicorn).
+
+La búsqueda en Rekognition/S3 corre en el pool de hilos de asgiref
+(thread_sensitive=False), así que el event loop sigue atendiendo otros
+logins mientras espera a AWS. Las etapas de BD y tokens van por el hilo
+sync compartido (thread_sensitive=True), como exige el ORM. La búsqueda
+puede tocar BD igual (FACE_MATCH_BACKEND=local carga el índice desde
+UserFace), por eso corre envuelta en releasing_connections: cada hilo del
+pool cierra sus conexiones al terminar en vez de dejarlas abiertas.
+
+Cada etapa tiene su propio timeout; si se vence se responde 504 con la
+etapa que falló. El hilo de la etapa vencida termina por su cuenta (las
+llamadas a AWS ya están acotadas por AWS_READ_TIMEOUT), pero la respuesta
+no lo espera.
+
+Las respuestas son idénticas a las de /face/login/ y /visitor/login/.
+
+Modo ráfaga (…/login/burst/): el kiosco manda varios cuadros en un solo
+POST multipart (campo `frames` repetido; sirve también con
+Transfer-Encoding: chunked). Se puntúan localmente (nitidez y tamaño del
+rostro, ver face_quality.select_best_frame) y solo el mejor va a
+search_by_image: como máximo una llamada a AWS por intento. La respuesta
+agrega "frame" con el cuadro elegido y el puntaje de cada uno.
+"""
+import asyncio
+import functools
+import os
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from ai.models.visitor_session import VisitorSession
+from ai.services.face_quality import FaceQualityError, select_best_frame
+from ai.services.face_service import search_by_image
+from ai.services.image_prep import read_bytes
+from ai.services.timing import stage
+from ai.services.login_service import (
+    role_permissions, issue_tokens, is_visitor_role,
+    face_login_payload, visitor_login_payload,
+)
+from ai.views.visitor_auth_views import VISITOR_LOGIN_PREFIX
+
+User = get_user_model()
+
+FACE_ASYNC_SEARCH_TIMEOUT = float(os.getenv("FACE_ASYNC_SEARCH_TIMEOUT", "8"))
+FACE_ASYNC_DB_TIMEOUT     = float(os.getenv("FACE_ASYNC_DB_TIMEOUT", "3"))
+FACE_ASYNC_TOKEN_TIMEOUT  = float(os.getenv("FACE_ASYNC_TOKEN_TIMEOUT", "2"))
+FACE_ASYNC_SELECT_TIMEOUT = float(os.getenv("FACE_ASYNC_SELECT_TIMEOUT", "3"))
+FACE_BURST_MAX_FRAMES     = int(os.getenv("FACE_BURST_MAX_FRAMES", "8"))
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str, seconds: float):
+        super().__init__(f"Etapa '{stage}' excedió {seconds}s")
+        self.stage = stage
+        self.seconds = seconds
+
+
+async def run_stage(name: str, timeout: float, func, *args, thread_sensitive: bool = True, **kwargs):
+    """Corre `func` (sync) fuera del event loop con timeout propio."""
+    call = sync_to_async(func, thread_sensitive=thread_sensitive)
+    try:
+        return await asyncio.wait_for(call(*args, **kwargs), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise StageTimeout(name, timeout)
+
+
+def releasing_connections(func):
+    """
+    Envuelve `func` para correr en un hilo del pool (thread_sensitive=False):
+    cierra las conexiones de BD viejas antes y después, como hace Django
+    alrededor de cada request, para que los hilos del pool no acumulen conexiones.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def _timeout_response(e: StageTimeout) -> JsonResponse:
+    return JsonResponse({"ok": False, "code": "TIMEOUT", "stage": e.stage, "timeout_s": e.seconds}, status=504)
+
+
+# ---------- etapas sync ----------
+def _load_user(external_id):
+    """Usuario + permisos del rol en una sola pasada por BD. None si no existe."""
+    try:
+        with stage("db.user"):
+            user = User.objects.select_related("role").get(pk=int(external_id))
+    except (ValueError, TypeError, User.DoesNotExist):
+        return None, []
+    return user, role_permissions(getattr(user, "role", None))
+
+
+def _create_session(user, similarity, key) -> int:
+    with stage("db.session"):
+        return VisitorSession.objects.create(
+            user=user,
+            similarity=float(similarity or 0.0),
+            s3_key=key or "",
+            event_type="session",
+        ).id
+
+
+def _select_frame(files) -> Dict[str, Any]:
+    """Lee la ráfaga y elige el mejor cuadro (FaceQualityError si ninguno sirve)."""
+    frames = [read_bytes(f) for f in files[:FACE_BURST_MAX_FRAMES]]
+    with stage("face.select"):
+        index, _metrics, summary = select_best_frame(frames)
+    return {"data": frames[index], "info": {"index": index, "received": len(files), "frames": summary}}
+
+
+# ---------- pipelines ----------
+async def _face_login(file, *, quality_checked: bool = False, extra: Optional[Dict[str, Any]] = None):
+    try:
+        external_id, similarity, _key, _raw = await run_stage(
+            "search", FACE_ASYNC_SEARCH_TIMEOUT, releasing_connections(search_by_image), file,
+            quality_checked=quality_checked, thread_sensitive=False,
+        )
+        if not external_id:
+            return JsonResponse({"recognized": False, **(extra or {})}, status=200)
+
+        user, perms = await run_stage("db", FACE_ASYNC_DB_TIMEOUT, _load_user, external_id)
+        if user is None:
+            return JsonResponse({"recognized": False, **(extra or {})}, status=200)
+
+        tokens = await run_stage("token", FACE_ASYNC_TOKEN_TIMEOUT, issue_tokens, user)
+    except FaceQualityError as e:
+        return JsonResponse(e.as_response(), status=422)
+    except StageTimeout as e:
+        return _timeout_response(e)
+
+    return JsonResponse({**face_login_payload(user, similarity, perms, tokens), **(extra or {})}, status=200)
+
+
+async def _visitor_login(file, *, quality_checked: bool = False, extra: Optional[Dict[str, Any]] = None):
+    not_visitor = {"ok": False, "code": "NOT_VISITOR", **(extra or {})}
+    try:
+        external_id, similarity, key, _raw = await run_stage(
+            "search", FACE_ASYNC_SEARCH_TIMEOUT, releasing_connections(search_by_image), file,
+            key_prefix=VISITOR_LOGIN_PREFIX, is_visitor=True,
+            quality_checked=quality_checked, thread_sensitive=False,
+        )
+        if not external_id:
+            return JsonResponse(not_visitor, status=404)
+
+        user, perms = await run_stage("db", FACE_ASYNC_DB_TIMEOUT, _load_user, external_id)
+        if user is None:
+            return JsonResponse(not_visitor, status=404)
+        if not is_visitor_role(getattr(getattr(user, "role", None), "name", None)):
+            return JsonResponse(not_visitor, status=403)
+
+        session_id = await run_stage("session", FACE_ASYNC_DB_TIMEOUT, _create_session, user, similarity, key)
+        tokens = await run_stage("token", FACE_ASYNC_TOKEN_TIMEOUT, issue_tokens, user)
+    except FaceQualityError as e:
+        return JsonResponse(e.as_response(), status=422)
+    except StageTimeout as e:
+        return _timeout_response(e)
+
+    return JsonResponse(
+        {**visitor_login_payload(user, session_id, similarity, perms, tokens), **(extra or {})}, status=200,
+    )
+
+
+async def _burst(request, login):
+    files: List = request.FILES.getlist("frames") or request.FILES.getlist("file")
+    if not files:
+        return JsonResponse({"ok": False, "frames": ["Se requiere al menos un cuadro."]}, status=400)
+    try:
+        picked = await run_stage("select", FACE_ASYNC_SELECT_TIMEOUT, _select_frame, files, thread_sensitive=False)
+    except FaceQualityError as e:
+        return JsonResponse(e.as_response(), status=422)
+    except StageTimeout as e:
+        return _timeout_response(e)
+    return await login(picked["data"], quality_checked=True, extra={"frame": picked["info"]})
+
+
+# ---------- vistas ----------
+@csrf_exempt
+@require_POST
+async def face_login_async(request):
+    file = request.FILES.get("file")
+    if not file:
+        return JsonResponse({"detail": "file es requerido"}, status=400)
+    return await _face_login(file)
+
+
+@csrf_exempt
+@require_POST
+async def visitor_login_async(request):
+    file = request.FILES.get("file")
+    if not file:
+        return JsonResponse({"ok": False, "file": ["Este campo es requerido."]}, status=400)
+    return await _visitor_login(file)
+
+
+@csrf_exempt
+@require_POST
+async def face_login_burst(request):
+    return await _burst(request, _face_login)
+
+
+@csrf_exempt
+@require_POST
+async def visitor_login_burst(request):
+    return await _burst(request, _visitor_login)
@@ -1,52 +1,27 @@
 # recognition/views.py
-import os
-import uuid
-import boto3
+import zipfile
 from botocore.exceptions import ClientError
 
-from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
 from django.contrib.auth import get_user_model
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from ..services.face_service import enroll_face, search_by_image 
-from ..models import UserFace
-
-# ========= AWS config =========
-AWS_ACCESS_KEY_ID     = os.getenv("AWS_ACCESS_KEY_ID", "").strip()
-AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "").strip()
-AWS_REGION            = os.getenv("AWS_REGION", "us-east-1").strip()
-BUCKET                = os.getenv("AWS_STORAGE_BUCKET_NAME", "").strip()
-COLLECTION            = os.getenv("AWS_COLLECTION_ID", "").strip()
-FACE_THRESHOLD        = int(os.getenv("FACE_THRESHOLD", "90"))
-
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
+from ..services.face_service import (
+    enroll_face, search_by_image, collection_cache_stats,
+    enroll_faces_bulk, items_from_zip, revoke_face,
+    COLLECTION as SERVICE_COLLECTION, VISITOR_COLLECTION,
 )
-rekognition = boto3.client(
-    "rekognition",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
-)
-
-def _upload_blob_to_s3(file_obj, key: str):
-    """Sube file_obj a S3 con ContentType image/jpeg."""
-    extra = {"ContentType": "image/jpeg"}
-    if isinstance(file_obj, (InMemoryUploadedFile, TemporaryUploadedFile)):
-        file_obj.seek(0)
-        s3.upload_fileobj(file_obj, BUCKET, key, ExtraArgs=extra)
-    else:
-        s3.upload_file(file_obj, BUCKET, key, ExtraArgs=extra)
-
+from ..services.face_sync import list_collection_faces, last_report
+from ..serializers import FaceStatusSerializer
+from ..models import UserFace
+from ..services.match_cache import match_cache
+from ..services.face_quality import FaceQualityError
+from ..services.login_service import role_permissions, issue_tokens, face_login_payload
+from ..services.timing import stage
+from ..permissions import IsAdminRole
 
 User = get_user_model()
 
@@ -63,32 +38,59 @@ class FaceEnrollView(APIView):
             return Response({"detail": "file y user_id son requeridos"}, status=400)
 
         try:
+            # enroll_face ya persiste ai_userface en la colección que corresponde
             result = enroll_face(user_id, file)
+            return Response({"ok": True, "result": result}, status=201)
+
+        except ClientError as e:
+            msg = e.response.get("Error", {}).get("Message", str(e))
+            return Response({"ok": False, "detail": f"AWS error: {msg}"}, status=400)
+        except Exception as e:
+            return Response({"ok": False, "detail": str(e)}, status=500)
 
-            # Persistencia opcional en BD
-            try:
-                UserFace.objects.update_or_create(
-                    user_id=int(user_id),
-                    defaults={
-                        "external_image_id": result.get("external_image_id", str(user_id)),
-                        "face_id": result.get("face_id") or "",
-                        "collection_id": result.get("collection_id", COLLECTION),
-                        "s3_key": result.get("s3_key", ""),
-                        "status": "active",
-                    },
-                )
-            except Exception as e:
-                # No romper si la BD falla
-                print("WARN saving UserFace:", e)
 
-            return Response({"ok": True, "result": result}, status=201)
+# ========= ENROLL MASIVO =========
+class FaceBulkEnrollView(APIView):
+    """
+    POST multipart:
+      - file: zip con <user_id>.jpg, o con manifest.csv (user_id,filename)
+      - is_visitor: "1" para usar el prefijo de visitantes (opcional)
+    Respuesta: { ok, total, enrolled, failed, results: [...] }
+    Solo administradores: enrola rostros a nombre de cualquier user_id.
+    """
+    permission_classes = [IsAdminRole]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        file = request.FILES.get("file")
+        if not file:
+            return Response({"detail": "file (zip) es requerido"}, status=400)
+
+        is_visitor = str(request.data.get("is_visitor", "")).lower() in ("1", "true")
+        try:
+            items = items_from_zip(file)
+        except (ValueError, zipfile.BadZipFile) as e:
+            return Response({"ok": False, "detail": str(e)}, status=400)
+        if not items:
+            return Response({"ok": False, "detail": "El zip no contiene imágenes"}, status=400)
 
+        try:
+            results = enroll_faces_bulk(items, is_visitor=is_visitor)
         except ClientError as e:
             msg = e.response.get("Error", {}).get("Message", str(e))
             return Response({"ok": False, "detail": f"AWS error: {msg}"}, status=400)
         except Exception as e:
             return Response({"ok": False, "detail": str(e)}, status=500)
 
+        enrolled = sum(1 for r in results if r.get("ok"))
+        return Response({
+            "ok": True,
+            "total": len(results),
+            "enrolled": enrolled,
+            "failed": len(results) - enrolled,
+            "results": results,
+        }, status=201)
+
 
 # ========= LOGIN =========
 class FaceLoginView(APIView):
@@ -101,97 +103,94 @@ class FaceLoginView(APIView):
             return Response({"detail": "file es requerido"}, status=400)
 
         # Buscar coincidencia
-        external_id, similarity, s3key, _raw = search_by_image(file)
+        try:
+            external_id, similarity, s3key, _raw = search_by_image(file)
+        except FaceQualityError as e:
+            return Response(e.as_response(), status=422)
         if not external_id:
             return Response({"recognized": False}, status=200)
 
         # Buscar usuario por external_id (guardamos el id del usuario como ExternalImageId)
         try:
-            user = User.objects.get(pk=int(external_id))
+            with stage("db.user"):
+                user = User.objects.select_related("role").get(pk=int(external_id))
         except (ValueError, User.DoesNotExist):
             return Response({"recognized": False}, status=200)
 
-        # Generar tokens
-        refresh = RefreshToken.for_user(user)
-        access = refresh.access_token
-
-        # Rol del usuario (si tu User tiene FK 'role')
-        role_name = getattr(getattr(user, "role", None), "name", None)
-
-        # Permisos: intenta 'codename' -> 'code' -> 'name'
-        perms = []
-        role = getattr(user, "role", None)
-        if role is not None and hasattr(role, "permissions"):
-            try:
-                model_fields = {f.name for f in role.permissions.model._meta.fields}
-                if "codename" in model_fields:
-                    perms = list(role.permissions.values_list("codename", flat=True))
-                elif "code" in model_fields:
-                    perms = list(role.permissions.values_list("code", flat=True))
-                elif "name" in model_fields:
-                    perms = list(role.permissions.values_list("name", flat=True))
-                else:
-                    perms = []
-            except Exception as e:
-                print("WARN reading role permissions:", e)
-                perms = []
-
-        # Si usas permisos nativos de Django:
-        # perms = list(user.get_all_permissions())
-
-        return Response(
-            {
-                "recognized": True,
-                "similarity": similarity,
-                "user": {
-                    "id": user.id,
-                    "email": getattr(user, "email", ""),
-                    "first_name": getattr(user, "first_name", ""),
-                    "last_name": getattr(user, "last_name", ""),
-                    "role": {"name": role_name} if role_name else None,
-                },
-                "access": str(access),
-                "refresh": str(refresh),
-                "role": role_name,
-                "permissions": perms,
-            },
-            status=200,
-        )
+        perms = role_permissions(getattr(user, "role", None))
+        return Response(face_login_payload(user, similarity, perms, issue_tokens(user)), status=200)
 
 
-# ========= STATUS / REVOKE (stubs) =========
+# ========= STATUS (desde el espejo en BD) / REVOKE =========
 class FaceStatusView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, user_id: int):
-        return Response({"status": "registered", "user_id": user_id})
+        rows = UserFace.objects.filter(user_id=user_id).order_by("collection_id")
+        if not rows:
+            return Response({"status": "not_registered", "user_id": user_id})
+        data = FaceStatusSerializer(rows, many=True).data
+        registered = any(r.status == "registered" for r in rows)
+        return Response({
+            "status": "registered" if registered else rows[0].status,
+            "user_id": user_id,
+            "faces": data,
+        })
 
 
 class FaceRevokeView(APIView):
-    permission_classes = [AllowAny]
+    """
+    Borra el/los rostros del usuario de la colección y marca ai_userface como "revoked".
+    Body: { user_id: int, collection_id?: str }
+    Solo administradores.
+    """
+    permission_classes = [IsAdminRole]
 
     def post(self, request):
-        # Aquí podrías eliminar la cara de la collection y marcar en BD.
-        return Response({"message": "revoked (stub)"})
+        user_id = request.data.get("user_id")
+        if not user_id or not str(user_id).isdigit():
+            return Response({"detail": "user_id es requerido"}, status=400)
+        try:
+            result = revoke_face(user_id, request.data.get("collection_id") or None)
+        except ClientError as e:
+            msg = e.response.get("Error", {}).get("Message", str(e))
+            return Response({"ok": False, "detail": f"AWS error: {msg}"}, status=400)
+        if not result["ok"]:
+            return Response({"ok": False, "detail": "El usuario no tiene rostro registrado"}, status=404)
+        return Response(result, status=200)
 
 
-# ========= DEBUG (lista primeras 5 caras) =========
+# ========= DEBUG (primeras 5 caras del espejo en BD) =========
 class FaceDebugView(APIView):
+    """
+    Lee ai_userface + último reporte de sync (ver sync_face_collection).
+    ?collection=visitors para la colección de visitantes.
+    ?live=1 lista la colección en Rekognition (solo para diagnóstico: O(tamaño)).
+    """
     permission_classes = [AllowAny]
 
     def get(self, request):
-        col = os.getenv("AWS_COLLECTION_ID", "").strip()
-        reg = os.getenv("AWS_REGION", "us-east-1").strip()
-        rek = boto3.client("rekognition", region_name=reg)
-        faces = []
-        token = None
-        while True:
-            kw = {"CollectionId": col}
-            if token:
-                kw["NextToken"] = token
-            r = rek.list_faces(**kw)
-            faces.extend(r.get("Faces", []))
-            token = r.get("NextToken")
-            if not token:
-                break
-        return Response({"collection": col, "count": len(faces), "faces": faces[:5]})
+        col = VISITOR_COLLECTION if request.query_params.get("collection") == "visitors" else SERVICE_COLLECTION
+        if request.query_params.get("live") in ("1", "true"):
+            faces = list_collection_faces(col)
+            return Response({"collection": col, "source": "rekognition", "count": len(faces), "faces": faces[:5]})
+
+        qs = UserFace.objects.filter(collection_id=col, status="registered")
+        report = last_report(col)
+        return Response({
+            "collection": col,
+            "source": "db",
+            "count": qs.count(),
+            "faces": list(qs.order_by("-updated_at").values("user_id", "external_image_id", "face_id", "s3_key", "updated_at")[:5]),
+            "drift": None if report is None else {
+                "synced_at": report.finished_at,
+                "collection_faces": report.collection_faces,
+                "db_rows": report.db_rows,
+                "missing": report.missing,
+                "orphaned": report.orphaned,
+                "superseded": report.superseded,
+                "details": report.details,
+            },
+            "collection_cache": collection_cache_stats(),
+            "match_cache": match_cache.stats(),
+        })
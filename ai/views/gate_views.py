@@ -0,0 +1,138 @@
+# ai/views/gate_views.py
+"""
+Chequeo unificado del portón: una foto del conductor + una de la placa.
+
+detect_plate y search_by_image corren en paralelo (hilos de asgiref), así
+que la latencia es la de la rama más lenta y no la suma de
+plates/detect + plates/verify + face/login. Después se resuelve la placa
+contra `Plate` y se devuelve una sola decisión (ver gate_service.decide)
+con el tiempo de cada rama.
+
+Con varios cuadros de la placa (campo "plate" repetido) la rama de placa
+usa detect_plate_multi: OCR en paralelo y voto por carácter.
+
+Una rama que falla (calidad, timeout, error de AWS) no tumba a la otra:
+queda con su "status" y la decisión se toma con lo que haya.
+"""
+import asyncio
+import logging
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from ai.services.face_quality import FaceQualityError
+from ai.services.face_service import search_by_image
+from ai.services.gate_service import decide, plate_candidates
+from ai.services.plate_service import detect_plate, detect_plate_multi
+from ai.services.timing import observe, stage
+from ai.views.async_login_views import (
+    FACE_ASYNC_DB_TIMEOUT, FACE_ASYNC_SEARCH_TIMEOUT, StageTimeout, releasing_connections, run_stage,
+)
+
+log = logging.getLogger(__name__)
+
+User = get_user_model()
+
+GATE_PLATE_TIMEOUT = float(os.getenv("GATE_PLATE_TIMEOUT", "8"))
+
+
+async def _branch(name: str, timeout: float, func, *args, **kwargs):
+    """
+    Corre una rama en el pool de hilos y retorna (resultado | None, status, ms)
+    sin propagar errores. Las ramas pueden tocar BD (cámara de placas, índice
+    local de rostros): releasing_connections cierra las conexiones del hilo.
+    """
+    t0 = time.perf_counter()
+    result, status = None, "ok"
+    try:
+        result = await run_stage(name, timeout, releasing_connections(func), *args,
+                                 thread_sensitive=False, **kwargs)
+    except FaceQualityError as e:
+        status = e.code.lower()
+    except StageTimeout:
+        status = "timeout"
+    except Exception:
+        log.exception("Rama %s del portón falló", name)
+        status = "error"
+    ms = (time.perf_counter() - t0) * 1000.0
+    observe(f"gate.{name}", ms)
+    return result, status, round(ms, 1)
+
+
+def _plate_branch(files, camera_id=None):
+    if len(files) > 1:
+        return _branch("plate", GATE_PLATE_TIMEOUT, detect_plate_multi, files, camera_id=camera_id)
+    return _branch("plate", GATE_PLATE_TIMEOUT, detect_plate, files[0], camera_id=camera_id)
+
+
+def _resolve(face_user_id, plate_number):
+    with stage("db.gate"):
+        candidates = plate_candidates(plate_number)
+        user = (User.objects.filter(pk=face_user_id).values("id", "first_name", "last_name").first()
+                if face_user_id is not None else None)
+    return candidates, user
+
+
+@csrf_exempt
+@require_POST
+async def gate_check(request):
+    """
+    POST multipart: face (foto del conductor), plate (foto de la placa; se puede repetir). Al menos una.
+    camera_id opcional: ROI y filtros de OCR de la cámara de placas.
+    Respuesta: {decision, reason, face{...}, plate{...}, user, timings{face, plate, resolve, total}}
+    """
+    t0 = time.perf_counter()
+    face_file = request.FILES.get("face")
+    plate_files = request.FILES.getlist("plate")
+    if not face_file and not plate_files:
+        return JsonResponse({"ok": False, "detail": "face y/o plate son requeridos"}, status=400)
+
+    async def _none():
+        return None, "missing", 0.0
+
+    (face_res, face_status, face_ms), (plate_res, plate_status, plate_ms) = await asyncio.gather(
+        _branch("face", FACE_ASYNC_SEARCH_TIMEOUT, search_by_image, face_file) if face_file else _none(),
+        _plate_branch(plate_files, request.POST.get("camera_id")) if plate_files else _none(),
+    )
+
+    face_user_id, similarity = None, None
+    if face_res and face_res[0]:
+        try:
+            face_user_id, similarity = int(face_res[0]), face_res[1]
+        except (TypeError, ValueError):
+            pass
+    consensus = None
+    if isinstance(plate_res, dict):   # varios cuadros
+        consensus = {"confidence": plate_res["confidence"], "frames": plate_res["frames"]}
+        plate_key = next((r["s3_key"] for r in plate_res["reads"] if r["s3_key"]), None)
+        plate_res = (plate_res["plate"], plate_key)
+    # el OCR ya entrega [A-Z0-9]{4,10} (ver _plate_words) y plate_registry.match normaliza de nuevo
+    plate_number, plate_key = plate_res if plate_res else (None, None)
+
+    t1 = time.perf_counter()
+    try:
+        candidates, user = await run_stage("resolve", FACE_ASYNC_DB_TIMEOUT, _resolve, face_user_id, plate_number)
+    except StageTimeout as e:
+        return JsonResponse({"ok": False, "code": "TIMEOUT", "stage": e.stage, "timeout_s": e.seconds}, status=504)
+    resolve_ms = (time.perf_counter() - t1) * 1000.0
+    if user is None:
+        face_user_id = None   # ExternalImageId de un usuario que ya no existe
+
+    result = decide(face_user_id, plate_number, candidates)
+    owners = sorted({uid for c in candidates for uid in c.owner_ids})
+    return JsonResponse({
+        "ok": True,
+        **result,
+        "face": {"status": face_status, "recognized": face_user_id is not None,
+                 "user_id": face_user_id, "similarity": similarity},
+        "plate": {"status": plate_status, "number": plate_number, "registered": bool(candidates),
+                  "owner_ids": owners, "candidates": [c.as_dict() for c in candidates], "s3_key": plate_key,
+                  "consensus": consensus},
+        "user": user,
+        "timings": {"face": face_ms, "plate": plate_ms, "resolve": round(resolve_ms, 1),
+                    "total": round((time.perf_counter() - t0) * 1000.0, 1)},
+    }, status=200)
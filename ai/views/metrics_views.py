@@ -0,0 +1,31 @@
+# ai/views/metrics_views.py
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ai.permissions import IsAdminRole
+from ai.services import s3_archive, timing
+from ai.services.face_service import collection_cache_stats
+from ai.services.match_cache import match_cache
+from ai.services.plate_registry import plate_registry
+
+
+class StageMetricsView(APIView):
+    """
+    GET    histogramas de latencia por etapa de este proceso (ver ai/services/timing.py).
+    DELETE reinicia los histogramas.
+    Con varios workers cada uno tiene los suyos: el valor es por proceso.
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response({
+            "stages": timing.snapshot(),
+            "match_cache": match_cache.stats(),
+            "collection_cache": collection_cache_stats(),
+            "plate_registry": plate_registry.stats(),
+            "s3_archive": s3_archive.stats(),
+        })
+
+    def delete(self, request):
+        timing.reset()
+        return Response(status=204)
@@ -9,7 +9,8 @@ from rest_framework import status, permissions
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
 from ai.models.plate import Plate
-from ai.services.plate_service import detect_plate  # tu OCR que devuelve la placa
+from ai.services.plate_service import detect_plate, detect_plate_multi  # tu OCR que devuelve la placa
+from ai.services.plate_registry import plate_registry
 
 User = get_user_model()
 
@@ -19,6 +20,7 @@ class PlateDetectView(APIView):
     Detecta el número de placa a partir de una imagen.
     Body (multipart/form-data):
       - file: imagen
+      - camera_id: opcional (ROI y filtros de OCR de esa cámara, ver PLATE_CAMERAS)
     Respuesta: { ok: true, plate: "ABC123" | null }
     """
     permission_classes = [permissions.AllowAny]
@@ -30,7 +32,7 @@ class PlateDetectView(APIView):
             return Response({"error": "file es requerido"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            result = detect_plate(file)
+            result = detect_plate(file, camera_id=request.data.get("camera_id"))
             # tu función puede devolver 'ABC123' o ('ABC123', 's3_key')
             if isinstance(result, (list, tuple)):
                 plate = result[0] if result else None
@@ -46,6 +48,31 @@ class PlateDetectView(APIView):
             return Response({"error": f"Error detectando placa: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class PlateDetectMultiView(APIView):
+    """
+    Detecta la placa con varios cuadros del mismo vehículo (OCR en paralelo + voto por carácter).
+    Body (multipart/form-data):
+      - frames: imágenes (repetir el campo; también acepta "file")
+      - camera_id: opcional
+    Respuesta: { ok: true, plate: "ABC123" | null, confidence: 0..1, frames: n, reads: [...] }
+    """
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        frames = request.FILES.getlist("frames") or request.FILES.getlist("file")
+        if not frames:
+            return Response({"error": "frames es requerido"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = detect_plate_multi(frames, camera_id=request.data.get("camera_id"))
+        except Exception as e:
+            return Response({"error": f"Error detectando placa: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        code = status.HTTP_201_CREATED if result["plate"] else status.HTTP_200_OK
+        return Response({"ok": True, **result}, status=code)
+
+
 class PlateAssignView(APIView):
     """
     Asigna una placa a un usuario.
@@ -85,10 +112,12 @@ class PlateAssignView(APIView):
 
 class PlateVerifyView(APIView):
     """
-    Verifica si una placa existe en la BD.
+    Verifica si una placa está registrada (registro en memoria, sin consultar ai_plate).
+    Tolera confusiones del OCR (O/0, I/1, B/8, S/5, ...). Las placas a un carácter de
+    diferencia (kind "edit1") van solo en "candidates", como sugerencias: no cuentan para "exists".
     Body (JSON):
       - number: str
-    Respuesta: { exists: bool }
+    Respuesta: { exists: bool, match: {number, owner_ids, confidence, kind} | null, candidates: [...] }
     """
     permission_classes = [permissions.AllowAny]
     parser_classes = [JSONParser]
@@ -98,6 +127,10 @@ class PlateVerifyView(APIView):
         if not number:
             return Response({"error": "number es requerido"}, status=status.HTTP_400_BAD_REQUEST)
 
-        number = str(number).strip().upper()
-        exists = Plate.objects.filter(number=number).exists()
-        return Response({"exists": exists}, status=status.HTTP_200_OK)
+        candidates = [c.as_dict() for c in plate_registry.match(number, suggestions=True)]
+        matches = [c for c in candidates if c["kind"] in ("exact", "confusion")]
+        return Response({
+            "exists": bool(matches),
+            "match": matches[0] if matches else None,
+            "candidates": candidates,
+        }, status=status.HTTP_200_OK)
@@ -1,6 +1,3 @@
-import os
-import uuid
-import boto3
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -8,15 +5,20 @@ from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
 
-from ai.services.video_service import process_video_and_return_events, INPUT_BUCKET
+from ai.services.video_jobs import enqueue_video
+from ai.services.video_rules import known_alert_types
 from ai.models.alert import Alert
-from ai.serializers import AlertSerializer
+from ai.models.video_job import VideoJob
+from ai.serializers import AlertSerializer, VideoJobSerializer
 
-ALLOWED_TYPES = {"dog_loose", "dog_waste", "bad_parking"}
 
-s3 = boto3.client("s3", region_name=os.getenv("AWS_REGION","us-east-1"))
 
 class VideoUploadAndProcessView(APIView):
+    """
+    Sube el video y encola su análisis; no espera a Rekognition.
+    Respuesta 202: { ok, job_id, status: "queued", video_key }
+    El resultado (estado + alertas) se consulta en video/jobs/<job_id>/.
+    """
     permission_classes = [AllowAny]
     parser_classes = [MultiPartParser, FormParser]
 
@@ -26,44 +28,34 @@ class VideoUploadAndProcessView(APIView):
         if not file:
             return Response({"detail":"file requerido"}, status=400)
 
-        # 1) subir a S3
-        ext = os.path.splitext(file.name)[1] or ".mp4"
-        s3_key = f"videos/{uuid.uuid4().hex}{ext}"
-        s3.upload_fileobj(file, INPUT_BUCKET, s3_key, ExtraArgs={"ContentType":"video/mp4"})
-
-        # 2) procesar
         try:
-            events = process_video_and_return_events(s3_key, camera_id=camera_id)
+            job = enqueue_video(file, camera_id=camera_id)
         except Exception as e:
-            return Response({"detail": f"error analizando video: {e}"}, status=500)
-
-        # 3) guardar en BD (solo tipos permitidos)
-        created = []
-        for ev in events:
-            if ev.get("type") not in ALLOWED_TYPES:
-                continue
-            a = Alert.objects.create(
-                type=ev["type"],
-                camera_id=camera_id,
-                s3_video_key=ev["s3_video_key"],
-                s3_image_key=ev.get("s3_image_key"),
-                timestamp_ms=ev["timestamp_ms"],
-                confidence=ev.get("confidence", 0.0),
-                extra=ev.get("extra", {}),
-            )
-            created.append(a)
+            return Response({"detail": f"error subiendo video: {e}"}, status=500)
 
         return Response({
             "ok": True,
-            "video_key": s3_key,
-            "events": AlertSerializer(created, many=True).data
-        }, status=201)
+            "job_id": job.pk,
+            "status": job.status,
+            "video_key": job.s3_video_key,
+        }, status=202)
+
+
+class VideoJobStatusView(APIView):
+    """Estado de un análisis de video; con status "succeeded" incluye las alertas creadas."""
+    permission_classes = [AllowAny]
+
+    def get(self, request, job_id: int):
+        job = VideoJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({"detail": "job no existe"}, status=404)
+        return Response(VideoJobSerializer(job).data)
 
 class AlertListView(APIView):
     permission_classes = [AllowAny]
     def get(self, request):
         qs = (Alert.objects
-              .filter(type__in=ALLOWED_TYPES)
+              .filter(type__in=known_alert_types())
               .order_by("-created_at")[:50])
         data = AlertSerializer(qs, many=True).data
         return Response(data)
@@ -4,16 +4,19 @@ from django.contrib.auth import get_user_model
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db import transaction
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.exceptions import AuthenticationFailed
 
-from ai.services.face_service import enroll_face, search_by_image
+from ai.services.face_service import search_by_image
+from ai.services.face_quality import FaceQualityError
+from ai.services.login_service import role_permissions, issue_tokens, visitor_login_payload
+from ai.services.timing import stage
+from ai.services.visitor_service import register_visitor, VisitorRegistrationError
 from ai.serializers import VisitorRegisterSerializer, VisitorLoginSerializer
 from ai.models.visitor_session import VisitorSession
 from users.models import Role
@@ -42,11 +45,16 @@ def _gen_visitor_email() -> str:
 # ---------- REGISTRO DE VISITANTE ----------
 @method_decorator(csrf_exempt, name="dispatch")
 class VisitorRegisterView(APIView):
-    """Crea usuario visitante (nombre+apellido) + enroll en Rekognition."""
+    """
+    Crea usuario visitante (nombre+apellido) + enroll en Rekognition (ver visitor_service).
+    201 {ok, user_id}: visitante creado con rostro indexado.
+    422 {ok: false, code: "NO_FACE"}: el motor no encontró un rostro en la foto;
+        el usuario recién creado se borra (antes quedaba un visitante sin rostro
+        que no podía iniciar sesión y se respondía 201). El kiosco debe pedir otra foto.
+    """
     permission_classes = [permissions.AllowAny]
     parser_classes = [MultiPartParser, FormParser]
 
-    @transaction.atomic
     def post(self, request):
         s = VisitorRegisterSerializer(data=request.data)
         s.is_valid(raise_exception=True)
@@ -62,16 +70,19 @@ class VisitorRegisterView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        user = User.objects.create_user(
-            email=_gen_visitor_email(),
-            password=None,
-            first_name=first_name,
-            last_name=last_name,
-            role=role,
-        )
-
-        enroll_face(user.id, file_obj, key_prefix=VISITOR_ENROLL_PREFIX, is_visitor=True)
-        return Response({"ok": True, "user_id": user.id}, status=status.HTTP_201_CREATED)
+        # Dos fases: la transacción solo cubre la creación del usuario; S3/Rekognition van después
+        try:
+            result = register_visitor(
+                email=_gen_visitor_email(),
+                first_name=first_name,
+                last_name=last_name,
+                role=role,
+                file_obj=file_obj,
+                key_prefix=VISITOR_ENROLL_PREFIX,
+            )
+        except VisitorRegistrationError as e:
+            return Response(e.as_response(), status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response({"ok": True, "user_id": result["user_id"]}, status=status.HTTP_201_CREATED)
 
 
 # ---------- LOGIN DE VISITANTE (CREA SESIÓN) ----------
@@ -85,16 +96,20 @@ class VisitorLoginView(APIView):
         s = VisitorLoginSerializer(data=request.data)
         s.is_valid(raise_exception=True)
 
-        external_id, similarity, key, _raw = search_by_image(
-            s.validated_data["file"],
-            key_prefix=VISITOR_LOGIN_PREFIX,
-            is_visitor=True,
-        )
+        try:
+            external_id, similarity, key, _raw = search_by_image(
+                s.validated_data["file"],
+                key_prefix=VISITOR_LOGIN_PREFIX,
+                is_visitor=True,
+            )
+        except FaceQualityError as e:
+            return Response(e.as_response(), status=status.HTTP_422_UNPROCESSABLE_ENTITY)
         if not external_id:
             return Response({"ok": False, "code": "NOT_VISITOR"}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            user = User.objects.get(id=int(external_id))
+            with stage("db.user"):
+                user = User.objects.select_related("role").get(id=int(external_id))
         except (User.DoesNotExist, ValueError):
             return Response({"ok": False, "code": "NOT_VISITOR"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -104,49 +119,17 @@ class VisitorLoginView(APIView):
             return Response({"ok": False, "code": "NOT_VISITOR"}, status=status.HTTP_403_FORBIDDEN)
 
         # Crea la sesión
-        sess = VisitorSession.objects.create(
-            user=user,
-            similarity=float(similarity or 0.0),
-            s3_key=key or "",
-            event_type="session",
-        )
-
-        # Tokens
-        refresh = RefreshToken.for_user(user)
-        access = refresh.access_token
-
-        # Permisos del rol (compatibles con tu modelo)
-        perms = []
-        if role is not None and hasattr(role, "permissions"):
-            try:
-                model_fields = {f.name for f in role.permissions.model._meta.fields}
-                if "codename" in model_fields:
-                    perms = list(role.permissions.values_list("codename", flat=True))
-                elif "code" in model_fields:
-                    perms = list(role.permissions.values_list("code", flat=True))
-                elif "name" in model_fields:
-                    perms = list(role.permissions.values_list("name", flat=True))
-            except Exception:
-                perms = []
+        with stage("db.session"):
+            sess = VisitorSession.objects.create(
+                user=user,
+                similarity=float(similarity or 0.0),
+                s3_key=key or "",
+                event_type="session",
+            )
 
+        perms = role_permissions(role)
         return Response(
-            {
-                "ok": True,
-                "user_id": user.id,
-                "session_id": sess.id,
-                "similarity": similarity,
-                "access": str(access),
-                "refresh": str(refresh),
-                "role": role_name,          # 👈 ROLE
-                "permissions": perms,       # 👈 PERMISSIONS
-                "user": {
-                    "id": user.id,
-                    "email": getattr(user, "email", ""),
-                    "first_name": getattr(user, "first_name", ""),
-                    "last_name": getattr(user, "last_name", ""),
-                    "role": {"name": role_name} if role_name else None,
-                },
-            },
+            visitor_login_payload(user, sess.id, similarity, perms, issue_tokens(user)),
             status=status.HTTP_200_OK,
         )
 
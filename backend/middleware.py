@@ -0,0 +1,88 @@
+"""
+Middlewares propios del proyecto.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from ai.services import timing
+
+SERVER_TIMING_ALLOW_ORIGIN = os.getenv("SERVER_TIMING_ALLOW_ORIGIN", "*")
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise compatible con ASGI.
+
+    WhiteNoiseMiddleware es solo sync: bajo ASGI obliga a Django a correr toda
+    la cadena en el hilo sync compartido y las vistas async quedan serializadas.
+    Aquí solo los archivos estáticos pasan por un hilo; el resto sigue async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self._is_async = iscoroutinefunction(get_response)
+        if self._is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """
+    Junta las etapas medidas con ai.services.timing.stage durante el request
+    y las devuelve en el header Server-Timing (más `total`). Si el request
+    no midió nada no agrega headers.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._is_async = iscoroutinefunction(get_response)
+        if self._is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        t0 = time.perf_counter()
+        token = timing.begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = timing.end_request(token)
+        return self._annotate(response, timings, t0)
+
+    async def __acall__(self, request):
+        t0 = time.perf_counter()
+        token = timing.begin_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = timing.end_request(token)
+        return self._annotate(response, timings, t0)
+
+    @staticmethod
+    def _annotate(response, timings, t0):
+        if timings:
+            total_ms = (time.perf_counter() - t0) * 1000.0
+            response["Server-Timing"] = timing.server_timing_header(timings, total_ms)
+            response["Timing-Allow-Origin"] = SERVER_TIMING_ALLOW_ORIGIN
+        return response
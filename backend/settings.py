@@ -105,7 +105,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
      "corsheaders.middleware.CorsMiddleware", 
      "corsheaders.middleware.CorsMiddleware",
-      'whitenoise.middleware.WhiteNoiseMiddleware',
+      'backend.middleware.AsyncWhiteNoiseMiddleware',
+    'backend.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -148,6 +149,7 @@ CORS_ALLOW_ALL_ORIGINS = True           # 🔓 permite cualquier origen
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = ["*"]
 CORS_ALLOW_METHODS  = ["DELETE","GET","OPTIONS","PATCH","POST","PUT"]
+CORS_EXPOSE_HEADERS = ["Server-Timing"]    # el kiosko lee los tiempos por etapa
 
 ALLOWED_HOSTS = ["*"]                   # 🔓 permite cualquier host
 # Si usas CSRF por cookies:
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# registro de placas en memoria (ai/services/plate_registry.py)
+from ai.services.plate_registry import warm  # noqa: E402
+warm()
+
+# jobs de video abandonados o en cola sin dueño (ai/services/video_jobs.py, VIDEO_JOB_INLINE)
+from ai.services.video_jobs import start_inline_sweeper  # noqa: E402
+start_inline_sweeper()